@@ -1,28 +1,74 @@
 import numpy
 import pandas
 
+from depth_distribution import DepthDistribution
 
-class ABCDistribution:
+
+class ABCDistribution(DepthDistribution):
+    """
+    Distribution of the bin depths by ABC analysis: the depths are split into
+    consecutive categories from the top (A, B, C, ...), each receiving a percentage of
+    the jobs spread evenly over its depths.
+
+    Parameters
+    ----------
+    abc_df : pandas.DataFrame
+        One row per category, in order from the top, with the columns
+        "number_of_bin_depth" and "percentage_of_jobs"
+    z_size : int
+        The depth of the grid, which the number of bin depths must add up to
+    """
 
     def __init__(self, abc_df: pandas.DataFrame, z_size: int):
         self.abc_df = abc_df
+        self.z_size = z_size
 
         if self.abc_df["number_of_bin_depth"].sum() != z_size:
             raise ValueError(f"Sum of number of bins is not equal to {z_size}.")
         if self.abc_df["percentage_of_jobs"].sum() != 100:
             raise ValueError(f"Sum of percentage of jobs is not equal to 100.")
+        if (
+            (self.abc_df["number_of_bin_depth"] == 0)
+            & (self.abc_df["percentage_of_jobs"] > 0)
+        ).any():
+            raise ValueError("Categories with jobs must have at least one bin depth.")
 
     def pdf(self) -> numpy.ndarray:
-        number_of_bin_depths = self.abc_df["number_of_bin_depth"].values
-
-        pdf_heights = (
-            self.abc_df["percentage_of_jobs"] / self.abc_df["number_of_bin_depth"] / 100
-        ).values
+        number_of_bin_depths = self.abc_df["number_of_bin_depth"].to_numpy(dtype=int)
+        percentage_of_jobs = self.abc_df["percentage_of_jobs"].to_numpy(dtype=float)
 
-        pdf_list = (
-            [pdf_heights[0]] * number_of_bin_depths[0]
-            + [pdf_heights[1]] * number_of_bin_depths[1]
-            + [pdf_heights[2]] * number_of_bin_depths[2]
+        # Empty categories are repeated zero times, so their height does not matter
+        pdf_heights = numpy.divide(
+            percentage_of_jobs / 100,
+            number_of_bin_depths,
+            out=numpy.zeros_like(percentage_of_jobs),
+            where=number_of_bin_depths > 0,
         )
 
-        return numpy.array(pdf_list)
+        return numpy.repeat(pdf_heights, number_of_bin_depths)
+
+    def pmf(self, depth: int | None = None) -> numpy.ndarray:
+        """
+        Return the probabilities of the depths 1 to ``depth``, which must be the
+        z_size of the distribution (the default).
+        """
+        self._check_depth(depth)
+
+        return self.pdf()
+
+    def cdf(self, depth: int | None = None) -> numpy.ndarray:
+        return super().cdf(self._check_depth(depth))
+
+    def sample(
+        self,
+        depth: int | None = None,
+        size: int | tuple[int, ...] = 100,
+        rng: numpy.random.Generator | None = None,
+    ) -> numpy.ndarray:
+        return super().sample(depth=self._check_depth(depth), size=size, rng=rng)
+
+    def _check_depth(self, depth: int | None) -> int:
+        if depth is not None and depth != self.z_size:
+            raise ValueError(f"{depth=}; must be the z_size of {self.z_size}.")
+
+        return self.z_size
@@ -1,48 +1,283 @@
 import streamlit
 
-from ui import GridDesignerUI, SimulationInputUI
+from ui import GridDesignerUI, SimulationInputUI, background, cache
+
+from artifacts import ArtifactStore, read_output
+from grid import Grid
 from input_creation import (
     InputSkyCarSetup,
-    InputZonesAndStations,
     InputSMObstacles,
     InputTCObstacles,
+    InputZonesAndStations,
 )
-
-from parameters import Parameters
+from input_creation.void_decomposition import DECOMPOSITION_MODES, INCREMENTAL_MODES
+from instrumentation import StageTimer, stage
+from parameters import Parameters, SimulationParameters
+from throughput import estimate_throughput
 
 
 def main():
     streamlit.title("Mosaic App")
 
+    streamlit.sidebar.write("## Generation")
+    in_background = streamlit.sidebar.toggle(
+        "Generate in the background",
+        help="Generate the outputs concurrently without blocking the app, showing "
+        + "each one as it finishes; suits large grids.",
+    )
+    if not in_background:
+        # Nothing shows the outputs of the jobs anymore, so stop the running ones
+        background.cancel_jobs()
+    modes = list(DECOMPOSITION_MODES)
+    decomposition = streamlit.sidebar.selectbox(
+        "Void decomposition",
+        modes,
+        index=modes.index(cache.DEFAULT_DECOMPOSITION),
+        help="How the voids of reset-2.json are decomposed into rectangles, like "
+        + "--decomposition of batch.py and sweep.py, whose default is "
+        + f"{cache.DEFAULT_DECOMPOSITION}. {' and '.join(INCREMENTAL_MODES)} only "
+        + "redo the rows around the edited cells.",
+    )
+
+    streamlit.sidebar.write("## Instrumentation")
+    timer = StageTimer(
+        trace_memory=streamlit.sidebar.toggle("Trace memory per stage"),
+        profile=streamlit.sidebar.toggle("Profile with cProfile"),
+    )
+    with timer.activate():
+        with stage("rerun"):
+            show_app(in_background=in_background, decomposition=decomposition)
+
+    show_timings(timer)
+
+
+def show_app(
+    in_background: bool = False, decomposition: str = cache.DEFAULT_DECOMPOSITION
+):
     grid_designer_ui = GridDesignerUI()
-    is_grid_designer_ui_success = grid_designer_ui.show()
+    with stage("grid designer"):
+        is_grid_designer_ui_success = grid_designer_ui.show()
 
     simulation_input_ui = SimulationInputUI()
-    is_simulation_input_ui_success = simulation_input_ui.show()
+    with stage("simulation input"):
+        is_simulation_input_ui_success = simulation_input_ui.show()
 
     if not is_grid_designer_ui_success or not is_simulation_input_ui_success:
         return
 
-    input_zones_and_stations = InputZonesAndStations(
-        grid_data=grid_designer_ui.grid_data, simulation_input=simulation_input_ui
+    # Each output is cached on the grid content and only the parameters it uses, so
+    # e.g. changing the number of skycars does not regenerate the zones and obstacles
+    grid = grid_designer_ui.grid
+    grid_hash = grid.content_hash()
+    parameters = simulation_input_ui.parameters
+
+    with stage("throughput estimate"):
+        show_throughput_estimate(grid, grid_hash=grid_hash, parameters=parameters)
+
+    if in_background:
+        show_outputs_in_background(
+            grid,
+            grid_hash=grid_hash,
+            parameters=parameters,
+            decomposition=decomposition,
+        )
+        return
+
+    with streamlit.expander("reset-2.json: Zones and Stations"), stage("reset-2.json"):
+        streamlit.json(
+            cache.zones_and_stations_json(
+                grid_hash,
+                z_size=parameters.z_size,
+                pick_capacity=parameters.pick_capacity,
+                drop_capacity=parameters.drop_capacity,
+                decomposition=decomposition,
+                _grid=grid,
+            )
+        )
+
+    with streamlit.expander("reset-3.json: SM Obstacles"), stage("reset-3.json"):
+        streamlit.json(cache.sm_obstacles_json(grid_hash, _grid=grid))
+
+    with streamlit.expander("reset-5.json: Skycar Setup"), stage("reset-5.json"):
+        streamlit.json(
+            cache.skycar_setup_json(
+                number_of_skycars=parameters.number_of_skycars,
+                model=Parameters.ZONE_NAME,
+            )
+        )
+
+    with streamlit.expander("reset-6.json: TC Obstacles"), stage("reset-6.json"):
+        streamlit.json(cache.tc_obstacles_json(grid_hash, _grid=grid))
+
+
+def show_throughput_estimate(
+    grid: Grid, grid_hash: str, parameters: SimulationParameters
+):
+    """
+    Show whether the skycars and stations can keep up with the peak throughput, from
+    an analytical estimate of the layout.
+    """
+    if len(grid.stations) == 0:
+        return
+
+    estimate = estimate_throughput(
+        parameters, travel=cache.layout_travel(grid_hash, _grid=grid)
+    ).iloc[0]
+
+    achievable = estimate["achievable_throughput"]
+    required_skycars = int(estimate["required_skycars"])
+
+    streamlit.write("## Throughput estimate")
+    col1, col2, col3 = streamlit.columns(3)
+    col1.metric(
+        "Achievable throughput (bins/h)",
+        f"{achievable:.0f}",
+        delta=f"{achievable - estimate['requested_throughput']:.0f}",
+    )
+    col2.metric(
+        "Required skycars",
+        required_skycars,
+        delta=parameters.number_of_skycars - required_skycars,
+        delta_color="inverse",
+    )
+    col3.metric("Station utilisation", f"{estimate['station_utilisation']:.0%}")
+    if not estimate["is_feasible"]:
+        streamlit.warning(
+            "The layout is unlikely to keep up with the peak throughput; consider "
+            + "more skycars or stations, or larger station capacities.",
+            icon="⚠️",
+        )
+
+
+def show_outputs_in_background(
+    grid: Grid,
+    grid_hash: str,
+    parameters: SimulationParameters,
+    decomposition: str = cache.DEFAULT_DECOMPOSITION,
+):
+    """
+    Submit the outputs to run concurrently in the background and show each one once it
+    finishes; the jobs of outputs of earlier inputs are cancelled.
+
+    Unlike the cached outputs, the background jobs are built from scratch rather than
+    updated from the previous grid, as the session's incremental inputs are not thread
+    safe. Their stages are not timed either. They go through the artifact store of the
+    app, if there is one, like the cached outputs.
+    """
+    jobs = background.background_jobs()
+    store = cache.artifact_store()
+    zones_and_stations_parameters = SimulationParameters(
+        z_size=parameters.z_size,
+        pick_capacity=parameters.pick_capacity,
+        drop_capacity=parameters.drop_capacity,
+    )
+    futures = {
+        "reset-2.json: Zones and Stations": jobs.submit(
+            "reset-2.json",
+            (grid_hash, zones_and_stations_parameters, decomposition),
+            _zones_and_stations_json,
+            grid,
+            grid_hash,
+            zones_and_stations_parameters,
+            decomposition,
+            store,
+        ),
+        "reset-3.json: SM Obstacles": jobs.submit(
+            "reset-3.json", grid_hash, _sm_obstacles_json, grid, grid_hash, store
+        ),
+        "reset-5.json: Skycar Setup": jobs.submit(
+            "reset-5.json",
+            parameters.number_of_skycars,
+            _skycar_setup_json,
+            parameters.number_of_skycars,
+            store,
+        ),
+        "reset-6.json: TC Obstacles": jobs.submit(
+            "reset-6.json", grid_hash, _tc_obstacles_json, grid, grid_hash, store
+        ),
+    }
+
+    background.show_json_results(futures)
+
+
+def _zones_and_stations_json(
+    grid: Grid,
+    grid_hash: str,
+    simulation_input: SimulationParameters,
+    decomposition: str,
+    store: ArtifactStore | None,
+) -> str:
+    # Keyed like cache.zones_and_stations_json, which yields the same file
+    return read_output(
+        lambda: InputZonesAndStations(
+            grid_data=grid,
+            simulation_input=simulation_input,
+            decomposition=decomposition,
+        ),
+        "reset-2.json",
+        store=store,
+        grid=grid_hash,
+        z_size=simulation_input.z_size,
+        pick_capacity=simulation_input.pick_capacity,
+        drop_capacity=simulation_input.drop_capacity,
+        decomposition=decomposition,
+    )
+
+
+def _sm_obstacles_json(grid: Grid, grid_hash: str, store: ArtifactStore | None) -> str:
+    return read_output(
+        lambda: InputSMObstacles(grid_data=grid),
+        "reset-3.json",
+        store=store,
+        grid=grid_hash,
+        encoding="cells",
     )
-    with streamlit.expander("reset-2.json: Zones and Stations"):
-        streamlit.json(input_zones_and_stations.to_json())
 
-    input_sm_obstacles = InputSMObstacles(grid_data=grid_designer_ui.grid_data)
-    with streamlit.expander("reset-3.json: SM Obstacles"):
-        streamlit.json(input_sm_obstacles.to_json())
 
-    input_skycar_setup = InputSkyCarSetup(
-        number_of_skycars=simulation_input_ui.number_of_skycars,
+def _skycar_setup_json(number_of_skycars: int, store: ArtifactStore | None) -> str:
+    return read_output(
+        lambda: InputSkyCarSetup(
+            number_of_skycars=number_of_skycars, model=Parameters.ZONE_NAME
+        ),
+        "reset-5.json",
+        store=store,
+        number_of_skycars=number_of_skycars,
         model=Parameters.ZONE_NAME,
     )
-    with streamlit.expander("reset-5.json: Skycar Setup"):
-        streamlit.json(input_skycar_setup.to_json())
 
-    input_tc_obstacles = InputTCObstacles(grid_data=grid_designer_ui.grid_data)
-    with streamlit.expander("reset-6.json: TC Obstacles"):
-        streamlit.json(input_tc_obstacles.to_json())
+
+def _tc_obstacles_json(grid: Grid, grid_hash: str, store: ArtifactStore | None) -> str:
+    return read_output(
+        lambda: InputTCObstacles(grid_data=grid),
+        "reset-6.json",
+        store=store,
+        grid=grid_hash,
+        encoding="cells",
+    )
+
+
+def show_timings(timer: StageTimer):
+    """
+    Show the time taken by every stage of this rerun; cached stages that were not run
+    again do not appear.
+    """
+    with streamlit.expander("Timings of this rerun"):
+        timings = timer.to_dataframe()
+        timings["stage"] = [
+            "\u2003" * depth + name
+            for name, depth in zip(timings["stage"], timings["depth"])
+        ]
+        streamlit.dataframe(
+            timings.drop(columns="depth"), hide_index=True, use_container_width=True
+        )
+        streamlit.download_button(
+            "Download timings JSON",
+            data=timer.to_json(),
+            file_name="timings.json",
+            mime="application/json",
+        )
+        if timer.profile:
+            streamlit.code(timer.profile_stats())
 
 
 if __name__ == "__main__":
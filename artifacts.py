@@ -0,0 +1,296 @@
+"""
+Content-addressed on-disk store of generated output files.
+
+Every entry is one output file, keyed on a hash of what it is generated from: the file
+name, the content hash of the grid and the simulation parameters the file depends on.
+Generating the same file again copies it from the store instead:
+
+    store = ArtifactStore("~/.cache/mosaic", max_bytes=2**30)
+    write_output(
+        lambda: InputSMObstacles(grid_data),
+        "out/reset-3.json",
+        store=store,
+        grid=grid_data.content_hash(),
+    )
+
+Entries are written to a temporary file and renamed into place, so readers only ever
+see complete files and any number of processes can share a store. Hits refresh the
+modification time of an entry. Every store keeps a running estimate of its size, from
+its last scan of the directory and the entries it has put since, and only scans the
+directory again once the estimate exceeds the size: the least recently used entries are
+then evicted down to `EVICT_TO` of the size, along with the temporary files left behind
+by killed writers.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from input_creation.serialization import JSONOutput
+
+# Part of every key, to be increased when the generated files change for the same inputs
+STORE_VERSION = 1
+DEFAULT_MAX_BYTES = 1 << 30
+# The share of max_bytes that eviction frees the store down to, so that the directory is
+# scanned once per this much headroom rather than after every write
+EVICT_TO = 0.9
+# Temporary files older than this are left behind by writers that were killed
+STALE_TEMPORARY_SECONDS = 3600
+SUFFIX = ".json"
+TEMPORARY_SUFFIX = ".tmp"
+
+
+def artifact_key(filename: str, **inputs: Any) -> str:
+    """
+    Return the key of an output file from everything it is generated from, e.g. the
+    content hash of the grid and the relevant simulation parameters.
+    """
+    description = json.dumps(
+        {"version": STORE_VERSION, "filename": filename, **inputs},
+        sort_keys=True,
+    )
+    return hashlib.blake2b(description.encode(), digest_size=20).hexdigest()
+
+
+class ArtifactStore:
+    """
+    A directory of output files keyed by `artifact_key`, with LRU eviction.
+
+    Parameters
+    ----------
+    root : str | Path
+        The directory of the store, created if needed
+    max_bytes : int, optional
+        The size above which the least recently used entries are evicted, by default
+        1 GiB
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root).expanduser()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # The size of the store at the last scan plus the entries put since, or None
+        # before the first scan
+        self._size: int | None = None
+
+    def path(self, key: str) -> Path:
+        # Entries are spread over subdirectories by the first two characters of the key
+        return self.root / key[:2] / (key + SUFFIX)
+
+    def get(self, key: str) -> Path | None:
+        """
+        Return the path of the entry, marking it as recently used, or None if there is
+        no entry.
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return path
+
+    def put(self, key: str, write: Callable[[Path], None]) -> Path:
+        """
+        Create the entry by calling write with a temporary file name, which is then
+        renamed to the entry atomically.
+        """
+        path = self.path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        file, temporary = tempfile.mkstemp(dir=path.parent, suffix=TEMPORARY_SUFFIX)
+        os.close(file)
+        try:
+            write(Path(temporary))
+            size = os.stat(temporary).st_size
+            os.replace(temporary, path)
+        except BaseException:
+            Path(temporary).unlink(missing_ok=True)
+            raise
+
+        if self._size is not None:
+            self._size += size
+        if self._size is None or self._size > self.max_bytes:
+            self.evict()
+
+        return path
+
+    def write_output(
+        self,
+        key: str,
+        create: Callable[[], JSONOutput],
+        destination: str | Path,
+        compact: bool = False,
+    ) -> bool:
+        """
+        Copy the entry to the destination, creating it with create if needed.
+
+        Returns
+        -------
+        bool
+            Whether the entry was already in the store.
+        """
+        path = self.get(key)
+        if path is not None:
+            try:
+                shutil.copyfile(path, destination)
+                self.hits += 1
+                return True
+            except FileNotFoundError:
+                # Evicted by another process in the meantime
+                pass
+
+        output = create()
+        path = self.put(
+            key, lambda temporary: output.write_json(temporary, compact=compact)
+        )
+        self.misses += 1
+        try:
+            shutil.copyfile(path, destination)
+        except FileNotFoundError:
+            output.write_json(destination, compact=compact)
+
+        return False
+
+    def read_output(
+        self, key: str, create: Callable[[], JSONOutput], compact: bool = False
+    ) -> str:
+        """
+        Return the JSON of the entry, creating it with create if needed.
+        """
+        path = self.get(key)
+        if path is not None:
+            try:
+                json_str = path.read_text(encoding="utf-8")
+                self.hits += 1
+                return json_str
+            except FileNotFoundError:
+                # Evicted by another process in the meantime
+                pass
+
+        json_str = create().to_json(compact=compact)
+        self.put(
+            key, lambda temporary: temporary.write_text(json_str, encoding="utf-8")
+        )
+        self.misses += 1
+
+        return json_str
+
+    def entries(self) -> list[tuple[Path, os.stat_result]]:
+        """
+        Return the path and status of every entry, least recently used first.
+        """
+        entries = []
+        for path in self.root.glob("*/*" + SUFFIX):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                continue
+
+        return sorted(entries, key=lambda entry: entry[1].st_mtime)
+
+    def size(self) -> int:
+        return sum(stat.st_size for _, stat in self.entries())
+
+    def evict(self) -> int:
+        """
+        Scan the store and, if it exceeds max_bytes, remove the least recently used
+        entries until it fits in `EVICT_TO` of max_bytes. Temporary files older than
+        `STALE_TEMPORARY_SECONDS` are removed as well.
+
+        Returns
+        -------
+        int
+            The number of entries removed.
+        """
+        self._remove_stale_temporary_files()
+
+        entries = self.entries()
+        size = sum(stat.st_size for _, stat in entries)
+
+        removed = 0
+        if size > self.max_bytes:
+            for path, stat in entries:
+                if size <= self.max_bytes * EVICT_TO:
+                    break
+                # Another process may evict the same entry
+                path.unlink(missing_ok=True)
+                size -= stat.st_size
+                removed += 1
+
+        self._size = size
+        return removed
+
+    def _remove_stale_temporary_files(self):
+        stale = time.time() - STALE_TEMPORARY_SECONDS
+        for path in self.root.glob("*/*" + TEMPORARY_SUFFIX):
+            try:
+                if path.stat().st_mtime < stale:
+                    path.unlink()
+            except FileNotFoundError:
+                # Renamed into place or removed by another process
+                continue
+
+
+def write_output(
+    create: Callable[[], JSONOutput],
+    destination: str | Path,
+    store: ArtifactStore | None = None,
+    compact: bool = False,
+    **inputs: Any,
+) -> bool:
+    """
+    Write an output file through the store, if there is one.
+
+    Parameters
+    ----------
+    create : Callable[[], JSONOutput]
+        Creates the output, only called if it is not in the store
+    destination : str | Path
+        The file to write, whose name is part of the key
+    store : ArtifactStore, optional
+        The store, by default the output is always created
+    compact : bool, optional
+        Whether to write the JSON without indentation, by default False
+    **inputs : Any
+        Everything else the output is generated from, e.g. the content hash of the
+        grid and the relevant simulation parameters
+
+    Returns
+    -------
+    bool
+        Whether the output was copied from the store.
+    """
+    if store is None:
+        create().write_json(destination, compact=compact)
+        return False
+
+    key = artifact_key(Path(destination).name, compact=compact, **inputs)
+    return store.write_output(key, create, destination, compact=compact)
+
+
+def read_output(
+    create: Callable[[], JSONOutput],
+    filename: str,
+    store: ArtifactStore | None = None,
+    compact: bool = False,
+    **inputs: Any,
+) -> str:
+    """
+    Return the JSON of an output file through the store, if there is one, with the
+    same key as `write_output` writing it to a file of that name.
+    """
+    if store is None:
+        return create().to_json(compact=compact)
+
+    key = artifact_key(filename, compact=compact, **inputs)
+    return store.read_output(key, create, compact=compact)
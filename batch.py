@@ -0,0 +1,458 @@
+"""
+Headless generation of the reset-*.json files for one or more grid layouts.
+
+Example
+-------
+    python batch.py grids/ --parameters parameters.json --output-dir out/ --workers 8
+
+Every grid (Excel, CSV, Parquet or .npy, or a directory of them) is combined with every
+simulation parameter file (JSON, or a directory of them) and the four reset files are
+written to ``<output-dir>/<grid name>/`` (or ``<grid name>__<parameters name>/`` when
+several parameter files are given). Grids can also be split into several zones, from a
+file of zone labels or the regions connected around SM & TC obstacles. With --store, the
+files are kept in an artifact store shared by all runs, and copied from it when they
+were generated before from the same grid and parameters.
+
+Grids stored by `grid.save_grid` are validated and, by default, decomposed one band of
+rows at a time, so that they are never read into memory whole.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from pathlib import Path
+
+from artifacts import DEFAULT_MAX_BYTES, ArtifactStore, write_output
+from grid import GRID_FORMATS, Grid, ZoneLayout, load_grid, validate_grid
+from grid.storage import is_stored_grid
+from grid.validation import ERROR
+from input_creation import (
+    InputSkyCarSetup,
+    InputZonesAndStations,
+    InputSMObstacles,
+    InputTCObstacles,
+)
+from input_creation.input_sm_obstacles import STACK_ENCODINGS
+from input_creation.input_tc_obstacles import TWO_D_ENCODINGS
+from input_creation.void_decomposition import BAND_MODES, DECOMPOSITION_MODES
+from input_creation.zones import split_zones, zone_skycar_setups, zone_sm_obstacles
+from instrumentation import StageTimer, stage
+from parameters import Parameters, SimulationParameters
+
+GRID_SUFFIXES = list(GRID_FORMATS)
+PARAMETERS_SUFFIXES = [".json"]
+# The value of --zones that splits the grids into their connected regions
+ZONE_COMPONENTS = "components"
+DEFAULT_DECOMPOSITION = "greedy"
+# The default decomposition of stored grids, one of BAND_MODES, since the other modes
+# put the void mask of the whole memory-mapped grid together in memory
+STORED_GRID_DECOMPOSITION = "row_runs"
+
+
+def read_grid_file(filename: str | Path) -> Grid:
+    """
+    Read a grid from an Excel, CSV, Parquet or .npy file that has no header row, or
+    open a grid stored by `grid.save_grid` memory-mapped.
+
+    Blank cells and invalid inputs are changed to 3 - SM & TC obstacles, the same way
+    the grid designer does.
+    """
+    return load_grid(filename).grid
+
+
+def grid_decomposition(grid_filename: str | Path, decomposition: str | None) -> str:
+    """
+    Return the decomposition of the grid file, by default `DEFAULT_DECOMPOSITION`, or
+    `STORED_GRID_DECOMPOSITION` for stored grids, which are warned about with any mode
+    that is not decomposed band by band.
+    """
+    if not is_stored_grid(grid_filename):
+        return decomposition or DEFAULT_DECOMPOSITION
+    if decomposition is None:
+        return STORED_GRID_DECOMPOSITION
+
+    if decomposition not in BAND_MODES:
+        print(
+            f"Warning: {grid_filename} is a stored grid but the {decomposition} "
+            + "decomposition reads its void mask into memory whole; "
+            + f"{', '.join(BAND_MODES)} decomposes it one band of rows at a time."
+        )
+    return decomposition
+
+
+def check_grid(grid_data: Grid, grid_filename: str | Path, output_dir: Path):
+    """
+    Validate the grid, saving the report as validation.json if there are any issues.
+
+    Raises
+    ------
+    ValueError
+        If any of the issues is an error.
+    """
+    report = validate_grid(grid_data)
+    if len(report.issues) > 0:
+        report.to_json(save=True, filename=output_dir / "validation.json")
+    if not report.is_valid:
+        raise ValueError(
+            f"Invalid grid {grid_filename}: "
+            + " ".join(
+                message
+                for _, severity, message in report.messages()
+                if severity == ERROR
+            )
+        )
+
+
+def generate_layout(
+    grid_filename: str | Path,
+    parameters_filename: str | Path | None,
+    output_dir: str | Path,
+    decomposition: str | None = None,
+    compact: bool = False,
+    sm_encoding: str = "cells",
+    tc_encoding: str = "cells",
+    zones: str | None = None,
+    zone_workers: int | None = 1,
+    store: str | Path | None = None,
+    store_max_bytes: int = DEFAULT_MAX_BYTES,
+    timings: bool = False,
+) -> Path:
+    """
+    Generate and save reset-2, reset-3, reset-5 and reset-6.json for one layout.
+
+    The validation report of the grid is saved as validation.json if there are any
+    issues, in which case no reset file is written if any of them is an error. The time
+    taken by every stage is saved as timings.json if timings is set.
+
+    With zones ("components" or a file of zone labels), reset-2.json has one zone per
+    zone of the layout, and reset-3 and reset-5.json are lists with one entry per zone;
+    the zones are generated across zone_workers processes.
+
+    With a store directory, the files are copied from the artifact store when they were
+    generated before from the same grid and parameters; only reset-6.json is stored
+    for layouts with zones.
+
+    The decomposition is "greedy" by default, or "row_runs" for stored grids (see
+    `grid_decomposition`).
+
+    Returns
+    -------
+    Path
+        The directory the files are written to.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    timer = StageTimer()
+    try:
+        with timer.activate(), stage("generate_layout"):
+            _write_layout(
+                grid_filename,
+                parameters_filename,
+                output_dir=output_dir,
+                decomposition=decomposition,
+                compact=compact,
+                sm_encoding=sm_encoding,
+                tc_encoding=tc_encoding,
+                zones=zones,
+                zone_workers=zone_workers,
+                store=(
+                    None
+                    if store is None
+                    else ArtifactStore(store, max_bytes=store_max_bytes)
+                ),
+            )
+    finally:
+        if timings:
+            timer.to_json(save=True, filename=output_dir / "timings.json")
+
+    return output_dir
+
+
+def _write_layout(
+    grid_filename: str | Path,
+    parameters_filename: str | Path | None,
+    output_dir: Path,
+    decomposition: str | None,
+    compact: bool,
+    sm_encoding: str,
+    tc_encoding: str,
+    zones: str | None,
+    zone_workers: int | None,
+    store: ArtifactStore | None,
+):
+    grid_data = read_grid_file(grid_filename)
+    simulation_input = (
+        SimulationParameters()
+        if parameters_filename is None
+        else SimulationParameters.from_json(parameters_filename)
+    )
+
+    check_grid(grid_data, grid_filename=grid_filename, output_dir=output_dir)
+    decomposition = grid_decomposition(grid_filename, decomposition)
+
+    grid_hash = None if store is None else grid_data.content_hash()
+    if zones is None:
+        write_output(
+            lambda: InputZonesAndStations(
+                grid_data=grid_data,
+                simulation_input=simulation_input,
+                decomposition=decomposition,
+            ),
+            output_dir / "reset-2.json",
+            store=store,
+            compact=compact,
+            grid=grid_hash,
+            z_size=simulation_input.z_size,
+            pick_capacity=simulation_input.pick_capacity,
+            drop_capacity=simulation_input.drop_capacity,
+            decomposition=decomposition,
+        )
+        write_output(
+            lambda: InputSMObstacles(grid_data=grid_data, encoding=sm_encoding),
+            output_dir / "reset-3.json",
+            store=store,
+            compact=compact,
+            grid=grid_hash,
+            encoding=sm_encoding,
+        )
+        write_output(
+            lambda: InputSkyCarSetup(
+                number_of_skycars=simulation_input.number_of_skycars,
+                model=Parameters.ZONE_NAME,
+            ),
+            output_dir / "reset-5.json",
+            store=store,
+            compact=compact,
+            number_of_skycars=simulation_input.number_of_skycars,
+            model=Parameters.ZONE_NAME,
+        )
+    else:
+        zone_layout = (
+            ZoneLayout.from_components(grid_data)
+            if zones == ZONE_COMPONENTS
+            else ZoneLayout.from_file(zones)
+        )
+        void_rectangles, stack_coordinates = split_zones(
+            grid_data,
+            zone_layout=zone_layout,
+            decomposition=decomposition,
+            workers=zone_workers,
+        )
+        InputZonesAndStations(
+            grid_data=grid_data,
+            simulation_input=simulation_input,
+            decomposition=decomposition,
+            void_rectangles=void_rectangles,
+            zone_layout=zone_layout,
+        ).write_json(output_dir / "reset-2.json", compact=compact)
+        zone_sm_obstacles(
+            grid_data,
+            zone_layout=zone_layout,
+            stack_coordinates=stack_coordinates,
+            encoding=sm_encoding,
+        ).write_json(output_dir / "reset-3.json", compact=compact)
+        zone_skycar_setups(
+            simulation_input.number_of_skycars, zone_layout=zone_layout
+        ).write_json(output_dir / "reset-5.json", compact=compact)
+    # TC obstacles have no zone, so they are the same with or without zones
+    write_output(
+        lambda: InputTCObstacles(grid_data=grid_data, encoding=tc_encoding),
+        output_dir / "reset-6.json",
+        store=store,
+        compact=compact,
+        grid=grid_hash,
+        encoding=tc_encoding,
+    )
+
+
+def _collect_files(paths: list[str], suffixes: list[str]) -> list[Path]:
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(
+                sorted(i for i in path.iterdir() if i.suffix.lower() in suffixes)
+            )
+        else:
+            files.append(path)
+
+    return files
+
+
+def run_batch(
+    grid_paths: list[str],
+    parameters_paths: list[str],
+    output_dir: str | Path,
+    workers: int | None = None,
+    decomposition: str | None = None,
+    compact: bool = False,
+    sm_encoding: str = "cells",
+    tc_encoding: str = "cells",
+    zones: str | None = None,
+    zone_workers: int | None = 1,
+    store: str | Path | None = None,
+    store_max_bytes: int = DEFAULT_MAX_BYTES,
+    timings: bool = False,
+) -> list[Path]:
+    """
+    Generate every combination of grid and parameter file across a process pool.
+
+    Layouts that fail, e.g. from an invalid grid or parameter file, are reported and
+    skipped.
+    """
+    grid_files = _collect_files(grid_paths, GRID_SUFFIXES)
+    parameters_files = _collect_files(parameters_paths, PARAMETERS_SUFFIXES) or [None]
+
+    jobs = []
+    for grid_file, parameters_file in product(grid_files, parameters_files):
+        name = grid_file.stem
+        if len(parameters_files) > 1:
+            name += f"__{parameters_file.stem}"
+        jobs.append((grid_file, parameters_file, Path(output_dir) / name))
+
+    start = time.perf_counter()
+    output_dirs = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                generate_layout,
+                *job,
+                decomposition=decomposition,
+                compact=compact,
+                sm_encoding=sm_encoding,
+                tc_encoding=tc_encoding,
+                zones=zones,
+                zone_workers=zone_workers,
+                store=store,
+                store_max_bytes=store_max_bytes,
+                timings=timings,
+            ): job
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                output_dirs.append(future.result())
+            # Invalid grids, parameter files with unknown or missing fields and
+            # unreadable files only skip their layout
+            except (ValueError, TypeError, OSError) as error:
+                print(f"Skipped {futures[future][2].name}: {error}")
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"Generated {len(output_dirs)} of {len(jobs)} layouts in {elapsed:.2f} s "
+        + f"({len(output_dirs) / elapsed:.2f} layouts/s)."
+    )
+
+    return output_dirs
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Generate reset-*.json files without the Streamlit app."
+    )
+    parser.add_argument(
+        "grids",
+        nargs="+",
+        help="Grid Excel/CSV/Parquet/.npy files or directories of them.",
+    )
+    parser.add_argument(
+        "-p",
+        "--parameters",
+        nargs="*",
+        default=[],
+        help="Simulation parameter JSON files or directories of them; the defaults "
+        + "of the app are used if omitted.",
+    )
+    parser.add_argument(
+        "-o", "--output-dir", default="output", help="Directory to write results to."
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes.",
+    )
+    parser.add_argument(
+        "-d",
+        "--decomposition",
+        choices=list(DECOMPOSITION_MODES),
+        help=f"How void cells are decomposed into rectangles; {DEFAULT_DECOMPOSITION} "
+        + f"if omitted, or {STORED_GRID_DECOMPOSITION} for stored grids (.npy files "
+        + "saved with their stations), which it decomposes one band of rows at a time.",
+    )
+    parser.add_argument(
+        "-c",
+        "--compact",
+        action="store_true",
+        help="Write the JSON without indentation.",
+    )
+    parser.add_argument(
+        "-s",
+        "--sm-encoding",
+        choices=STACK_ENCODINGS,
+        default="cells",
+        help="How the SM obstacles are listed in reset-3.json; runs and rectangles "
+        + "need a simulator that supports them.",
+    )
+    parser.add_argument(
+        "-t",
+        "--tc-encoding",
+        choices=TWO_D_ENCODINGS,
+        default="cells",
+        help="How the TC obstacles are listed in reset-6.json; runs and rectangles "
+        + "need a simulator that supports them.",
+    )
+    parser.add_argument(
+        "-z",
+        "--zones",
+        help=f"Split the grids into zones: '{ZONE_COMPONENTS}' for the regions "
+        + "connected around SM & TC obstacles, or a file of zone labels of the same "
+        + "shape as the grids. reset-3 and reset-5.json then list every zone.",
+    )
+    parser.add_argument(
+        "--zone-workers",
+        type=int,
+        default=1,
+        help="Number of processes per layout that generate its zones.",
+    )
+    parser.add_argument(
+        "--store",
+        help="Directory of an artifact store to reuse the files generated before "
+        + "from the same grid and parameters, e.g. ~/.cache/mosaic.",
+    )
+    parser.add_argument(
+        "--store-max-bytes",
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help="Size the artifact store is kept under by evicting the least recently "
+        + "used files.",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Save the time taken by every stage as timings.json.",
+    )
+    args = parser.parse_args(argv)
+
+    run_batch(
+        grid_paths=args.grids,
+        parameters_paths=args.parameters,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        decomposition=args.decomposition,
+        compact=args.compact,
+        sm_encoding=args.sm_encoding,
+        tc_encoding=args.tc_encoding,
+        zones=args.zones,
+        zone_workers=args.zone_workers,
+        store=args.store,
+        store_max_bytes=args.store_max_bytes,
+        timings=args.timings,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+from .grids import GRID_GENERATORS, corridor_grid, random_grid
+from .suite import compare_to_baseline, load_baseline, run_benchmarks, save_baseline
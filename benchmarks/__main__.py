@@ -0,0 +1,119 @@
+"""
+Run the benchmark suite and compare it with the stored baseline.
+
+Example
+-------
+    python -m benchmarks --sizes 50 200 500          # compare with the baseline
+    python -m benchmarks --sizes 50 200 500 --save   # store a new baseline
+
+Exits with status 1 if any stage is slower than the baseline by more than the
+tolerance, or slower than its time budget. Baselines are machine-specific, so only
+compare runs from the same machine.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import pandas
+
+from .grids import GRID_GENERATORS
+from .suite import (
+    DEFAULT_SAMPLE_SIZE,
+    DEFAULT_SIZES,
+    DEFAULT_TOLERANCE,
+    check_budgets,
+    compare_to_baseline,
+    load_baseline,
+    run_benchmarks,
+    save_baseline,
+)
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark every stage of the input pipeline."
+    )
+    parser.add_argument(
+        "-s", "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Grid sizes."
+    )
+    parser.add_argument(
+        "-g",
+        "--grids",
+        nargs="+",
+        choices=list(GRID_GENERATORS),
+        default=list(GRID_GENERATORS),
+        help="Synthetic grid layouts.",
+    )
+    parser.add_argument(
+        "-n",
+        "--sample-size",
+        type=int,
+        default=DEFAULT_SAMPLE_SIZE,
+        help="Number of depths drawn by the distribution stages.",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="Timed runs per stage."
+    )
+    parser.add_argument(
+        "-b", "--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file."
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="Save the results as the baseline."
+    )
+    parser.add_argument(
+        "-t",
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Time ratio to the baseline above which a stage is a regression.",
+    )
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        sizes=args.sizes,
+        grids=args.grids,
+        sample_size=args.sample_size,
+        repeat=args.repeat,
+    )
+
+    over_budget = check_budgets(report)
+
+    with pandas.option_context("display.width", 200, "display.max_rows", None):
+        if len(over_budget) > 0:
+            print(
+                over_budget[
+                    ["grid", "size", "stage", "seconds", "budget_seconds"]
+                ].to_string(index=False)
+            )
+            print(f"{len(over_budget)} stages took longer than their time budget.")
+
+        if args.save or not Path(args.baseline).exists():
+            print(report.to_string(index=False))
+            if args.save:
+                save_baseline(report, args.baseline)
+                print(f"Saved baseline to {args.baseline}.")
+            return 1 if len(over_budget) > 0 else 0
+
+        comparison = compare_to_baseline(
+            report, load_baseline(args.baseline), tolerance=args.tolerance
+        )
+        print(
+            comparison[
+                ["grid", "size", "stage", "seconds", "time_ratio", "peak_bytes"]
+                + ["memory_ratio", "regression"]
+            ].to_string(index=False)
+        )
+
+    regressions = comparison[comparison["regression"]]
+    if len(regressions) > 0:
+        print(f"{len(regressions)} stages regressed beyond {args.tolerance}x.")
+        return 1
+
+    return 1 if len(over_budget) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
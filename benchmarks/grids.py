@@ -0,0 +1,102 @@
+"""
+Synthetic grid layouts for benchmarks.
+
+Every generator returns a square `Grid` of the given size with paired drop (x1) and
+pick (x2) stations along the top row, so that the grids always pass validation.
+"""
+
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy
+
+from grid import Grid
+
+
+def random_grid(
+    size: int,
+    obstacle_density: float = 0.1,
+    station_density: float = 0.05,
+    seed: int = 0,
+) -> Grid:
+    """
+    Grid with obstacles of every kind scattered uniformly at random.
+
+    Parameters
+    ----------
+    size : int
+        The number of cells per side
+    obstacle_density : float, optional
+        The share of cells that are obstacles, split evenly between 1, 2 and 3, by
+        default 0.1
+    station_density : float, optional
+        The share of the top row that are stations, by default 0.05
+    seed : int, optional
+        The seed of the obstacles, by default 0
+    """
+    rng = numpy.random.default_rng(seed)
+    values = rng.choice(
+        [Grid.EMPTY, Grid.SM_OBSTACLE, Grid.TC_OBSTACLE, Grid.SM_TC_OBSTACLE],
+        size=(size, size),
+        p=[1 - obstacle_density] + [obstacle_density / 3] * 3,
+    )
+
+    return Grid.from_array(_add_stations(values, station_density=station_density))
+
+
+def corridor_grid(
+    size: int,
+    aisle_every: int = 10,
+    pillar_every: int = 6,
+    station_density: float = 0.05,
+    seed: int = 0,
+) -> Grid:
+    """
+    Grid of storage blocks split by TC aisles, with SM & TC pillars on a lattice and a
+    few solid SM blocks, like a typical warehouse layout.
+
+    Parameters
+    ----------
+    size : int
+        The number of cells per side
+    aisle_every : int, optional
+        The spacing of the rows and columns of TC aisles, by default 10
+    pillar_every : int, optional
+        The spacing of the pillars, by default 6
+    station_density : float, optional
+        The share of the top row that are stations, by default 0.05
+    seed : int, optional
+        The seed of the positions of the SM blocks, by default 0
+    """
+    rng = numpy.random.default_rng(seed)
+    values = numpy.zeros((size, size), dtype=numpy.int64)
+    values[::aisle_every, :] = Grid.TC_OBSTACLE
+    values[:, ::aisle_every] = Grid.TC_OBSTACLE
+    values[::pillar_every, ::pillar_every] = Grid.SM_TC_OBSTACLE
+
+    block = max(1, size // 20)
+    for y, x in rng.integers(0, max(1, size - block), size=(max(1, size // 25), 2)):
+        values[y : y + block, x : x + block] = Grid.SM_OBSTACLE
+
+    return Grid.from_array(_add_stations(values, station_density=station_density))
+
+
+GRID_GENERATORS: dict[str, Callable[..., Grid]] = {
+    "random": random_grid,
+    "corridors": corridor_grid,
+}
+
+
+def _add_stations(values: numpy.ndarray, station_density: float) -> numpy.ndarray:
+    values = numpy.array(values, dtype=numpy.int64)
+    cols = values.shape[1]
+
+    # Station ids from 1, each a drop station followed by its pick station
+    pairs = max(1, min(cols // 2, round(cols * station_density / 2)))
+    ids = numpy.arange(1, pairs + 1)
+    values[0, :] = Grid.EMPTY
+    values[0, 0 : 2 * pairs : 2] = ids * 10 + 1
+    values[0, 1 : 2 * pairs : 2] = ids * 10 + 2
+
+    return values
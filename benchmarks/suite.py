@@ -0,0 +1,263 @@
+"""
+Benchmarks of every stage of the input pipeline, from grid validation to JSON.
+
+Each stage is timed (best of a number of repeats) and then run once more under
+tracemalloc for its peak memory. Results can be saved as a baseline and later runs
+compared against it to catch regressions, and the stages on the interactive path are
+checked against absolute time budgets.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy
+import pandas
+
+from grid import Grid, analyze_connectivity, validate_grid
+from input_creation import (
+    InputZonesAndStations,
+    InputSMObstacles,
+    InputTCObstacles,
+)
+from input_creation.serialization import dumps
+from pareto import Pareto
+from parameters import SimulationParameters
+from .grids import GRID_GENERATORS
+
+DEFAULT_SIZES = [50, 200, 500]
+DEFAULT_SAMPLE_SIZE = 1_000_000
+# Stages taking longer than this multiple of the baseline count as regressions
+DEFAULT_TOLERANCE = 1.5
+# Slowdowns of less than this many seconds are timer noise rather than regressions
+MIN_REGRESSION_SECONDS = 0.001
+# Most seconds a stage may take on grids of a size, wherever it runs: the grid designer
+# analyzes the connectivity of the edited grid interactively
+TIME_BUDGETS = {("distance_fields", 500): 0.5}
+COLUMNS = ["grid", "size", "stage", "seconds", "peak_bytes"]
+KEY_COLUMNS = ["grid", "size", "stage"]
+
+
+class Stage:
+    """
+    A benchmarked step; setup prepares its input state and is not measured.
+
+    Grid stages are set up from the grid and the simulation input, and distribution
+    stages from the simulation input and the sample size.
+    """
+
+    def __init__(
+        self, name: str, setup: Callable[[Any, Any], Any], run: Callable[[Any], Any]
+    ):
+        self.name = name
+        self.setup = setup
+        self.run = run
+
+
+def _grid(grid: Grid, simulation_input: SimulationParameters) -> Grid:
+    return grid
+
+
+def _new_zones_and_stations(grid: Grid, simulation_input: SimulationParameters):
+    # Bypass __init__ to time _create_zones and _create_stations separately
+    zones_and_stations = InputZonesAndStations.__new__(InputZonesAndStations)
+    return zones_and_stations, grid, simulation_input
+
+
+GRID_STAGES = [
+    Stage("validation", _grid, validate_grid),
+    Stage(
+        "distance_fields",
+        _grid,
+        # A new analysis per run, so that its graph is not cached across the repeats
+        lambda grid: analyze_connectivity(grid).distance_fields(),
+    ),
+    Stage(
+        "create_zones",
+        _new_zones_and_stations,
+        lambda state: state[0]._create_zones(
+            grid_data=state[1], simulation_input=state[2]
+        ),
+    ),
+    Stage(
+        "create_stations",
+        _new_zones_and_stations,
+        lambda state: state[0]._create_stations(
+            grid_data=state[1], simulation_input=state[2]
+        ),
+    ),
+    Stage("sm_obstacles", _grid, InputSMObstacles),
+    Stage("tc_obstacles", _grid, InputTCObstacles),
+    Stage("reset-2.json", InputZonesAndStations, dumps),
+    Stage("reset-3.json", lambda grid, _: InputSMObstacles(grid), dumps),
+    Stage("reset-6.json", lambda grid, _: InputTCObstacles(grid), dumps),
+]
+
+DISTRIBUTION_STAGES = [
+    Stage(
+        "pareto_sample",
+        lambda simulation_input, size: (
+            Pareto(),
+            simulation_input.z_size,
+            size,
+            numpy.random.default_rng(0),
+        ),
+        lambda state: state[0].sample(state[1], size=state[2], rng=state[3]),
+    ),
+    Stage(
+        "abc_sample",
+        lambda simulation_input, size: (
+            simulation_input.abc_distribution(),
+            size,
+            numpy.random.default_rng(0),
+        ),
+        lambda state: state[0].sample(size=state[1], rng=state[2]),
+    ),
+    Stage(
+        "abc_pdf",
+        lambda simulation_input, _: simulation_input.abc_distribution(),
+        lambda distribution: distribution.pdf(),
+    ),
+]
+
+
+def measure(stage: Stage, state: Any, repeat: int = 3) -> dict[str, float]:
+    """
+    Return the best time of the stage in seconds and its peak traced memory in bytes.
+    """
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage.run(state)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    # Memory is measured separately, as tracemalloc slows down every allocation
+    tracemalloc.start()
+    try:
+        stage.run(state)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": seconds, "peak_bytes": peak_bytes}
+
+
+def run_benchmarks(
+    sizes: list[int] | None = None,
+    grids: list[str] | None = None,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    repeat: int = 3,
+) -> pandas.DataFrame:
+    """
+    Benchmark every stage on every synthetic grid and size.
+
+    Parameters
+    ----------
+    sizes : list[int], optional
+        The numbers of cells per side of the grids, by default `DEFAULT_SIZES`
+    grids : list[str], optional
+        The grid generators of `GRID_GENERATORS` to use, by default all of them
+    sample_size : int, optional
+        The number of depths drawn by the distribution stages, by default 1,000,000
+    repeat : int, optional
+        The number of timed runs per stage, of which the best is kept, by default 3
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per stage with the columns "grid", "size", "stage", "seconds" and
+        "peak_bytes"; the distribution stages have the grid "-" and the sample size as
+        size.
+    """
+    simulation_input = SimulationParameters()
+
+    report = []
+    for grid_name in grids or list(GRID_GENERATORS):
+        for size in sizes or DEFAULT_SIZES:
+            grid = GRID_GENERATORS[grid_name](size)
+            for stage in GRID_STAGES:
+                state = stage.setup(grid, simulation_input)
+                report.append(
+                    {
+                        "grid": grid_name,
+                        "size": size,
+                        "stage": stage.name,
+                        **measure(stage, state, repeat=repeat),
+                    }
+                )
+
+    for stage in DISTRIBUTION_STAGES:
+        state = stage.setup(simulation_input, sample_size)
+        report.append(
+            {
+                "grid": "-",
+                "size": sample_size,
+                "stage": stage.name,
+                **measure(stage, state, repeat=repeat),
+            }
+        )
+
+    return pandas.DataFrame(report, columns=COLUMNS)
+
+
+def save_baseline(report: pandas.DataFrame, filename: str | Path):
+    with open(filename, "w") as file:
+        json.dump(report.to_dict(orient="records"), file, indent=4)
+
+
+def load_baseline(filename: str | Path) -> pandas.DataFrame:
+    with open(filename) as file:
+        return pandas.DataFrame(json.load(file), columns=COLUMNS)
+
+
+def compare_to_baseline(
+    report: pandas.DataFrame,
+    baseline: pandas.DataFrame,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> pandas.DataFrame:
+    """
+    Compare a report with a baseline, stage by stage.
+
+    A stage regresses when its time exceeds the baseline by the tolerance ratio and by
+    at least `MIN_REGRESSION_SECONDS`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The stages found in both, with the baseline seconds and peak bytes, the ratios
+        of the report to the baseline, and "regression" when the time ratio exceeds the
+        tolerance.
+    """
+    comparison = report.merge(
+        baseline, on=KEY_COLUMNS, suffixes=("", "_baseline"), how="inner"
+    )
+    comparison["time_ratio"] = comparison["seconds"] / comparison["seconds_baseline"]
+    comparison["memory_ratio"] = comparison["peak_bytes"] / comparison[
+        "peak_bytes_baseline"
+    ].clip(lower=1)
+    comparison["regression"] = (comparison["time_ratio"] > tolerance) & (
+        comparison["seconds"] - comparison["seconds_baseline"] > MIN_REGRESSION_SECONDS
+    )
+
+    return comparison
+
+
+def check_budgets(report: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    Return the stages of the report that take longer than their `TIME_BUDGETS`, with
+    their budget in the column "budget_seconds".
+    """
+    budgets = pandas.DataFrame(
+        [
+            {"stage": stage, "size": size, "budget_seconds": seconds}
+            for (stage, size), seconds in TIME_BUDGETS.items()
+        ],
+        columns=["stage", "size", "budget_seconds"],
+    )
+    checked = report.merge(budgets, on=["stage", "size"], how="inner")
+
+    return checked[checked["seconds"] > checked["budget_seconds"]]
@@ -0,0 +1,147 @@
+"""
+Common interface of the distributions of the bin depth accessed by a job.
+
+Depths are integers from 1 (the top of a stack) to the depth of the grid.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+
+import numpy
+
+
+class DepthDistribution(ABC):
+    """
+    Base class of the bin depth distributions.
+
+    Subclasses define `pmf`; sampling defaults to an alias table built from it, which
+    draws any number of depths with two random numbers each.
+    """
+
+    @abstractmethod
+    def pmf(self, depth: int) -> numpy.ndarray:
+        """
+        Return the probabilities of the depths 1 to ``depth``.
+        """
+
+    def cdf(self, depth: int) -> numpy.ndarray:
+        """
+        Return the cumulative probabilities of the depths 1 to ``depth``.
+        """
+        cdf = numpy.cumsum(self.pmf(depth))
+        cdf[-1] = 1.0
+
+        return cdf
+
+    def sample(
+        self,
+        depth: int,
+        size: int | tuple[int, ...] = 100,
+        rng: numpy.random.Generator | None = None,
+    ) -> numpy.ndarray:
+        """
+        Sample integer depths from the distribution.
+
+        Parameters
+        ----------
+        depth : int
+            The depth of the grid
+        size : int | tuple[int, ...], optional
+            The shape of the array, by default 100
+        rng : numpy.random.Generator, optional
+            The random generator to sample with, by default a freshly seeded one
+
+        Returns
+        -------
+        numpy.ndarray
+            An integer array of depths between 1 and ``depth`` inclusive.
+        """
+        if rng is None:
+            rng = numpy.random.default_rng()
+
+        probability, alias = self._alias_table(depth)
+        index = rng.integers(0, depth, size=size)
+        accept = rng.random(size) < probability[index]
+
+        return numpy.where(accept, index, alias[index]).astype(numpy.int64) + 1
+
+    def sample_batch(
+        self,
+        depth: int,
+        runs: int,
+        size: int,
+        rng: numpy.random.Generator | None = None,
+    ) -> numpy.ndarray:
+        """
+        Sample the depths of several workloads at once.
+
+        Parameters
+        ----------
+        depth : int
+            The depth of the grid
+        runs : int
+            The number of workloads (rows of the returned matrix)
+        size : int
+            The number of jobs per workload (columns of the returned matrix)
+        rng : numpy.random.Generator, optional
+            The random generator to sample with, by default a freshly seeded one
+
+        Returns
+        -------
+        numpy.ndarray
+            An integer matrix of shape ``(runs, size)`` of depths between 1 and
+            ``depth`` inclusive.
+        """
+        return self.sample(depth=depth, size=(runs, size), rng=rng)
+
+    def _alias_table(self, depth: int) -> tuple[numpy.ndarray, numpy.ndarray]:
+        # Tables are cached per depth, as they only depend on the pmf
+        tables = self.__dict__.setdefault("_alias_tables", {})
+        if depth not in tables:
+            tables[depth] = alias_table(self.pmf(depth))
+
+        return tables[depth]
+
+
+def alias_table(pmf: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Build the alias table of a discrete distribution (Vose's method).
+
+    Outcome i is drawn by picking a uniform index i and keeping it with
+    ``probability[i]``, or else taking ``alias[i]``.
+
+    Parameters
+    ----------
+    pmf : numpy.ndarray
+        The probabilities of the outcomes, summing to 1
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray]
+        The acceptance probability and the alias of every outcome.
+    """
+    pmf = numpy.asarray(pmf, dtype=float)
+    if pmf.ndim != 1 or len(pmf) == 0 or (pmf < 0).any():
+        raise ValueError("pmf must be a non-empty 1D array of non-negative values.")
+
+    scaled = pmf * len(pmf) / pmf.sum()
+    probability = numpy.ones(len(pmf))
+    alias = numpy.arange(len(pmf))
+
+    small = [i for i in range(len(pmf)) if scaled[i] < 1]
+    large = [i for i in range(len(pmf)) if scaled[i] >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        probability[less] = scaled[less]
+        alias[less] = more
+
+        # The large outcome gives away what fills up the small one
+        scaled[more] -= 1 - scaled[less]
+        if scaled[more] < 1:
+            small.append(more)
+        else:
+            large.append(more)
+
+    # Anything left over is 1 up to rounding
+    return probability, alias
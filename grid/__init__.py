@@ -0,0 +1,7 @@
+from .connectivity import Connectivity, analyze_connectivity
+from .model import Grid
+from .readers import GRID_FORMATS, LoadedGrid, load_grid
+from .stations import StationIndex
+from .storage import convert_grid, open_grid, save_grid
+from .validation import ValidationCode, ValidationReport, validate_grid
+from .zones import ZoneLayout
@@ -0,0 +1,353 @@
+"""
+Connectivity of a grid layout for the skycars running on top of it.
+
+Skycars can drive over every cell except the TC obstacles (2 and 3), moving between
+horizontally or vertically adjacent cells. The drivable cells are split into connected
+regions, which show the stations that skycars cannot bring bins to and the regions that
+cannot reach any station. Breadth-first distance fields from every station give the
+number of moves from every cell to the station, for other tools to reuse, and a single
+search from all stations at once gives the number of moves to the nearest one.
+
+`BandedConnectivity` finds the same regions one band of rows at a time, for the checks
+of `validate_grid` on grids too large to label at once, e.g. memory-mapped ones.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from functools import cached_property
+from typing import Iterator
+
+import numpy
+from scipy import ndimage
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import breadth_first_order, connected_components, dijkstra
+
+from instrumentation import timed
+from .model import BAND_CELLS, Grid
+
+# Distance of the cells that cannot reach a station
+UNREACHABLE = -1
+
+
+class _Regions(ABC):
+    """
+    Base class of the connected regions of a grid.
+
+    Subclasses define `station_regions`, `storage_regions` and `first_cells`, from
+    which the regions cut off by TC obstacles are found.
+    """
+
+    station_regions: numpy.ndarray
+
+    @abstractmethod
+    def storage_regions(self) -> numpy.ndarray:
+        """
+        Return the labels of the regions with storage, i.e. empty cells (0) where bins
+        are stacked.
+        """
+
+    @abstractmethod
+    def first_cells(self, labels: numpy.ndarray) -> numpy.ndarray:
+        """
+        Return the (y, x) coordinates of the first cell in row-major order of every
+        region of the labels.
+        """
+
+    def isolated_regions(self) -> numpy.ndarray:
+        """
+        Return the labels of the regions with storage but without any station, from
+        which no bin can be brought to a station.
+        """
+        labels = self.storage_regions()
+        return labels[~numpy.isin(labels, self.station_regions)]
+
+    def unreachable_stations(self) -> numpy.ndarray:
+        """
+        Return the mask of the stations, in the order of the station index, whose
+        region has no storage, so that no bin can be brought to them.
+        """
+        return ~numpy.isin(self.station_regions, self.storage_regions())
+
+
+class Connectivity(_Regions):
+    """
+    The connected regions of the drivable cells of a grid.
+
+    Parameters
+    ----------
+    grid_data : Grid
+        The grid
+
+    Attributes
+    ----------
+    labels : numpy.ndarray
+        2D array of the region of every cell from 1, or 0 for TC obstacles
+    count : int
+        The number of regions
+    """
+
+    def __init__(self, grid_data: Grid):
+        self.grid = Grid.coerce(grid_data)
+        self.drivable = ~self.grid.tc_obstacle_mask()
+        self.labels, self.count = ndimage.label(self.drivable)
+
+    @cached_property
+    def station_regions(self) -> numpy.ndarray:
+        """
+        The region of every station, in the order of the station index of the grid.
+        """
+        return self.labels[tuple(self.grid.stations.coordinates.T)]
+
+    def region_sizes(self) -> numpy.ndarray:
+        """
+        Return the number of cells of every region, indexed by label (0 is unused).
+        """
+        return numpy.bincount(self.labels.ravel(), minlength=self.count + 1)
+
+    def storage_regions(self) -> numpy.ndarray:
+        """
+        Return the labels of the regions with storage, i.e. empty cells (0) where bins
+        are stacked.
+        """
+        return numpy.unique(self.labels[self.grid.codes == Grid.EMPTY])
+
+    def first_cells(self, labels: numpy.ndarray) -> numpy.ndarray:
+        """
+        Return the (y, x) coordinates of the first cell in row-major order of every
+        region of the labels.
+        """
+        # Label 0 is missing when there are no TC obstacles, so look the labels up
+        unique, first = numpy.unique(self.labels.ravel(), return_index=True)
+        first = first[numpy.searchsorted(unique, labels)]
+        return numpy.stack(numpy.unravel_index(first, self.grid.shape), axis=1)
+
+    @cached_property
+    def _graph(self) -> tuple[csr_matrix, numpy.ndarray, numpy.ndarray]:
+        # Nodes are the drivable cells, numbered in row-major order, with the colour of
+        # their cell on a checkerboard
+        nodes = numpy.full(self.grid.shape, -1, dtype=numpy.int64)
+        nodes[self.drivable] = numpy.arange(self.drivable.sum())
+        y, x = numpy.nonzero(self.drivable)
+        colors = ((y + x) & 1).astype(numpy.int8)
+
+        edges = []
+        for a, b in (
+            (nodes[:, :-1], nodes[:, 1:]),
+            (nodes[:-1, :], nodes[1:, :]),
+        ):
+            is_edge = (a >= 0) & (b >= 0)
+            # Both directions, so that searches need not symmetrize the graph
+            edges.append(numpy.stack([a[is_edge], b[is_edge]]))
+            edges.append(numpy.stack([b[is_edge], a[is_edge]]))
+        rows, cols = numpy.concatenate(edges, axis=1)
+
+        size = int(self.drivable.sum())
+        # Float weights, which the searches would otherwise convert on every call
+        graph = csr_matrix((numpy.ones(len(rows)), (rows, cols)), shape=(size, size))
+
+        return graph, nodes, colors
+
+    @timed("distance_fields")
+    def distance_fields(self) -> numpy.ndarray:
+        """
+        Return the distance field of every station, in the order of the station index.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of shape (N, y, x) of the least number of moves from every cell to
+            the station, or `UNREACHABLE` for TC obstacles and cells of other regions.
+        """
+        fields = numpy.full(
+            (len(self.grid.stations), *self.grid.shape), UNREACHABLE, dtype=numpy.int32
+        )
+        # The row-major indices of the drivable cells, which scatter faster than a mask
+        cells = numpy.flatnonzero(self.drivable)
+        for field, distances in zip(fields, self.iter_station_distances()):
+            field.ravel()[cells] = distances
+
+        return fields
+
+    def iter_station_distances(self) -> Iterator[numpy.ndarray]:
+        """
+        Yield the distances from every drivable cell, in row-major order, to every
+        station in the order of the station index, one station at a time so that
+        large grids do not hold all of the distance fields at once.
+        """
+        graph, nodes, colors = self._graph
+        for source in nodes[tuple(self.grid.stations.coordinates.T)].tolist():
+            yield _bfs_distances(graph, source, colors=colors)
+
+    @timed("nearest_station_distances")
+    def nearest_station_distances(self) -> numpy.ndarray:
+        """
+        Return the least number of moves from every drivable cell, in row-major order,
+        to any station, or `UNREACHABLE` for the cells of regions without a station.
+        """
+        graph, nodes, _ = self._graph
+        sources = nodes[tuple(self.grid.stations.coordinates.T)]
+        distances = numpy.full(graph.shape[0], UNREACHABLE, dtype=numpy.int32)
+        if len(sources) == 0:
+            return distances
+
+        # One search from all of the stations, keeping the least distance of every node
+        found = dijkstra(
+            graph, directed=True, indices=sources, unweighted=True, min_only=True
+        )
+        is_reachable = numpy.isfinite(found)
+        distances[is_reachable] = found[is_reachable]
+
+        return distances
+
+
+class BandedConnectivity(_Regions):
+    """
+    The connected regions of the drivable cells of a grid, labelled one band of rows at
+    a time, so that only a band is ever held in memory.
+
+    Every band is labelled on its own and the regions that touch across the boundary
+    of two bands are then merged. The regions are numbered like the labels of
+    `Connectivity`, from 1 in the row-major order of their first cell, but the labels
+    of the cells are not kept.
+
+    Parameters
+    ----------
+    grid_data : Grid
+        The grid
+    band_cells : int, optional
+        The number of cells per band, by default `BAND_CELLS`
+
+    Attributes
+    ----------
+    count : int
+        The number of regions
+    station_regions : numpy.ndarray
+        The region of every station, in the order of the station index of the grid
+    """
+
+    def __init__(self, grid_data: Grid, band_cells: int = BAND_CELLS):
+        self.grid = Grid.coerce(grid_data)
+        stations = self.grid.stations.coordinates
+        width = self.grid.shape[1]
+
+        # The labels of every band are numbered on from those of the bands above it
+        count = 0
+        station_labels = numpy.zeros(len(stations), dtype=numpy.int64)
+        storage_labels, first_cells, joined = [], [], []
+        last_row = None
+        for rows in self.grid.row_slices(band_cells=band_cells):
+            labels, band_count = ndimage.label(~self.grid.tc_obstacle_mask(rows))
+
+            first_row = _offset_labels(labels[0], count)
+            if last_row is not None:
+                is_joined = (last_row > 0) & (first_row > 0)
+                joined.append(numpy.stack([last_row[is_joined], first_row[is_joined]]))
+            last_row = _offset_labels(labels[-1], count)
+
+            has_storage = numpy.zeros(band_count + 1, dtype=bool)
+            has_storage[labels[self.grid.codes[rows] == Grid.EMPTY]] = True
+            storage_labels.append(numpy.flatnonzero(has_storage[1:]) + count + 1)
+
+            # Labels are numbered in the row-major order of their first cell, which is
+            # wherever the running maximum of the labels increases
+            running_max = numpy.maximum.accumulate(labels.ravel())
+            first_cells.append(
+                numpy.flatnonzero(numpy.diff(running_max, prepend=0))
+                + rows.start * width
+            )
+
+            in_band = (stations[:, 0] >= rows.start) & (stations[:, 0] < rows.stop)
+            station_labels[in_band] = _offset_labels(
+                labels[stations[in_band, 0] - rows.start, stations[in_band, 1]], count
+            )
+
+            count += band_count
+
+        # The regions are the components of the graph of the labels that touch, where
+        # label 0 (TC obstacles) stays on its own
+        above, below = (
+            numpy.concatenate(joined, axis=1)
+            if joined
+            else numpy.empty((2, 0), dtype=numpy.int64)
+        )
+        graph = csr_matrix(
+            (numpy.ones(len(above), dtype=numpy.int8), (above, below)),
+            shape=(count + 1, count + 1),
+        )
+        component_count, components = connected_components(graph, directed=False)
+
+        # Numbered by their first cell, with the component of label 0 first
+        first = numpy.full(component_count, numpy.iinfo(numpy.int64).max)
+        if count > 0:
+            numpy.minimum.at(first, components[1:], numpy.concatenate(first_cells))
+        first[components[0]] = -1
+        order = numpy.argsort(first, kind="stable")
+        regions = numpy.empty(component_count, dtype=numpy.int64)
+        regions[order] = numpy.arange(component_count)
+
+        self.count = component_count - 1
+        self._regions = regions[components]
+        self._first_cells = first[order][1:]
+        self._storage_regions = numpy.unique(
+            self._regions[numpy.concatenate(storage_labels)]
+        )
+        self.station_regions = self._regions[station_labels]
+
+    def storage_regions(self) -> numpy.ndarray:
+        """
+        Return the labels of the regions with storage, i.e. empty cells (0) where bins
+        are stacked.
+        """
+        return self._storage_regions
+
+    def first_cells(self, labels: numpy.ndarray) -> numpy.ndarray:
+        """
+        Return the (y, x) coordinates of the first cell in row-major order of every
+        region of the labels.
+        """
+        return numpy.stack(
+            numpy.unravel_index(
+                self._first_cells[numpy.asarray(labels) - 1], self.grid.shape
+            ),
+            axis=1,
+        )
+
+
+def _offset_labels(labels: numpy.ndarray, offset: int) -> numpy.ndarray:
+    # The labels of some cells of a band as numbered across the bands, 0 staying 0
+    return numpy.where(labels > 0, labels.astype(numpy.int64) + offset, 0)
+
+
+def _bfs_distances(
+    graph: csr_matrix, source: int, colors: numpy.ndarray
+) -> numpy.ndarray:
+    """
+    Return the number of edges from the source to every node of the grid graph, or
+    `UNREACHABLE`, from the checkerboard colours of the nodes.
+    """
+    order = breadth_first_order(graph, source, directed=True, return_predecessors=False)
+
+    # The search runs in C but only gives the order of the nodes, which come in order
+    # of depth. Every move goes to a cell of the other colour, so all nodes of a depth
+    # share a colour and the next depth starts wherever the colour changes
+    ordered_colors = colors[order]
+    depths = numpy.zeros(len(order), dtype=numpy.int32)
+    numpy.cumsum(ordered_colors[1:] != ordered_colors[:-1], out=depths[1:])
+
+    distances = numpy.full(graph.shape[0], UNREACHABLE, dtype=numpy.int32)
+    distances[order] = depths
+
+    return distances
+
+
+@timed("connectivity")
+def analyze_connectivity(grid_data: Grid) -> Connectivity:
+    return Connectivity(grid_data)
+
+
+@timed("banded_connectivity")
+def analyze_banded_connectivity(
+    grid_data: Grid, band_cells: int = BAND_CELLS
+) -> BandedConnectivity:
+    return BandedConnectivity(grid_data, band_cells=band_cells)
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import hashlib
+from functools import cached_property
+from typing import Iterator
+
+import numpy
+import pandas
+
+from .stations import StationIndex
+
+EXCEL_OPTIONS = [0, 1, 2, 3]
+MIN_STATION_VALUE = 10
+# Cells processed at once, in bands of whole rows, by the row-band methods, so that
+# large grids, e.g. memory-mapped ones, are never converted or masked as a whole
+BAND_CELLS = 1 << 20
+
+
+class Grid:
+    """
+    Compact representation of a grid layout.
+
+    Every cell holds a uint8 code: 0 for empty spaces, 1 for SM obstacles, 2 for TC
+    obstacles, 3 for SM + TC obstacles and 4 for stations. The values of the stations
+    (10 and above) are kept in a side table of coordinates and values, so the grid never
+    needs a wider dtype than one byte per cell.
+
+    The codes can be a memory-mapped array (see `grid.storage`), which is used without
+    copying it; the row-band methods only touch the pages of one band at a time.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        2D array of cell codes, indexed by (y, x)
+    station_coordinates : numpy.ndarray, optional
+        Array of shape (N, 2) of the (y, x) coordinates of the stations in row-major
+        order, by default derived from the station codes
+    station_values : numpy.ndarray, optional
+        Array of shape (N,) of the values of the stations, by default 10 for each
+    coerced_coordinates : numpy.ndarray, optional
+        Array of shape (M, 2) of the (y, x) coordinates of invalid inputs that were
+        changed to 3 - SM & TC obstacles, by default none
+    """
+
+    EMPTY = 0
+    SM_OBSTACLE = 1
+    TC_OBSTACLE = 2
+    SM_TC_OBSTACLE = 3
+    STATION = 4
+
+    def __init__(
+        self,
+        codes: numpy.ndarray,
+        station_coordinates: numpy.ndarray | None = None,
+        station_values: numpy.ndarray | None = None,
+        coerced_coordinates: numpy.ndarray | None = None,
+    ):
+        self.codes = numpy.asarray(codes, dtype=numpy.uint8)
+
+        if station_coordinates is None:
+            station_coordinates = self._band_coordinates(
+                lambda codes: codes == self.STATION
+            )
+        self.station_coordinates = numpy.asarray(
+            station_coordinates, dtype=numpy.int32
+        ).reshape(-1, 2)
+
+        if station_values is None:
+            station_values = numpy.full(
+                len(self.station_coordinates), MIN_STATION_VALUE
+            )
+        self.station_values = numpy.asarray(station_values, dtype=numpy.int32)
+
+        if coerced_coordinates is None:
+            coerced_coordinates = numpy.empty((0, 2))
+        self.coerced_coordinates = numpy.asarray(
+            coerced_coordinates, dtype=numpy.int32
+        ).reshape(-1, 2)
+
+    @classmethod
+    def from_array(
+        cls, values: numpy.ndarray, out: numpy.ndarray | None = None
+    ) -> Grid:
+        """
+        Create a grid from an array of cell values.
+
+        Values of 0 to 3 and integers from 10 upwards (stations) are kept as they are;
+        blank cells and any other input are changed to 3 - SM & TC obstacles.
+
+        The values are converted in row bands, so a memory-mapped array of values is
+        never converted as a whole. The codes are written to out if given, e.g. a
+        memory-mapped uint8 array of the same shape, and otherwise to a new array.
+        """
+        values = numpy.asarray(values)
+        if values.ndim != 2:
+            raise ValueError(f"Grid must be 2D, got {values.ndim} dimensions.")
+
+        codes = out if out is not None else numpy.empty(values.shape, numpy.uint8)
+        station_coordinates, station_values, coerced_coordinates = [], [], []
+        for rows in row_slices(values.shape):
+            band = values[rows].astype(numpy.float64)
+            is_station = (band >= MIN_STATION_VALUE) & (band % 1 == 0)
+            is_option = numpy.isin(band, EXCEL_OPTIONS)
+            is_coerced = ~(is_station | is_option)
+
+            codes[rows] = numpy.where(is_option, band, cls.SM_TC_OBSTACLE)
+            codes[rows][is_station] = cls.STATION
+
+            offset = numpy.array([rows.start, 0])
+            station_coordinates.append(numpy.argwhere(is_station) + offset)
+            station_values.append(band[is_station])
+            coerced_coordinates.append(numpy.argwhere(is_coerced) + offset)
+
+        return cls(
+            codes=codes,
+            station_coordinates=_concatenate_coordinates(station_coordinates),
+            station_values=numpy.concatenate([numpy.empty(0), *station_values]),
+            coerced_coordinates=_concatenate_coordinates(coerced_coordinates),
+        )
+
+    @classmethod
+    def from_dataframe(cls, grid_data: pandas.DataFrame) -> Grid:
+        return cls.from_array(
+            grid_data.apply(lambda x: pandas.to_numeric(x, errors="coerce"))
+        )
+
+    @classmethod
+    def coerce(cls, grid_data: Grid | pandas.DataFrame | numpy.ndarray) -> Grid:
+        """
+        Return the grid as is, or create one from a DataFrame or an array of values.
+        """
+        if isinstance(grid_data, Grid):
+            return grid_data
+        if isinstance(grid_data, pandas.DataFrame):
+            return cls.from_dataframe(grid_data)
+
+        return cls.from_array(grid_data)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.codes.shape
+
+    @cached_property
+    def stations(self) -> StationIndex:
+        """
+        The index of the stations, built once from the station side table.
+        """
+        return StationIndex(
+            values=self.station_values, coordinates=self.station_coordinates
+        )
+
+    def content_hash(self) -> str:
+        """
+        Return a hash of the shape, codes and stations of the grid, e.g. to key caches.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(numpy.asarray(self.shape, dtype=numpy.int64).tobytes())
+        # Band by band, which hashes the same bytes as the whole array at once
+        for rows in self.row_slices():
+            digest.update(numpy.ascontiguousarray(self.codes[rows]).data)
+        digest.update(self.station_coordinates.tobytes())
+        digest.update(self.station_values.tobytes())
+
+        return digest.hexdigest()
+
+    def row_slices(self, band_cells: int = BAND_CELLS) -> Iterator[slice]:
+        """
+        Yield the slices of the rows of every band of about band_cells cells, top to
+        bottom.
+        """
+        return row_slices(self.shape, band_cells=band_cells)
+
+    def sm_obstacle_mask(self, rows: slice = slice(None)) -> numpy.ndarray:
+        """
+        Return the mask of the SM obstacles, i.e. cells of 1 or 3, or of a band of rows
+        of them.
+        """
+        return (self.codes[rows] & self.SM_OBSTACLE).astype(bool)
+
+    def tc_obstacle_mask(self, rows: slice = slice(None)) -> numpy.ndarray:
+        """
+        Return the mask of the TC obstacles, i.e. cells of 2 or 3, or of a band of rows
+        of them.
+        """
+        return (self.codes[rows] & self.TC_OBSTACLE).astype(bool)
+
+    def sm_obstacle_coordinates(self) -> numpy.ndarray:
+        """
+        Return the (y, x) coordinates of the SM obstacles in row-major order, found band
+        by band.
+        """
+        return self._band_coordinates(lambda codes: codes & self.SM_OBSTACLE)
+
+    def tc_obstacle_coordinates(self) -> numpy.ndarray:
+        """
+        Return the (y, x) coordinates of the TC obstacles in row-major order, found band
+        by band.
+        """
+        return self._band_coordinates(lambda codes: codes & self.TC_OBSTACLE)
+
+    def _band_coordinates(self, condition) -> numpy.ndarray:
+        # The coordinates where the condition of the codes holds, one band at a time
+        return _concatenate_coordinates(
+            [
+                numpy.argwhere(condition(self.codes[rows])) + [rows.start, 0]
+                for rows in self.row_slices()
+            ]
+        )
+
+    def to_array(
+        self, rows: slice = slice(None), cols: slice = slice(None)
+    ) -> numpy.ndarray:
+        """
+        Return the cell values, or a viewport of them, with stations holding their
+        values again.
+        """
+        y_range = range(self.shape[0])[rows]
+        x_range = range(self.shape[1])[cols]
+        values = self.codes[rows, cols].astype(numpy.int32)
+
+        is_inside = self._is_inside(y_range, x_range)
+        stations = self.station_coordinates[is_inside]
+        values[stations[:, 0] - y_range.start, stations[:, 1] - x_range.start] = (
+            self.station_values[is_inside]
+        )
+
+        return values
+
+    def to_dataframe(
+        self, rows: slice = slice(None), cols: slice = slice(None)
+    ) -> pandas.DataFrame:
+        """
+        Return the cell values, or a viewport of them, as a DataFrame indexed by y and
+        with columns of x.
+        """
+        y_range = range(self.shape[0])[rows]
+        x_range = range(self.shape[1])[cols]
+
+        return pandas.DataFrame(
+            self.to_array(rows, cols), index=y_range, columns=x_range
+        )
+
+    def with_values(self, y: int, x: int, values: numpy.ndarray) -> Grid:
+        """
+        Return a new grid with a block of values written at (y, x), e.g. the result of
+        editing a viewport.
+
+        Only the block is converted from values; the codes of the rest of the grid are
+        copied as they are, one byte per cell.
+        """
+        block = Grid.from_array(values)
+        y_range = range(self.shape[0])[y : y + block.shape[0]]
+        x_range = range(self.shape[1])[x : x + block.shape[1]]
+        if (len(y_range), len(x_range)) != block.shape:
+            raise ValueError(
+                f"Block of shape {block.shape} at ({y}, {x}) exceeds the grid of "
+                + f"shape {self.shape}."
+            )
+
+        codes = numpy.array(self.codes)
+        codes[y_range.start : y_range.stop, x_range.start : x_range.stop] = block.codes
+
+        # The stations of the block replace those that were inside it, in row-major
+        # order like the stations found in codes
+        is_outside = ~self._is_inside(y_range, x_range)
+        station_coordinates = numpy.concatenate(
+            [self.station_coordinates[is_outside], block.station_coordinates + [y, x]]
+        )
+        station_values = numpy.concatenate(
+            [self.station_values[is_outside], block.station_values]
+        )
+        order = numpy.lexsort((station_coordinates[:, 1], station_coordinates[:, 0]))
+
+        # The rest of the grid holds valid values only, so only the block is coerced
+        return Grid(
+            codes=codes,
+            station_coordinates=station_coordinates[order],
+            station_values=station_values[order],
+            coerced_coordinates=block.coerced_coordinates + [y, x],
+        )
+
+    def _is_inside(self, y_range: range, x_range: range) -> numpy.ndarray:
+        # The mask of the stations inside a viewport
+        y, x = self.station_coordinates.T
+        return (
+            (y >= y_range.start)
+            & (y < y_range.stop)
+            & (x >= x_range.start)
+            & (x < x_range.stop)
+        )
+
+
+def row_slices(shape: tuple[int, int], band_cells: int = BAND_CELLS) -> Iterator[slice]:
+    """
+    Yield the slices of the rows of every band of an array of the shape, top to bottom,
+    with as many whole rows per band as fit in band_cells cells (and at least one).
+    """
+    rows, cols = shape
+    band_rows = max(1, band_cells // max(cols, 1))
+    for start in range(0, rows, band_rows):
+        yield slice(start, min(start + band_rows, rows))
+
+
+def _concatenate_coordinates(coordinates: list[numpy.ndarray]) -> numpy.ndarray:
+    return numpy.concatenate([numpy.empty((0, 2), dtype=numpy.int32), *coordinates])
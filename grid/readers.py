@@ -0,0 +1,271 @@
+"""
+Reading grids from Excel, CSV, Parquet and NumPy .npy files.
+
+Every reader loads the cells straight into a float array for `Grid.from_array`, where
+blank cells and text are NaN (and so changed to 3 - SM & TC obstacles). The format is
+detected from the file name, or from the first bytes of the content when there is none.
+Excel files are read with the calamine engine when python-calamine is installed, and
+otherwise streamed with openpyxl in read-only mode. .npy files are memory-mapped and
+converted band by band, and the codes of stored grids (see `grid.storage`) are opened
+memory-mapped as they are.
+"""
+
+from __future__ import annotations
+
+import io
+import time
+from pathlib import Path
+from typing import IO
+
+import numpy
+import pandas
+
+from instrumentation import timed
+from .model import Grid
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+GRID_FORMATS = {
+    ".xlsx": "xlsx",
+    ".xlsm": "xlsx",
+    ".xls": "xls",
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".npy": "npy",
+}
+
+# Leading bytes of the binary formats; anything else is read as CSV
+MAGIC_NUMBERS = {
+    b"PK\x03\x04": "xlsx",
+    b"\xd0\xcf\x11\xe0": "xls",
+    b"PAR1": "parquet",
+    b"\x93NUMPY": "npy",
+}
+
+
+class LoadedGrid:
+    """
+    A grid read from a file, with how and how fast it was read.
+
+    Parameters
+    ----------
+    grid : Grid
+        The grid
+    format : str
+        The format of the file, one of the values of `GRID_FORMATS`
+    engine : str
+        The library that parsed the file
+    seconds : float
+        The time taken to read and convert the file
+    """
+
+    def __init__(self, grid: Grid, format: str, engine: str, seconds: float):
+        self.grid = grid
+        self.format = format
+        self.engine = engine
+        self.seconds = seconds
+
+
+def detect_format(name: str | Path | None = None, head: bytes = b"") -> str:
+    """
+    Return the format of a grid file from its name, or else from its first bytes.
+    """
+    if name is not None:
+        suffix = Path(name).suffix.lower()
+        if suffix in GRID_FORMATS:
+            return GRID_FORMATS[suffix]
+
+    for magic_number, format in MAGIC_NUMBERS.items():
+        if head.startswith(magic_number):
+            return format
+
+    return "csv"
+
+
+@timed("load_grid")
+def load_grid(
+    source: str | Path | bytes,
+    format: str | None = None,
+    name: str | None = None,
+) -> LoadedGrid:
+    """
+    Read a grid that has no header row from a file name or the bytes of a file.
+
+    Parameters
+    ----------
+    source : str | Path | bytes
+        The file name, or the content of the file, e.g. an upload
+    format : str, optional
+        One of the values of `GRID_FORMATS`, by default detected from the name of the
+        file and its content
+    name : str, optional
+        The original file name of the content, to detect the format from
+
+    Returns
+    -------
+    LoadedGrid
+        The grid, with the format, engine and time taken.
+    """
+    start = time.perf_counter()
+    if not isinstance(source, bytes) and format in (None, "npy"):
+        from .storage import is_stored_grid, open_grid
+
+        if is_stored_grid(source):
+            return LoadedGrid(
+                grid=open_grid(source),
+                format="npy",
+                engine="numpy (memory-mapped)",
+                seconds=time.perf_counter() - start,
+            )
+
+    values, format, engine = read_values(source, format=format, name=name)
+    grid = Grid.from_array(values)
+
+    return LoadedGrid(
+        grid=grid, format=format, engine=engine, seconds=time.perf_counter() - start
+    )
+
+
+def read_values(
+    source: str | Path | bytes,
+    format: str | None = None,
+    name: str | None = None,
+) -> tuple[numpy.ndarray, str, str]:
+    """
+    Read the cells of a file without a header row as floats, e.g. for a layer of the
+    grid such as its zone labels.
+
+    See `load_grid` for the parameters.
+
+    Returns
+    -------
+    tuple[numpy.ndarray, str, str]
+        The values, with anything that is not a number as NaN, the format of the file
+        and the engine that parsed it. The values of .npy files are memory-mapped as
+        they are stored.
+    """
+    if isinstance(source, bytes):
+        file = io.BytesIO(source)
+        head = source[:8]
+    else:
+        name = name or source
+        file = Path(source)
+        with open(file, "rb") as handle:
+            head = handle.read(8)
+
+    format = format or detect_format(name, head)
+    if format not in GRID_FORMATS.values():
+        raise ValueError(
+            f"{format=}; must be one of {', '.join(set(GRID_FORMATS.values()))}."
+        )
+
+    values, engine = READERS[format](file)
+
+    return values, format, engine
+
+
+def _read_xlsx(file: Path | IO[bytes]) -> tuple[numpy.ndarray, str]:
+    if python_calamine is not None:
+        frame = pandas.read_excel(file, header=None, engine="calamine")
+        return _frame_values(frame), "calamine"
+
+    import openpyxl
+
+    # Read-only mode streams the rows of the sheet instead of loading its whole
+    # object model
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = list(workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+    return _rows_values(rows), "openpyxl (read-only)"
+
+
+def _read_xls(file: Path | IO[bytes]) -> tuple[numpy.ndarray, str]:
+    engine = "calamine" if python_calamine is not None else None
+    frame = pandas.read_excel(file, header=None, engine=engine)
+
+    return _frame_values(frame), engine or "xlrd"
+
+
+def _read_csv(file: Path | IO[bytes]) -> tuple[numpy.ndarray, str]:
+    engine = "pyarrow" if pyarrow is not None else "c"
+    try:
+        frame = pandas.read_csv(file, header=None, engine=engine)
+    except ValueError:
+        # The pyarrow engine rejects rows of different lengths, which the C engine pads
+        if engine == "c":
+            raise
+        if not isinstance(file, Path):
+            file.seek(0)
+        engine = "c"
+        frame = pandas.read_csv(file, header=None, engine=engine)
+
+    return _frame_values(frame), engine
+
+
+def _read_parquet(file: Path | IO[bytes]) -> tuple[numpy.ndarray, str]:
+    return _frame_values(pandas.read_parquet(file)), "pyarrow"
+
+
+def _read_npy(file: Path | IO[bytes]) -> tuple[numpy.ndarray, str]:
+    # Files are memory-mapped, for Grid.from_array to convert them band by band
+    mmap_mode = "r" if isinstance(file, Path) else None
+    return numpy.load(file, mmap_mode=mmap_mode, allow_pickle=False), "numpy"
+
+
+READERS = {
+    "xlsx": _read_xlsx,
+    "xls": _read_xls,
+    "csv": _read_csv,
+    "parquet": _read_parquet,
+    "npy": _read_npy,
+}
+
+
+def _frame_values(frame: pandas.DataFrame) -> numpy.ndarray:
+    """
+    Return the cells of a DataFrame as floats, with anything that is not a number as
+    NaN.
+    """
+    if all(pandas.api.types.is_numeric_dtype(dtype) for dtype in frame.dtypes):
+        return frame.to_numpy(dtype=numpy.float64, na_value=numpy.nan)
+
+    return _object_values(frame.to_numpy(dtype=object))
+
+
+def _rows_values(rows: list[tuple]) -> numpy.ndarray:
+    """
+    Return the rows of cells of a sheet as floats, without the trailing blank rows and
+    columns that spreadsheets tend to report.
+    """
+    width = max((len(row) for row in rows), default=0)
+    values = numpy.full((len(rows), width), None, dtype=object)
+    for i, row in enumerate(rows):
+        values[i, : len(row)] = row
+
+    is_blank = values == None  # noqa: E711; element-wise comparison
+    filled_rows = numpy.flatnonzero(~is_blank.all(axis=1))
+    filled_cols = numpy.flatnonzero(~is_blank.all(axis=0))
+    if len(filled_rows) == 0:
+        return numpy.empty((0, 0))
+
+    return _object_values(values[: filled_rows[-1] + 1, : filled_cols[-1] + 1])
+
+
+def _object_values(values: numpy.ndarray) -> numpy.ndarray:
+    # A single conversion of all cells, instead of one per column
+    numbers = pandas.to_numeric(
+        pandas.Series(values.ravel()), errors="coerce"
+    ).to_numpy(dtype=numpy.float64, na_value=numpy.nan)
+
+    return numbers.reshape(values.shape)
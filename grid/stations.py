@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import numpy
+
+
+class StationIndex:
+    """
+    Index of the stations of a grid, sorted by station value.
+
+    A station value is made of the station id followed by its role as the last digit:
+    0 for a mixed drop and pick station, 1 for a drop station and 2 for a pick station,
+    e.g. 21 and 22 are the drop and pick stations of station id 2.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Array of shape (N,) of the station values
+    coordinates : numpy.ndarray
+        Array of shape (N, 2) of the (y, x) coordinates of the stations
+    """
+
+    MIXED = 0
+    DROP = 1
+    PICK = 2
+
+    def __init__(self, values: numpy.ndarray, coordinates: numpy.ndarray):
+        values = numpy.asarray(values, dtype=numpy.int32)
+        coordinates = numpy.asarray(coordinates, dtype=numpy.int32).reshape(-1, 2)
+
+        order = numpy.argsort(values, kind="stable")
+        self.values = values[order]
+        self.coordinates = coordinates[order]
+        self.ids = self.values // 10
+        self.roles = self.values % 10
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def mixed_ids(self) -> numpy.ndarray:
+        return self.ids[self.roles == self.MIXED]
+
+    @property
+    def drop_ids(self) -> numpy.ndarray:
+        return self.ids[self.roles == self.DROP]
+
+    @property
+    def pick_ids(self) -> numpy.ndarray:
+        return self.ids[self.roles == self.PICK]
+
+    def invalid_role_values(self) -> numpy.ndarray:
+        """
+        Return the station values that do not end with 0, 1 or 2.
+        """
+        return self.values[self.roles > self.PICK]
+
+    def duplicated_values(self) -> numpy.ndarray:
+        """
+        Return the station values that appear more than once.
+        """
+        is_duplicate = self.values[1:] == self.values[:-1]
+        return numpy.unique(self.values[1:][is_duplicate])
+
+    def conflicting_mixed_ids(self) -> numpy.ndarray:
+        """
+        Return the ids of mixed stations that are also used by drop or pick stations.
+        """
+        return numpy.intersect1d(
+            self.mixed_ids, numpy.concatenate([self.drop_ids, self.pick_ids])
+        )
+
+    def unpaired_ids(self) -> numpy.ndarray:
+        """
+        Return the ids of drop stations without a pick station and vice versa.
+        """
+        return numpy.setxor1d(self.drop_ids, self.pick_ids)
@@ -0,0 +1,133 @@
+"""
+Grids backed by memory-mapped .npy files, for layouts too large to hold in memory.
+
+A stored grid is the .npy file of its codes, one byte per cell, with a small .npz side
+table of its stations and coerced cells next to it. Opening the grid maps the codes
+instead of reading them, and the row-band methods of `Grid` (used by the input
+creation) only touch the pages of one band at a time, so memory stays flat however
+large the grid is.
+
+    grid_data = convert_grid("site.xlsx", "site.npy")  # or save_grid(grid_data, ...)
+    grid_data = open_grid("site.npy")
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy
+
+from instrumentation import timed
+from .model import Grid
+from .readers import read_values
+
+SIDE_TABLE_SUFFIX = ".stations.npz"
+
+
+def side_table_path(path: str | Path) -> Path:
+    """
+    Return the path of the side table of a stored grid, e.g. grid.stations.npz for
+    grid.npy.
+    """
+    return Path(path).with_suffix(SIDE_TABLE_SUFFIX)
+
+
+def is_stored_grid(path: str | Path) -> bool:
+    """
+    Return whether the file is the codes of a stored grid, rather than cell values.
+    """
+    return Path(path).suffix.lower() == ".npy" and side_table_path(path).exists()
+
+
+def save_grid(grid_data: Grid, path: str | Path) -> Path:
+    """
+    Write the codes of the grid to a .npy file, band by band, and its side table next
+    to it.
+    """
+    path = Path(path)
+    codes = numpy.lib.format.open_memmap(
+        path, mode="w+", dtype=numpy.uint8, shape=grid_data.shape
+    )
+    for rows in grid_data.row_slices():
+        codes[rows] = grid_data.codes[rows]
+    codes.flush()
+    del codes
+
+    _save_side_table(grid_data, path)
+
+    return path
+
+
+@timed("convert_grid")
+def convert_grid(
+    source: str | Path,
+    path: str | Path,
+    format: str | None = None,
+) -> Grid:
+    """
+    Convert a grid file of cell values, in any of the formats of grids, to a stored
+    grid and open it.
+
+    The codes are written straight to the memory-mapped file band by band, and .npy
+    files of values are themselves read memory-mapped.
+    """
+    values, _, _ = read_values(source, format=format)
+
+    path = Path(path)
+    codes = numpy.lib.format.open_memmap(
+        path, mode="w+", dtype=numpy.uint8, shape=values.shape
+    )
+    grid_data = Grid.from_array(values, out=codes)
+    codes.flush()
+    _save_side_table(grid_data, path)
+    del grid_data, codes
+
+    return open_grid(path)
+
+
+@timed("open_grid")
+def open_grid(path: str | Path, mode: str = "r") -> Grid:
+    """
+    Open a stored grid with its codes memory-mapped.
+
+    Parameters
+    ----------
+    path : str | Path
+        The .npy file of the codes
+    mode : str, optional
+        The `numpy.memmap` mode, by default "r"; "r+" writes changes of the codes back
+        to the file and "c" keeps them in memory
+
+    Returns
+    -------
+    Grid
+        The grid, whose codes are mapped from the file.
+    """
+    codes = numpy.load(path, mmap_mode=mode, allow_pickle=False)
+    if codes.dtype != numpy.uint8 or codes.ndim != 2:
+        raise ValueError(
+            f"{path} holds {codes.ndim}D {codes.dtype} values, not the 2D uint8 codes "
+            + "of a grid."
+        )
+
+    side_table = side_table_path(path)
+    if not side_table.exists():
+        # Stations are then found in the codes, each with the lowest station value
+        return Grid(codes=codes)
+
+    with numpy.load(side_table, allow_pickle=False) as tables:
+        return Grid(
+            codes=codes,
+            station_coordinates=tables["station_coordinates"],
+            station_values=tables["station_values"],
+            coerced_coordinates=tables["coerced_coordinates"],
+        )
+
+
+def _save_side_table(grid_data: Grid, path: Path):
+    numpy.savez(
+        side_table_path(path),
+        station_coordinates=grid_data.station_coordinates,
+        station_values=grid_data.station_values,
+        coerced_coordinates=grid_data.coerced_coordinates,
+    )
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import json
+
+import numpy
+import pandas
+
+from instrumentation import timed
+from .connectivity import analyze_banded_connectivity
+from .model import Grid
+from .stations import StationIndex
+
+
+class ValidationCode:
+    """
+    Codes of the issues found by `validate_grid`.
+    """
+
+    SIZE_EXCEEDED = "size_exceeded"
+    INVALID_VALUE = "invalid_value"
+    NO_STATION = "no_station"
+    INVALID_STATION_ROLE = "invalid_station_role"
+    DUPLICATED_STATION = "duplicated_station"
+    MIXED_STATION_CONFLICT = "mixed_station_conflict"
+    UNPAIRED_STATION = "unpaired_station"
+    UNREACHABLE_STATION = "unreachable_station"
+    ISOLATED_REGION = "isolated_region"
+
+
+ERROR = "error"
+WARNING = "warning"
+
+SEVERITIES = {
+    ValidationCode.SIZE_EXCEEDED: WARNING,
+    ValidationCode.INVALID_VALUE: WARNING,
+    ValidationCode.NO_STATION: WARNING,
+    ValidationCode.INVALID_STATION_ROLE: ERROR,
+    ValidationCode.DUPLICATED_STATION: ERROR,
+    ValidationCode.MIXED_STATION_CONFLICT: ERROR,
+    ValidationCode.UNPAIRED_STATION: ERROR,
+    ValidationCode.UNREACHABLE_STATION: ERROR,
+    ValidationCode.ISOLATED_REGION: WARNING,
+}
+
+MESSAGES = {
+    ValidationCode.SIZE_EXCEEDED: "One of the dimensions exceeds the allowed size "
+    + "of {max_size}.",
+    ValidationCode.INVALID_VALUE: "Grid contains blank cells or invalid inputs; "
+    + "changing these cells to 3 - SM & TC obstacles.",
+    ValidationCode.NO_STATION: "Grid must have at least one station.",
+    ValidationCode.INVALID_STATION_ROLE: "Invalid values for stations detected; make "
+    + "sure the values end with 0, 1 or 2.",
+    ValidationCode.DUPLICATED_STATION: "Duplicated values for stations detected: "
+    + "{values}",
+    ValidationCode.MIXED_STATION_CONFLICT: "Station values that ended with 0 cannot "
+    + "have the same values ended in 1 or 2.",
+    ValidationCode.UNPAIRED_STATION: "Values for stations with missing drop/pick pair "
+    + "detected; make sure the values ended with 1 (drop stations) have to pair with "
+    + "the complementary values that end with 2 (pick stations).",
+    ValidationCode.UNREACHABLE_STATION: "Stations walled in by TC obstacles away from "
+    + "every empty cell detected, so that no bin can be brought to them: {values}",
+    ValidationCode.ISOLATED_REGION: "Empty cells cut off from every station by TC "
+    + "obstacles detected; bins stored there can never be retrieved.",
+}
+
+COLUMNS = ["code", "severity", "y", "x", "value"]
+
+
+class ValidationReport:
+    """
+    The issues found in a grid, one row per offending cell.
+
+    Issues about the grid as a whole (e.g. no station) have no coordinates. The value is
+    the station value for station issues.
+
+    Parameters
+    ----------
+    issues : pandas.DataFrame
+        The issues with the columns "code", "severity", "y", "x" and "value"
+    max_size : int, optional
+        The allowed size of the grid used in messages, by default None
+    """
+
+    def __init__(self, issues: pandas.DataFrame, max_size: int | None = None):
+        self.issues = issues
+        self.max_size = max_size
+
+    @property
+    def is_valid(self) -> bool:
+        return not (self.issues["severity"] == ERROR).any()
+
+    @property
+    def errors(self) -> pandas.DataFrame:
+        return self.issues[self.issues["severity"] == ERROR]
+
+    @property
+    def warnings(self) -> pandas.DataFrame:
+        return self.issues[self.issues["severity"] == WARNING]
+
+    def has(self, code: str) -> bool:
+        return (self.issues["code"] == code).any()
+
+    def messages(self) -> list[tuple[str, str, str]]:
+        """
+        Return one (code, severity, message) per kind of issue found, in the order the
+        checks are run.
+        """
+        messages = []
+        for code, issues in self.issues.groupby("code", sort=False):
+            values = numpy.unique(issues["value"].dropna().to_numpy(dtype=int))
+            messages.append(
+                (
+                    code,
+                    SEVERITIES[code],
+                    MESSAGES[code].format(max_size=self.max_size, values=values),
+                )
+            )
+
+        return messages
+
+    def to_json(self, save: bool = False, filename: str = "validation.json") -> str:
+        json_str = json.dumps(
+            {
+                "is_valid": self.is_valid,
+                "messages": [
+                    {"code": code, "severity": severity, "message": message}
+                    for code, severity, message in self.messages()
+                ],
+                "issues": json.loads(self.issues.to_json(orient="records")),
+            },
+            sort_keys=True,
+            indent=4,
+        )
+
+        if save:
+            with open(filename, "w") as file:
+                file.write(json_str)
+
+        return json_str
+
+
+@timed("validate_grid")
+def validate_grid(
+    grid_data: Grid | pandas.DataFrame | numpy.ndarray, max_size: int | None = None
+) -> ValidationReport:
+    """
+    Check the grid for invalid inputs, invalid stations, and stations or storage cut
+    off from each other by TC obstacles.
+
+    The regions around the TC obstacles are found one band of rows at a time, so that
+    memory-mapped grids are validated without being read into memory whole.
+
+    Parameters
+    ----------
+    grid_data : Grid | pandas.DataFrame | numpy.ndarray
+        The grid, or its cell values; invalid values are changed to 3 - SM & TC
+        obstacles when converting to a grid and reported as warnings
+    max_size : int, optional
+        The allowed number of cells per side, by default unlimited
+
+    Returns
+    -------
+    ValidationReport
+        The issues found.
+    """
+    grid = Grid.coerce(grid_data)
+    stations = grid.stations
+    issues = []
+
+    def add(
+        code: str,
+        coordinates: numpy.ndarray | None = None,
+        values: numpy.ndarray | None = None,
+    ):
+        # Issues about the grid as a whole are a single row without coordinates
+        if coordinates is None:
+            coordinates = numpy.full((1, 2), None)
+        coordinates = numpy.asarray(coordinates).reshape(-1, 2)
+        if values is None:
+            values = numpy.full(len(coordinates), None)
+
+        issues.append(
+            pandas.DataFrame(
+                {
+                    "code": code,
+                    "severity": SEVERITIES[code],
+                    "y": pandas.array(coordinates[:, 0], dtype="Int64"),
+                    "x": pandas.array(coordinates[:, 1], dtype="Int64"),
+                    "value": pandas.array(values, dtype="Int64"),
+                }
+            )
+        )
+
+    def add_stations(code: str, mask: numpy.ndarray):
+        if mask.any():
+            add(code, stations.coordinates[mask], stations.values[mask])
+
+    if max_size is not None and max(grid.shape) > max_size:
+        add(ValidationCode.SIZE_EXCEEDED)
+
+    if len(grid.coerced_coordinates) > 0:
+        add(ValidationCode.INVALID_VALUE, grid.coerced_coordinates)
+
+    if len(stations) == 0:
+        add(ValidationCode.NO_STATION)
+
+    is_drop_or_pick = (stations.roles == StationIndex.DROP) | (
+        stations.roles == StationIndex.PICK
+    )
+    add_stations(
+        ValidationCode.INVALID_STATION_ROLE, stations.roles > StationIndex.PICK
+    )
+    add_stations(
+        ValidationCode.DUPLICATED_STATION,
+        numpy.isin(stations.values, stations.duplicated_values()),
+    )
+    add_stations(
+        ValidationCode.MIXED_STATION_CONFLICT,
+        ((stations.roles == StationIndex.MIXED) | is_drop_or_pick)
+        & numpy.isin(stations.ids, stations.conflicting_mixed_ids()),
+    )
+    add_stations(
+        ValidationCode.UNPAIRED_STATION,
+        is_drop_or_pick & numpy.isin(stations.ids, stations.unpaired_ids()),
+    )
+
+    if len(stations) > 0:
+        connectivity = analyze_banded_connectivity(grid)
+        add_stations(
+            ValidationCode.UNREACHABLE_STATION, connectivity.unreachable_stations()
+        )
+        # One issue per region, at its first cell
+        isolated_regions = connectivity.isolated_regions()
+        if len(isolated_regions) > 0:
+            add(
+                ValidationCode.ISOLATED_REGION,
+                connectivity.first_cells(isolated_regions),
+            )
+
+    issues = (
+        pandas.concat(issues, ignore_index=True)[COLUMNS]
+        if issues
+        else pandas.DataFrame(columns=COLUMNS)
+    )
+
+    return ValidationReport(issues=issues, max_size=max_size)
@@ -0,0 +1,136 @@
+"""
+Zone layouts that split a grid into several zones.
+
+A layout labels every cell with the zone it belongs to, from 1, or 0 for cells outside
+every zone. It is either read from a zone-label layer of the same shape as the grid, or
+split automatically into the regions of the grid that are connected around the walls of
+SM & TC obstacles (3), which are then outside every zone.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy
+from scipy import ndimage
+
+from instrumentation import timed
+from parameters import Parameters
+from .model import Grid
+from .readers import read_values
+
+
+class ZoneLayout:
+    """
+    The zone of every cell of a grid.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        2D array of the zone labels, indexed by (y, x); 0 for cells outside every zone
+        and 1 to N for the N zones
+    names : list[str], optional
+        The names of the zones, by default `Parameters.ZONE_NAME` for a single zone and
+        the zone name followed by the label otherwise, e.g. "C1" and "C2"
+    """
+
+    def __init__(self, labels: numpy.ndarray, names: list[str] | None = None):
+        labels = numpy.asarray(labels)
+        if labels.ndim != 2:
+            raise ValueError(f"Zone labels must be 2D, got {labels.ndim} dimensions.")
+        if (labels < 0).any():
+            raise ValueError("Zone labels must not be negative.")
+        self.labels = labels.astype(numpy.int32)
+
+        count = int(self.labels.max(initial=0))
+        if names is None:
+            names = [f"{Parameters.ZONE_NAME}{label}" for label in range(1, count + 1)]
+            if count == 1:
+                names = [Parameters.ZONE_NAME]
+        if len(names) != count:
+            raise ValueError(f"Got {len(names)} zone names for {count} zones.")
+        self.names = list(names)
+
+    @classmethod
+    @timed("split_zones")
+    def from_components(
+        cls, grid_data: Grid, names: list[str] | None = None, min_cells: int = 1
+    ) -> ZoneLayout:
+        """
+        Split the grid into the regions connected (horizontally or vertically) around
+        the SM & TC obstacles, labelled in row-major order of their first cell.
+
+        Regions of fewer than min_cells cells, e.g. cells walled in by obstacles, are
+        left outside every zone.
+        """
+        grid_data = Grid.coerce(grid_data)
+        labels, count = ndimage.label(grid_data.codes != Grid.SM_TC_OBSTACLE)
+
+        if min_cells > 1:
+            is_kept = numpy.bincount(labels.ravel(), minlength=count + 1) >= min_cells
+            is_kept[0] = False
+            relabel = numpy.zeros(count + 1, dtype=numpy.int32)
+            relabel[is_kept] = numpy.arange(1, is_kept.sum() + 1)
+            labels = relabel[labels]
+
+        return cls(labels, names=names)
+
+    @classmethod
+    def from_file(
+        cls,
+        source: str | Path | bytes,
+        format: str | None = None,
+        name: str | None = None,
+        names: list[str] | None = None,
+    ) -> ZoneLayout:
+        """
+        Read the zone labels from a file without a header row, in any of the formats
+        of grids; blank cells are outside every zone.
+        """
+        values, _, _ = read_values(source, format=format, name=name)
+        values = numpy.nan_to_num(values, nan=0)
+        if (values % 1 != 0).any():
+            raise ValueError("Zone labels must be whole numbers.")
+
+        return cls(values, names=names)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.labels.shape
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def bounding_boxes(self) -> numpy.ndarray:
+        """
+        Return the bounding box of every zone as an array of shape (N, 4) of inclusive
+        ``(x0, y0, x1, y1)`` rectangles, in the order of the labels.
+
+        Zones without any cell have an empty box of (0, 0, -1, -1).
+        """
+        boxes = numpy.tile(
+            numpy.array([0, 0, -1, -1], dtype=numpy.int32), (len(self), 1)
+        )
+        objects = ndimage.find_objects(self.labels, max_label=len(self))
+        for i, box in enumerate(objects):
+            if box is not None:
+                rows, cols = box
+                boxes[i] = cols.start, rows.start, cols.stop - 1, rows.stop - 1
+
+        return boxes
+
+    def cell_counts(self) -> numpy.ndarray:
+        """
+        Return the number of cells of every zone, in the order of the labels.
+        """
+        return numpy.bincount(self.labels.ravel(), minlength=len(self) + 1)[1:]
+
+    def zone_names_at(self, coordinates: numpy.ndarray) -> list[str | None]:
+        """
+        Return the zone names of an array of shape (N, 2) of (y, x) coordinates, with
+        None for cells outside every zone.
+        """
+        coordinates = numpy.asarray(coordinates, dtype=numpy.intp).reshape(-1, 2)
+        labels = self.labels[tuple(coordinates.T)]
+
+        return [self.names[label - 1] if label else None for label in labels.tolist()]
@@ -0,0 +1,155 @@
+"""
+Incremental regeneration of the grid-dependent inputs when a few cells change.
+
+`IncrementalInputs` keeps the void rectangles, SM stacks and TC entries of the last grid
+and, given the next grid, only updates them where the cell codes differ. The inputs it
+returns are always the same as building them from scratch on the new grid.
+"""
+
+from __future__ import annotations
+
+import numpy
+import pandas
+
+from grid import Grid
+from parameters import SimulationParameters
+from .input_sm_obstacles import InputSMObstacles
+from .input_tc_obstacles import InputTCObstacles, format_rows
+from .input_zones import InputZonesAndStations
+from .void_decomposition import decompose_voids, update_decomposition
+
+
+class IncrementalInputs:
+    """
+    The inputs of reset-2, reset-3 and reset-6.json for a grid that is edited.
+
+    Stations are few and always rebuilt from the station index of the grid. The void
+    rectangles are updated locally for the decomposition modes in
+    `void_decomposition.INCREMENTAL_MODES` and decomposed from scratch otherwise.
+
+    Parameters
+    ----------
+    grid_data : Grid | pandas.DataFrame
+        The initial grid
+    decomposition : str, optional
+        How void cells are decomposed into rectangles, by default "greedy"
+    """
+
+    def __init__(
+        self, grid_data: Grid | pandas.DataFrame, decomposition: str = "greedy"
+    ):
+        self.decomposition = decomposition
+        self._rebuild(Grid.coerce(grid_data))
+
+    def _rebuild(self, grid: Grid):
+        self.grid = grid
+        self.void_rectangles = decompose_voids(
+            grid.sm_obstacle_mask(), mode=self.decomposition
+        )
+
+        # Obstacles are kept as sorted row-major cell indices, along with the formatted
+        # TC entries in the same order
+        self._sm_cells = numpy.flatnonzero(grid.sm_obstacle_mask())
+        self._tc_cells = numpy.flatnonzero(grid.tc_obstacle_mask())
+        self._tc_entries = format_rows(
+            numpy.stack(numpy.unravel_index(self._tc_cells, grid.shape), axis=1)
+        )
+
+    def update(self, grid_data: Grid | pandas.DataFrame) -> int:
+        """
+        Update the inputs to the new grid.
+
+        Grids of a different shape are rebuilt from scratch.
+
+        Returns
+        -------
+        int
+            The number of cells whose code changed, or -1 if the grid was rebuilt.
+        """
+        grid = Grid.coerce(grid_data)
+        if grid.shape != self.grid.shape:
+            self._rebuild(grid)
+            return -1
+
+        changed = numpy.flatnonzero(grid.codes != self.grid.codes)
+        old_codes = self.grid.codes.ravel()[changed]
+        new_codes = grid.codes.ravel()[changed]
+        self.grid = grid
+        if len(changed) == 0:
+            return 0
+
+        is_old_sm = (old_codes & Grid.SM_OBSTACLE) > 0
+        is_new_sm = (new_codes & Grid.SM_OBSTACLE) > 0
+        if (is_old_sm != is_new_sm).any():
+            self._sm_cells = _update_cells(
+                self._sm_cells,
+                removed=changed[is_old_sm & ~is_new_sm],
+                added=changed[is_new_sm & ~is_old_sm],
+            )
+            self.void_rectangles = update_decomposition(
+                self.void_rectangles,
+                grid.sm_obstacle_mask(),
+                changed_rows=numpy.unique(
+                    changed[is_old_sm != is_new_sm] // grid.shape[1]
+                ),
+                mode=self.decomposition,
+            )
+
+        is_old_tc = (old_codes & Grid.TC_OBSTACLE) > 0
+        is_new_tc = (new_codes & Grid.TC_OBSTACLE) > 0
+        self._update_tc_entries(
+            removed=changed[is_old_tc & ~is_new_tc],
+            added=changed[is_new_tc & ~is_old_tc],
+        )
+
+        return len(changed)
+
+    def _update_tc_entries(self, removed: numpy.ndarray, added: numpy.ndarray):
+        # Delete from the back, so that the positions of the earlier entries stay valid
+        positions = numpy.searchsorted(self._tc_cells, removed)
+        for position in positions[::-1].tolist():
+            del self._tc_entries[position]
+        self._tc_cells = numpy.delete(self._tc_cells, positions)
+
+        # Insert from the front, where each insertion shifts the following ones by one
+        positions = numpy.searchsorted(self._tc_cells, added)
+        entries = format_rows(
+            numpy.stack(numpy.unravel_index(added, self.grid.shape), axis=1)
+        )
+        for position, entry in zip(
+            (positions + numpy.arange(len(added))).tolist(), entries
+        ):
+            self._tc_entries.insert(position, entry)
+        self._tc_cells = numpy.insert(self._tc_cells, positions, added)
+
+    def zones_and_stations(
+        self, simulation_input: SimulationParameters
+    ) -> InputZonesAndStations:
+        return InputZonesAndStations(
+            grid_data=self.grid,
+            simulation_input=simulation_input,
+            decomposition=self.decomposition,
+            void_rectangles=self.void_rectangles,
+        )
+
+    def sm_obstacles(self) -> InputSMObstacles:
+        return InputSMObstacles(
+            grid_data=self.grid,
+            stack_coordinates=numpy.stack(
+                numpy.unravel_index(self._sm_cells, self.grid.shape), axis=1
+            ),
+        )
+
+    def tc_obstacles(self) -> InputTCObstacles:
+        # The entries are copied, so that later updates do not change the returned input
+        return InputTCObstacles(grid_data=self.grid, two_d=list(self._tc_entries))
+
+
+def _update_cells(
+    cells: numpy.ndarray, removed: numpy.ndarray, added: numpy.ndarray
+) -> numpy.ndarray:
+    """
+    Remove and add cell indices of a sorted array, keeping it sorted.
+    """
+    cells = numpy.delete(cells, numpy.searchsorted(cells, removed))
+    return numpy.insert(cells, numpy.searchsorted(cells, added), added)
@@ -1,22 +1,13 @@
-import json
+from .serialization import JSONOutput
 
 
-class InputSkyCarSetup:
+class InputSkyCarSetup(JSONOutput):
+    FILENAME = "reset-5.json"
+
     def __init__(self, number_of_skycars: int, model: str):
         self.num_skycars = number_of_skycars
         self.model = model
 
-    def to_json(self, save: bool = False, filename: str = "reset-5.json") -> str:
-        json_str = json.dumps(
-            self, default=lambda o: o.__dict__, sort_keys=True, indent=4
-        )
-
-        if save:
-            with open(filename, "w") as file:
-                file.write(json_str)
-
-        return json_str
-
 
 if __name__ == "__main__":
     a = InputSkyCarSetup()
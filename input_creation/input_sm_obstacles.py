@@ -1,39 +1,93 @@
-import json
-
 import numpy
 import pandas
 
+from grid import Grid
+from instrumentation import timed
 from parameters import Parameters
-class InputSMObstacles:
-    def __init__(self, grid_data: pandas.DataFrame):
-        self._create_stacks(grid_data=grid_data)
-        self.zoneGroup = Parameters.ZONE_NAME
+from .records import RecordArray
+from .serialization import JSONOutput
+from .void_decomposition import RANGE_ENCODINGS, decompose_bands, decompose_voids
+
+# How the stacks are listed: one {"x", "y"} per cell, or one {"from", "to"} range of
+# inclusive corners per run of a row or per rectangle
+STACK_ENCODINGS = ["cells", *RANGE_ENCODINGS]
+# The columns of a RecordArray of (x0, y0, x1, y1) stack ranges, serialized with "from"
+# and "to" keys like InputVoid
+STACK_RANGE_FIELDS = {"from": {"x": 0, "y": 1}, "to": {"x": 2, "y": 3}}
+
+
+class InputSMObstacles(JSONOutput):
+    FILENAME = "reset-3.json"
+
+    def __init__(
+        self,
+        grid_data: Grid | pandas.DataFrame,
+        stack_coordinates: numpy.ndarray | None = None,
+        encoding: str = "cells",
+        zone_group: str = Parameters.ZONE_NAME,
+    ):
+        if encoding not in STACK_ENCODINGS:
+            raise ValueError(
+                f"{encoding=}; must be one of {', '.join(STACK_ENCODINGS)}."
+            )
+
+        grid_data = Grid.coerce(grid_data)
+        if encoding == "cells":
+            self._create_stacks(
+                grid_data=grid_data, stack_coordinates=stack_coordinates
+            )
+        else:
+            # Only written for the compressed encodings, so that the default output is
+            # unchanged for simulators that do not support them
+            self.stacksEncoding = encoding
+            self._create_stack_ranges(
+                grid_data=grid_data,
+                encoding=encoding,
+                stack_coordinates=stack_coordinates,
+            )
+        self.zoneGroup = zone_group
         self.isSkycarAccessible = False
 
-    def _create_stacks(self, grid_data: pandas.DataFrame):
-        void_mask = grid_data.isin([1, 3]).to_numpy()
-
-        # Get coordinates where void_mask is True
-        coordinates = numpy.argwhere(void_mask)
-        
-        # Create InputStack objects for each coordinate
-        self.stacks = [
-            InputStack(x=int(col), y=int(row)) 
-            for row, col in coordinates
-        ]
-
-    def to_json(self, save: bool = False, filename: str = "reset-3.json") -> str:
-        json_str = json.dumps(
-            self, default=lambda o: o.__dict__, sort_keys=True, indent=4
-        )
+    @timed("create_stacks")
+    def _create_stacks(
+        self, grid_data: Grid, stack_coordinates: numpy.ndarray | None = None
+    ):
+        # Get coordinates of the SM obstacles band by band, as an Nx2 array of (y, x)
+        # that is serialized the same as a list of InputStack; they can also be given in
+        # the same row-major order, e.g. when kept up to date by IncrementalInputs
+        if stack_coordinates is None:
+            stack_coordinates = grid_data.sm_obstacle_coordinates()
+        coordinates = numpy.asarray(stack_coordinates, dtype=numpy.int32)
+        self.stacks = RecordArray(coordinates, fields=InputStack.RECORD_FIELDS)
 
-        if save:
-            with open(filename, "w") as file:
-                file.write(json_str)
+    @timed("create_stack_ranges")
+    def _create_stack_ranges(
+        self,
+        grid_data: Grid,
+        encoding: str,
+        stack_coordinates: numpy.ndarray | None = None,
+    ):
+        mode = RANGE_ENCODINGS[encoding]
+        if stack_coordinates is None:
+            rectangles = decompose_bands(
+                grid_data.sm_obstacle_mask, grid_data.row_slices(), mode=mode
+            )
+        else:
+            # Only the given stacks, e.g. those of one zone
+            stack_mask = numpy.zeros(grid_data.shape, dtype=bool)
+            stack_mask[tuple(numpy.asarray(stack_coordinates).reshape(-1, 2).T)] = True
+            rectangles = decompose_voids(stack_mask, mode=mode)
+        self.stacks = RecordArray(
+            rectangles.astype(numpy.int32), fields=STACK_RANGE_FIELDS
+        )
 
-        return json_str
 
 class InputStack:
+    __slots__ = ("x", "y")
+
+    # The columns of a RecordArray of stacks from numpy.argwhere
+    RECORD_FIELDS = {"x": 1, "y": 0}
+
     def __init__(self, x: int, y: int):
         self.x = x
         self.y = y
@@ -1,28 +1,78 @@
+import numpy
 import pandas
-import json
 
+from grid import Grid
+from instrumentation import timed
+from .serialization import JSONOutput
+from .void_decomposition import RANGE_ENCODINGS, decompose_bands
+
+# How the TC obstacles are listed in "two_d": one "x,y" per cell, or one
+# "x0,y0,x1,y1" (inclusive corners) per run of a row or per rectangle
+TWO_D_ENCODINGS = ["cells", *RANGE_ENCODINGS]
+
+
+class InputTCObstacles(JSONOutput):
+    FILENAME = "reset-6.json"
+
+    def __init__(
+        self,
+        grid_data: Grid | pandas.DataFrame,
+        encoding: str = "cells",
+        two_d: list[str] | None = None,
+    ):
+        if encoding not in TWO_D_ENCODINGS:
+            raise ValueError(
+                f"{encoding=}; must be one of {', '.join(TWO_D_ENCODINGS)}."
+            )
 
-class InputTCObstacles:
-    def __init__(self, grid_data: pandas.DataFrame):
         self.type = "Pillar"
         self.skycar_sid = 0
         self.error_id = 0
 
-        self.two_d = self._find_tc_obstacles(grid_data=grid_data)
+        # Only written for the compressed encodings, so that the default output is
+        # unchanged for simulators that do not support them
+        if encoding != "cells":
+            self.two_d_encoding = encoding
 
-    def _find_tc_obstacles(self, grid_data: pandas.DataFrame) -> list[str]:
-        # Find all void locations (values 2 or 3)
-        void_mask = grid_data.isin([2, 3]).to_numpy()
-        rows, cols = void_mask.shape
-        return [f"{x},{y}" for x in range(rows) for y in range(cols) if void_mask[x, y]]
+        grid_data = Grid.coerce(grid_data)
+        if two_d is not None:
+            # Entries given in the order of the encoding, e.g. by IncrementalInputs
+            self.two_d = two_d
+        elif encoding == "cells":
+            self.two_d = self._find_tc_obstacles(grid_data=grid_data)
+        else:
+            self.two_d = self._find_tc_obstacle_ranges(
+                grid_data=grid_data, encoding=encoding
+            )
 
-    def to_json(self, save: bool = False, filename: str = "reset-6.json") -> str:
-        json_str = json.dumps(
-            self, default=lambda o: o.__dict__, sort_keys=True, indent=4
+    @timed("find_tc_obstacles")
+    def _find_tc_obstacles(self, grid_data: Grid) -> list[str]:
+        # Find all void locations (values 2 or 3) band by band; x is the row and y the
+        # column
+        return format_rows(grid_data.tc_obstacle_coordinates())
+
+    @timed("find_tc_obstacle_ranges")
+    def _find_tc_obstacle_ranges(self, grid_data: Grid, encoding: str) -> list[str]:
+        rectangles = decompose_bands(
+            grid_data.tc_obstacle_mask,
+            grid_data.row_slices(),
+            mode=RANGE_ENCODINGS[encoding],
         )
 
-        if save:
-            with open(filename, "w") as file:
-                file.write(json_str)
+        # Rectangles are (column, row) corners; swap them to the (row, column) order
+        # of the cells
+        return format_rows(rectangles[:, [1, 0, 3, 2]])
+
+
+def format_rows(values: numpy.ndarray) -> list[str]:
+    """
+    Format every row of an integer array as comma-separated values, in one string
+    formatting call for the whole array.
+    """
+    if len(values) == 0:
+        return []
 
-        return json_str
+    template = ",".join(["%d"] * values.shape[1])
+    return ("\n".join([template] * len(values)) % tuple(values.ravel().tolist())).split(
+        "\n"
+    )
@@ -1,113 +1,161 @@
 from __future__ import annotations
 
-import json
 from typing import List
 
 import numpy
 import pandas
 
-from ui.simulation_input import SimulationInputUI
-from parameters import Parameters
+from grid import Grid, StationIndex, ZoneLayout
+from instrumentation import timed
+from parameters import Parameters, SimulationParameters
+from .records import RecordArray
+from .serialization import JSONOutput
+from .void_decomposition import decompose_bands
+from .zones import split_zones
 
 
-class InputZonesAndStations:
+class InputZonesAndStations(JSONOutput):
+    FILENAME = "reset-2.json"
+
     def __init__(
-        self, grid_data: pandas.DataFrame, simulation_input: SimulationInputUI
+        self,
+        grid_data: Grid | pandas.DataFrame,
+        simulation_input: SimulationParameters,
+        decomposition: str = "greedy",
+        void_rectangles: numpy.ndarray | list[numpy.ndarray] | None = None,
+        zone_layout: ZoneLayout | None = None,
     ):
-        self._create_zones(grid_data=grid_data, simulation_input=simulation_input)
-        self._create_stations(grid_data=grid_data, simulation_input=simulation_input)
+        grid_data = Grid.coerce(grid_data)
+        if zone_layout is None:
+            self._create_zones(
+                grid_data=grid_data,
+                simulation_input=simulation_input,
+                decomposition=decomposition,
+                void_rectangles=void_rectangles,
+            )
+        else:
+            # The void rectangles of every zone, e.g. from split_zones across processes
+            self._create_layout_zones(
+                grid_data=grid_data,
+                simulation_input=simulation_input,
+                zone_layout=zone_layout,
+                decomposition=decomposition,
+                void_rectangles=void_rectangles,
+            )
+        self._create_stations(
+            grid_data=grid_data,
+            simulation_input=simulation_input,
+            zone_layout=zone_layout,
+        )
 
+    @timed("create_zones")
     def _create_zones(
-        self, grid_data: pandas.DataFrame, simulation_input: SimulationInputUI
+        self,
+        grid_data: Grid,
+        simulation_input: SimulationParameters,
+        decomposition: str = "greedy",
+        void_rectangles: numpy.ndarray | None = None,
     ):
-
-        # Find all void locations (values 1 or 3)
-        void_mask = grid_data.isin([1, 3]).to_numpy()
-        rows, cols = void_mask.shape
-        voids = []
-
-        # Use boolean array to track processed cells
-        processed = numpy.zeros_like(void_mask, dtype=bool)
-
-        # Scan unprocessed void cells
-        void_positions = numpy.argwhere(numpy.logical_and(void_mask, ~processed))
-
-        for start_y, start_x in void_positions:
-            if processed[start_y, start_x]:
-                continue
-
-            # Expand right
-            end_x = start_x
-            while end_x + 1 < cols and void_mask[start_y, end_x + 1]:
-                end_x += 1
-
-            # Expand down
-            end_y = start_y
-            while end_y + 1 < rows:
-                is_valid = True
-                for x in range(start_x, end_x + 1):
-                    if not void_mask[end_y + 1, x]:
-                        is_valid = False
-                        break
-                if not is_valid:
-                    break
-                end_y += 1
-
-            # Mark as processed
-            processed[start_y : end_y + 1, start_x : end_x + 1] = True
-
-            void = InputVoid(
-                from_=Coordinates(x=int(start_x), y=int(start_y), z=0),
-                to=Coordinates(x=int(end_x), y=int(end_y), z=simulation_input.z_size),
+        # The rectangles only depend on the grid, so they can be reused across inputs
+        rectangles = void_rectangles
+        if rectangles is None:
+            # Find all void locations (values 1 or 3), band by band where the
+            # decomposition allows it
+            rectangles = decompose_bands(
+                grid_data.sm_obstacle_mask, grid_data.row_slices(), mode=decomposition
             )
-            voids.append(void)
 
         zone = InputZone(
             max_x=grid_data.shape[1] - 1,
             max_y=grid_data.shape[0] - 1,
             max_z=simulation_input.z_size,
-            voids=voids,
+            voids=_void_records(rectangles, z_size=simulation_input.z_size),
         )
         self.zones = [zone]
 
+    @timed("create_layout_zones")
+    def _create_layout_zones(
+        self,
+        grid_data: Grid,
+        simulation_input: SimulationParameters,
+        zone_layout: ZoneLayout,
+        decomposition: str = "greedy",
+        void_rectangles: list[numpy.ndarray] | None = None,
+    ):
+        if void_rectangles is None:
+            void_rectangles, _ = split_zones(
+                grid_data, zone_layout=zone_layout, decomposition=decomposition
+            )
+
+        self.zones = [
+            InputZone(
+                min_x=x0,
+                min_y=y0,
+                max_x=x1,
+                max_y=y1,
+                max_z=simulation_input.z_size,
+                voids=_void_records(rectangles, z_size=simulation_input.z_size),
+                name=name,
+            )
+            for name, (x0, y0, x1, y1), rectangles in zip(
+                zone_layout.names,
+                zone_layout.bounding_boxes().tolist(),
+                void_rectangles,
+            )
+        ]
+
+    @timed("create_stations")
     def _create_stations(
-        self, grid_data: pandas.DataFrame, simulation_input: SimulationInputUI
+        self,
+        grid_data: Grid,
+        simulation_input: SimulationParameters,
+        zone_layout: ZoneLayout | None = None,
     ):
         # Usually the height of station is 2 bins above ground
         station_height = simulation_input.z_size - 2
 
-        uncleaned_stations = numpy.sort(
-            grid_data.copy()[grid_data >= 10].stack().values
-        )
-
-        grid_data_array = grid_data.to_numpy()
+        station_index = grid_data.stations
+        if zone_layout is None:
+            zone_groups = [Parameters.ZONE_NAME] * len(station_index)
+        else:
+            zone_groups = zone_layout.zone_names_at(station_index.coordinates)
+            if None in zone_groups:
+                y, x = station_index.coordinates[zone_groups.index(None)].tolist()
+                raise ValueError(f"Station at {x=}, {y=} is outside every zone.")
 
         count = 1
         stations: List[InputStation] = []
-        for station_value in uncleaned_stations:
-            y, x = numpy.argwhere(grid_data_array == station_value)[0].tolist()
-            if station_value % 10 == 0:
+        for role, (y, x), zone_group in zip(
+            station_index.roles.tolist(),
+            station_index.coordinates.tolist(),
+            zone_groups,
+        ):
+            if role == StationIndex.MIXED:
                 drop = InputDropOrPick(
                     coordinates=Coordinates(x=x, y=y, z=station_height),
                     capacity=simulation_input.drop_capacity,
+                    zone_group=zone_group,
                 )
                 pick = InputDropOrPick(
                     coordinates=Coordinates(x=x, y=y, z=station_height),
                     capacity=simulation_input.pick_capacity,
+                    zone_group=zone_group,
                 )
                 station = InputStation(code=count, drop=drop, pick=pick)
                 stations.append(station)
                 count += 1
             else:
-                if station_value % 10 == 1:
+                if role == StationIndex.DROP:
                     drop = InputDropOrPick(
                         coordinates=Coordinates(x=x, y=y, z=station_height),
                         capacity=simulation_input.drop_capacity,
+                        zone_group=zone_group,
                     )
                 else:
                     pick = InputDropOrPick(
                         coordinates=Coordinates(x=x, y=y, z=station_height),
                         capacity=simulation_input.pick_capacity,
+                        zone_group=zone_group,
                     )
                     station = InputStation(code=count, drop=drop, pick=pick)
                     stations.append(station)
@@ -115,16 +163,16 @@ class InputZonesAndStations:
 
         self.stations = stations
 
-    def to_json(self, save: bool = False, filename: str = "reset-2.json") -> str:
-        json_str = json.dumps(
-            self, default=lambda o: o.__dict__, sort_keys=True, indent=4
-        )
-
-        if save:
-            with open(filename, "w") as file:
-                file.write(json_str)
 
-        return json_str
+def _void_records(rectangles: numpy.ndarray, z_size: int) -> RecordArray:
+    # Serialized the same as a list of InputVoid, without creating one per void
+    x0, y0, x1, y1 = rectangles.T
+    return RecordArray(
+        numpy.column_stack(
+            [x0, y0, numpy.zeros_like(x0), x1, y1, numpy.full_like(x1, z_size)]
+        ),
+        fields=InputVoid.RECORD_FIELDS,
+    )
 
 
 class InputZone:
@@ -133,13 +181,15 @@ class InputZone:
         max_x: int,
         max_y: int,
         max_z: int,
-        voids: List[InputVoid],
+        voids: RecordArray | List[InputVoid],
         name: str = Parameters.ZONE_NAME,
+        min_x: int = 0,
+        min_y: int = 0,
     ):
         self.name = name
-        self.fromX = 0
+        self.fromX = min_x
         self.toX = max_x
-        self.fromY = 0
+        self.fromY = min_y
         self.toY = max_y
         self.fromZ = 0
         self.toZ = max_z
@@ -147,16 +197,21 @@ class InputZone:
 
 
 class InputVoid:
-    def __init__(self, from_: Coordinates, to: Coordinates):
-        self.to = to
+    __slots__ = ("from_", "to")
 
-        # Since from is a reserved keyword in Python, we need to use a different way to 
-        # set the attribute
-        setattr(self, "from", from_)
+    # The columns of a RecordArray of voids: from x, y, z and to x, y, z
+    RECORD_FIELDS = {"from": {"x": 0, "y": 1, "z": 2}, "to": {"x": 3, "y": 4, "z": 5}}
 
+    def __init__(self, from_: Coordinates, to: Coordinates):
+        # Since from is a reserved keyword in Python, the attribute is serialized
+        # without its trailing underscore
+        self.from_ = from_
+        self.to = to
 
 
 class InputStation:
+    __slots__ = ("code", "drop", "pick")
+
     def __init__(self, code: int, drop: InputDropOrPick, pick: InputDropOrPick):
         self.code = code
         self.drop = [drop]
@@ -164,6 +219,8 @@ class InputStation:
 
 
 class InputDropOrPick:
+    __slots__ = ("capacity", "hardwareIndex", "zoneGroup", "coordinate")
+
     # FIXME: What should be the value of capacity, hardware index, and zone group?
     def __init__(
         self,
@@ -179,6 +236,7 @@ class InputDropOrPick:
 
 
 class Coordinates:
+    __slots__ = ("x", "y", "z")
 
     def __init__(self, x: int, y: int, z: int = 0):
         self.x = x
@@ -0,0 +1,115 @@
+"""
+Array-backed collections of the per-cell model classes.
+
+A `RecordArray` holds one row of integers per record and serializes to the same JSON
+list of objects as a list of model objects would (e.g. `InputVoid` or `InputStack`),
+without ever creating those objects.
+"""
+
+from __future__ import annotations
+
+import time
+import tracemalloc
+from typing import Any
+
+import numpy
+import pandas
+
+
+class RecordArray:
+    """
+    Array of records that serializes as a JSON list of objects.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Integer array of shape (N, M), one row per record
+    fields : dict
+        The JSON shape of a record, mapping each key to the column of data holding its
+        value or to a nested dict of the same form, e.g. ``{"x": 0, "y": 1}``
+    """
+
+    def __init__(self, data: numpy.ndarray, fields: dict[str, Any]):
+        self.data = numpy.asarray(data)
+        self.fields = fields
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def to_list(self) -> list[dict[str, Any]]:
+        """
+        Return the records as a list of dicts, e.g. for encoders that need them.
+        """
+
+        def build(fields: dict[str, Any], row: list[int]) -> dict[str, Any]:
+            return {
+                key: build(value, row) if isinstance(value, dict) else row[value]
+                for key, value in fields.items()
+            }
+
+        return [build(self.fields, row) for row in self.data.tolist()]
+
+
+def benchmark_records(size: int = 200_000) -> pandas.DataFrame:
+    """
+    Compare the memory and time taken to hold and serialize `size` stacks as plain
+    objects (the previous classes), as __slots__ objects and as a `RecordArray`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per representation with the columns "representation",
+        "build_seconds", "serialize_seconds", "held_bytes" (memory held by the
+        collection) and "peak_bytes" (peak memory including serialization).
+    """
+    from .input_sm_obstacles import InputStack
+    from .serialization import dumps
+
+    class DictStack:
+        def __init__(self, x: int, y: int):
+            self.x = x
+            self.y = y
+
+    coordinates = numpy.random.default_rng(0).integers(0, 1000, size=(size, 2))
+    builders = {
+        "objects": lambda: [DictStack(x=x, y=y) for x, y in coordinates.tolist()],
+        "slots": lambda: [InputStack(x=x, y=y) for x, y in coordinates.tolist()],
+        "record_array": lambda: RecordArray(
+            coordinates.astype(numpy.int32), fields={"x": 0, "y": 1}
+        ),
+    }
+
+    report = []
+    for representation, build in builders.items():
+        # Time without tracing first, as tracemalloc slows down every allocation
+        start = time.perf_counter()
+        stacks = build()
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        dumps({"stacks": stacks})
+        serialize_seconds = time.perf_counter() - start
+        del stacks
+
+        tracemalloc.start()
+        stacks = build()
+        held_bytes, _ = tracemalloc.get_traced_memory()
+        dumps({"stacks": stacks})
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del stacks
+
+        report.append(
+            {
+                "representation": representation,
+                "build_seconds": build_seconds,
+                "serialize_seconds": serialize_seconds,
+                "held_bytes": held_bytes,
+                "peak_bytes": peak_bytes,
+            }
+        )
+
+    return pandas.DataFrame(report)
+
+
+if __name__ == "__main__":
+    print(benchmark_records().to_string(index=False))
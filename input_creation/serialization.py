@@ -0,0 +1,331 @@
+"""
+Serialization of the input_creation objects to JSON.
+
+Objects are serialized through their public attributes (or slots) with sorted keys, and
+`RecordArray` collections straight from their arrays. The pretty
+mode (4-space indent) is byte-compatible with
+``json.dumps(obj, default=lambda o: o.__dict__, sort_keys=True, indent=4)``; the compact
+mode drops the indent and the spaces after separators. `dump` streams the encoded chunks
+straight to a file instead of building the whole string in memory. If orjson is
+installed it is used for the compact mode, with the non-ASCII characters that it writes
+as they are escaped afterwards, so that it is byte for byte the same.
+"""
+
+from __future__ import annotations
+
+import io
+import re
+from json.encoder import INFINITY, encode_basestring_ascii
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+import numpy
+
+from instrumentation import stage
+from .records import RecordArray
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+INDENT = 4
+COMPACT_SEPARATORS = (",", ":")
+# Encoded chunks are collected into writes of about this many characters
+WRITE_BUFFER_SIZE = 1 << 16
+BACKENDS = ["auto", "json", "orjson"]
+# Number of records of a RecordArray encoded per chunk
+RECORD_CHUNK_SIZE = 10_000
+NON_ASCII = re.compile(r"[^\x00-\x7f]+")
+
+
+def to_serializable(o: Any) -> Any:
+    """
+    Default hook of the encoder for objects that JSON does not support natively.
+    """
+    if isinstance(o, numpy.integer):
+        return int(o)
+    if isinstance(o, numpy.floating):
+        return float(o)
+    if isinstance(o, numpy.ndarray):
+        return o.tolist()
+    if isinstance(o, RecordArray):
+        return o.to_list()
+
+    if hasattr(o, "__slots__"):
+        items = ((name, getattr(o, name)) for name in o.__slots__)
+    else:
+        items = vars(o).items()
+
+    # Underscore attributes are internal state and not part of the output, while a
+    # trailing underscore avoids a keyword, e.g. "from_" is written as "from"
+    return {
+        key[:-1] if key.endswith("_") else key: value
+        for key, value in items
+        if not key.startswith("_")
+    }
+
+
+def iter_json(obj: Any, compact: bool = False) -> Iterator[str]:
+    """
+    Encode the object to JSON chunk by chunk.
+    """
+    return _iterencode(obj, level=0, indent=None if compact else " " * INDENT)
+
+
+def dumps(obj: Any, compact: bool = False, backend: str = "auto") -> str:
+    """
+    Encode the object to a JSON string.
+
+    Parameters
+    ----------
+    obj : Any
+        The object to encode
+    compact : bool, optional
+        Whether to drop the indent and whitespace, by default False
+    backend : str, optional
+        "json", "orjson" (compact mode only), or "auto" to use orjson for the compact
+        mode when it is installed, by default "auto"
+
+    Returns
+    -------
+    str
+        The JSON string.
+    """
+    if _use_orjson(compact=compact, backend=backend):
+        return _orjson_dumps(obj)
+
+    return "".join(iter_json(obj, compact=compact))
+
+
+def dump(
+    obj: Any,
+    file: str | Path | IO[str],
+    compact: bool = False,
+    backend: str = "auto",
+) -> None:
+    """
+    Write the object as JSON to a file name or a text file handle, without building
+    the whole string in memory (except with the orjson backend).
+
+    See `dumps` for the parameters.
+    """
+    if isinstance(file, (str, Path)):
+        with open(file, "w", encoding="utf-8") as handle:
+            dump(obj, handle, compact=compact, backend=backend)
+        return
+
+    if _use_orjson(compact=compact, backend=backend):
+        file.write(_orjson_dumps(obj))
+        return
+
+    buffer = io.StringIO()
+    for chunk in iter_json(obj, compact=compact):
+        buffer.write(chunk)
+        if buffer.tell() >= WRITE_BUFFER_SIZE:
+            file.write(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+    file.write(buffer.getvalue())
+
+
+class JSONOutput:
+    """
+    Mixin for the objects written to one of the reset-*.json files.
+    """
+
+    FILENAME = "output.json"
+
+    def to_json(
+        self,
+        save: bool = False,
+        filename: str | Path | None = None,
+        compact: bool = False,
+    ) -> str:
+        with stage(f"serialize {self.FILENAME}"):
+            json_str = dumps(self, compact=compact)
+
+        if save:
+            with open(filename or self.FILENAME, "w", encoding="utf-8") as file:
+                file.write(json_str)
+
+        return json_str
+
+    def write_json(
+        self,
+        file: str | Path | IO[str] | None = None,
+        compact: bool = False,
+        backend: str = "auto",
+    ) -> None:
+        """
+        Stream the JSON to a file name or text file handle, by default `FILENAME`.
+        """
+        with stage(f"serialize {self.FILENAME}"):
+            dump(self, file or self.FILENAME, compact=compact, backend=backend)
+
+
+def _iterencode(o: Any, level: int, indent: str | None) -> Iterator[str]:
+    # Mirrors the pure Python encoder of the json module with sort_keys=True, with
+    # the addition of RecordArray
+    if isinstance(o, str):
+        yield encode_basestring_ascii(o)
+    elif o is None:
+        yield "null"
+    elif o is True:
+        yield "true"
+    elif o is False:
+        yield "false"
+    elif isinstance(o, int):
+        yield int.__repr__(o)
+    elif isinstance(o, float):
+        yield _floatstr(o)
+    elif isinstance(o, dict):
+        yield from _iterencode_dict(o, level=level, indent=indent)
+    elif isinstance(o, (list, tuple)):
+        yield from _iterencode_list(o, level=level, indent=indent)
+    elif isinstance(o, RecordArray):
+        yield from _iterencode_records(o, level=level, indent=indent)
+    elif isinstance(o, _Column):
+        yield _COLUMN_MARKER
+    else:
+        yield from _iterencode(to_serializable(o), level=level, indent=indent)
+
+
+def _brackets(
+    opening: str, closing: str, level: int, indent: str | None
+) -> tuple[str, str, str]:
+    """
+    Return the opening, separator and closing of a non-empty JSON array or object.
+    """
+    if indent is None:
+        return opening, COMPACT_SEPARATORS[0], closing
+
+    newline = "\n" + indent * (level + 1)
+    return opening + newline, "," + newline, "\n" + indent * level + closing
+
+
+def _iterencode_dict(d: dict, level: int, indent: str | None) -> Iterator[str]:
+    if not d:
+        yield "{}"
+        return
+
+    opening, separator, closing = _brackets("{", "}", level=level, indent=indent)
+    key_separator = COMPACT_SEPARATORS[1] if indent is None else ": "
+
+    yield opening
+    for i, (key, value) in enumerate(sorted(d.items())):
+        if i > 0:
+            yield separator
+        yield encode_basestring_ascii(key) + key_separator
+        yield from _iterencode(value, level=level + 1, indent=indent)
+    yield closing
+
+
+def _iterencode_list(
+    items: list | tuple, level: int, indent: str | None
+) -> Iterator[str]:
+    if not items:
+        yield "[]"
+        return
+
+    opening, separator, closing = _brackets("[", "]", level=level, indent=indent)
+
+    yield opening
+    for i, value in enumerate(items):
+        if i > 0:
+            yield separator
+        yield from _iterencode(value, level=level + 1, indent=indent)
+    yield closing
+
+
+def _iterencode_records(
+    records: RecordArray, level: int, indent: str | None
+) -> Iterator[str]:
+    if len(records) == 0:
+        yield "[]"
+        return
+
+    opening, separator, closing = _brackets("[", "]", level=level, indent=indent)
+
+    # Encode a record with placeholders once and fill it in for every row, a whole
+    # chunk of rows per string formatting
+    placeholders = _placeholders(records.fields)
+    template = (
+        "".join(_iterencode(placeholders, level=level + 1, indent=indent))
+        .replace("%", "%%")
+        .replace(_COLUMN_MARKER, "%d")
+    )
+    columns = list(_leaf_columns(records.fields))
+
+    yield opening
+    for start in range(0, len(records), RECORD_CHUNK_SIZE):
+        chunk = records.data[start : start + RECORD_CHUNK_SIZE, columns]
+        if start > 0:
+            yield separator
+        yield separator.join([template] * len(chunk)) % tuple(chunk.ravel().tolist())
+    yield closing
+
+
+class _Column:
+    pass
+
+
+# A character that encode_basestring_ascii always escapes, so it cannot clash
+_COLUMN_MARKER = "\x00"
+
+
+def _placeholders(fields: dict[str, Any]) -> dict[str, Any]:
+    return {
+        key: _placeholders(value) if isinstance(value, dict) else _Column()
+        for key, value in fields.items()
+    }
+
+
+def _leaf_columns(fields: dict[str, Any]) -> Iterator[int]:
+    for key, value in sorted(fields.items()):
+        if isinstance(value, dict):
+            yield from _leaf_columns(value)
+        else:
+            yield value
+
+
+def _floatstr(o: float) -> str:
+    if o != o:
+        return "NaN"
+    if o == INFINITY:
+        return "Infinity"
+    if o == -INFINITY:
+        return "-Infinity"
+
+    return float.__repr__(o)
+
+
+def _use_orjson(compact: bool, backend: str) -> bool:
+    if backend not in BACKENDS:
+        raise ValueError(f"{backend=}; must be one of {', '.join(BACKENDS)}.")
+
+    if backend == "orjson":
+        if orjson is None:
+            raise ImportError("orjson is not installed.")
+        if not compact:
+            raise ValueError(
+                "orjson only supports the compact mode; its indent is not compatible."
+            )
+        return True
+
+    return backend == "auto" and compact and orjson is not None
+
+
+def _orjson_dumps(obj: Any) -> str:
+    json_str = orjson.dumps(
+        obj,
+        default=to_serializable,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    ).decode()
+    if json_str.isascii():
+        return json_str
+
+    # Non-ASCII characters can only be in strings, which json escapes as \uXXXX
+    return NON_ASCII.sub(
+        lambda match: encode_basestring_ascii(match[0])[1:-1], json_str
+    )
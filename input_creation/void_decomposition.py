@@ -0,0 +1,465 @@
+"""
+Decomposition of the void cells of a grid into the rectangles of `InputVoid`.
+
+Every mode takes a boolean void mask (rows are y, columns are x) and returns an integer
+array of shape (N, 4) holding the inclusive corners ``(x0, y0, x1, y1)`` of N
+rectangles that exactly cover the voids, ordered by ``(y0, x0)``.
+
+- ``greedy``: expand each unprocessed void right then down; the original behaviour. The
+  expansion does not skip processed cells, so rectangles may overlap.
+- ``row_runs``: vectorized; one rectangle per horizontal run of every row.
+- ``run_length``: vectorized; split every row into runs and merge identical runs of
+  consecutive rows.
+- ``minimum``: the minimum number of rectangles, found by cutting along a maximum set of
+  non-intersecting chords between concave corners (via bipartite matching) and then one
+  cut from every remaining concave corner.
+"""
+
+import time
+from collections import deque
+from typing import Callable, Iterable
+
+import numpy
+import pandas
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import maximum_bipartite_matching
+
+
+def decompose_greedy(void_mask: numpy.ndarray) -> numpy.ndarray:
+    rows, cols = void_mask.shape
+    rectangles = []
+
+    # Use boolean array to track processed cells
+    processed = numpy.zeros_like(void_mask, dtype=bool)
+
+    for start_y, start_x in numpy.argwhere(void_mask):
+        if processed[start_y, start_x]:
+            continue
+
+        # Expand right
+        end_x = start_x
+        while end_x + 1 < cols and void_mask[start_y, end_x + 1]:
+            end_x += 1
+
+        # Expand down
+        end_y = start_y
+        while end_y + 1 < rows and void_mask[end_y + 1, start_x : end_x + 1].all():
+            end_y += 1
+
+        # Mark as processed
+        processed[start_y : end_y + 1, start_x : end_x + 1] = True
+        rectangles.append((start_x, start_y, end_x, end_y))
+
+    return _as_rectangles(rectangles)
+
+
+def decompose_row_runs(void_mask: numpy.ndarray) -> numpy.ndarray:
+    row, x0, x1 = _row_runs(void_mask)
+
+    return _as_rectangles(numpy.stack([x0, row, x1, row], axis=1))
+
+
+def decompose_run_length(void_mask: numpy.ndarray) -> numpy.ndarray:
+    return _merge_runs(*_row_runs(void_mask))
+
+
+def _merge_runs(
+    row: numpy.ndarray, x0: numpy.ndarray, x1: numpy.ndarray
+) -> numpy.ndarray:
+    # Sort the runs by their columns and then row, so that identical runs of
+    # consecutive rows end up next to each other
+    order = numpy.lexsort((row, x1, x0))
+    row, x0, x1 = row[order], x0[order], x1[order]
+
+    is_new = numpy.ones(row.size, dtype=bool)
+    is_new[1:] = (x0[1:] != x0[:-1]) | (x1[1:] != x1[:-1]) | (row[1:] != row[:-1] + 1)
+    is_last = numpy.ones(row.size, dtype=bool)
+    is_last[:-1] = is_new[1:]
+    starts, ends = numpy.flatnonzero(is_new), numpy.flatnonzero(is_last)
+
+    return _sorted_rectangles(
+        numpy.stack([x0[starts], row[starts], x1[starts], row[ends]], axis=1)
+    )
+
+
+def decompose_minimum(void_mask: numpy.ndarray) -> numpy.ndarray:
+    void_mask = numpy.asarray(void_mask, dtype=bool)
+    rows, cols = void_mask.shape
+
+    # Lattice points (i, j) are the corners between cells; the four cells around a
+    # point are top-left, top-right, bottom-left and bottom-right of the padded mask
+    padded = numpy.pad(void_mask, 1)
+    top_left, top_right = padded[:-1, :-1], padded[:-1, 1:]
+    bottom_left, bottom_right = padded[1:, :-1], padded[1:, 1:]
+
+    # Concave corners have exactly three of their four cells in the region
+    count = top_left.astype(int) + top_right + bottom_left + bottom_right
+    concave_i, concave_j = numpy.nonzero(count == 3)
+    # Direction away from the missing cell, along which the region continues
+    dx = numpy.where((~top_left | ~bottom_left)[concave_i, concave_j], 1, -1)
+    dy = numpy.where((~top_left | ~top_right)[concave_i, concave_j], 1, -1)
+
+    # Interior edges of the lattice have region cells on both sides
+    horizontal_edges = padded[:-1, 1:-1] & padded[1:, 1:-1]  # (rows + 1, cols)
+    vertical_edges = padded[1:-1, :-1] & padded[1:-1, 1:]  # (rows, cols + 1)
+
+    # Chords join two concave corners along interior edges; only start from the corner
+    # with the lower coordinate to find each chord once
+    is_concave = count == 3
+    horizontal_chords = _find_chords(
+        horizontal_edges, concave_i, concave_j, dx > 0, is_concave
+    )
+    vertical_chords = _find_chords(
+        vertical_edges.T, concave_j, concave_i, dy > 0, is_concave.T
+    )
+
+    # Chords of opposite direction that touch cannot both be cut; the largest set of
+    # non-touching chords is the complement of a minimum vertex cover
+    horizontal_keep, vertical_keep = _maximum_independent_chords(
+        horizontal_chords, vertical_chords
+    )
+
+    horizontal_cuts = numpy.zeros_like(horizontal_edges)
+    vertical_cuts = numpy.zeros_like(vertical_edges)
+    for i, start, end in horizontal_chords[horizontal_keep]:
+        horizontal_cuts[i, start:end] = True
+    for j, start, end in vertical_chords[vertical_keep]:
+        vertical_cuts[start:end, j] = True
+
+    # Cut horizontally from every concave corner that is not yet resolved, stopping at
+    # the boundary or at an existing cut
+    for i, j, direction in zip(concave_i, concave_j, dx):
+        if (
+            (j > 0 and horizontal_cuts[i, j - 1])
+            or (j < cols and horizontal_cuts[i, j])
+            or (i > 0 and vertical_cuts[i - 1, j])
+            or (i < rows and vertical_cuts[i, j])
+        ):
+            continue
+
+        point = j
+        while True:
+            edge = point if direction > 0 else point - 1
+            if (
+                not 0 <= edge < cols
+                or not horizontal_edges[i, edge]
+                or horizontal_cuts[i, edge]
+            ):
+                break
+            horizontal_cuts[i, edge] = True
+            point += direction
+            if (i > 0 and vertical_cuts[i - 1, point]) or (
+                i < rows and vertical_cuts[i, point]
+            ):
+                break
+
+    return _cut_rectangles(void_mask, horizontal_cuts, vertical_cuts)
+
+
+DECOMPOSITION_MODES: dict[str, Callable[[numpy.ndarray], numpy.ndarray]] = {
+    "greedy": decompose_greedy,
+    "row_runs": decompose_row_runs,
+    "run_length": decompose_run_length,
+    "minimum": decompose_minimum,
+}
+
+
+def decompose_voids(void_mask: numpy.ndarray, mode: str = "greedy") -> numpy.ndarray:
+    """
+    Decompose the void cells into rectangles.
+
+    Parameters
+    ----------
+    void_mask : numpy.ndarray
+        Boolean mask of the void cells, indexed by (y, x)
+    mode : str, optional
+        One of `DECOMPOSITION_MODES`, by default "greedy"
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (N, 4) of inclusive ``(x0, y0, x1, y1)`` rectangles.
+    """
+    if mode not in DECOMPOSITION_MODES:
+        raise ValueError(f"{mode=}; must be one of {', '.join(DECOMPOSITION_MODES)}.")
+
+    return DECOMPOSITION_MODES[mode](numpy.asarray(void_mask, dtype=bool))
+
+
+# Modes whose rectangles never span rows, so that every band of rows is decomposed on
+# its own
+BAND_MODES = ["row_runs"]
+
+
+def decompose_bands(
+    band_mask: Callable[[slice], numpy.ndarray],
+    row_slices: Iterable[slice],
+    mode: str = "greedy",
+) -> numpy.ndarray:
+    """
+    Decompose the void cells into rectangles, from the masks of bands of rows, e.g.
+    `Grid.sm_obstacle_mask` and `Grid.row_slices` of a memory-mapped grid.
+
+    The modes of `BAND_MODES` only hold the mask of one band at a time; the other modes
+    need the whole mask, which is put together from the bands. The rectangles are the
+    same as those of `decompose_voids` with the whole mask.
+    """
+    if mode not in BAND_MODES:
+        masks = [band_mask(rows) for rows in row_slices]
+        void_mask = numpy.concatenate(masks) if masks else numpy.empty((0, 0), bool)
+        return decompose_voids(void_mask, mode=mode)
+
+    rectangles = [numpy.empty((0, 4), dtype=numpy.int64)]
+    for rows in row_slices:
+        band = decompose_voids(band_mask(rows), mode=mode)
+        rectangles.append(band + [0, rows.start, 0, rows.start])
+
+    return numpy.concatenate(rectangles)
+
+
+# The decomposition modes behind the compressed encodings of obstacle cells as ranges
+RANGE_ENCODINGS = {"runs": "row_runs", "rectangles": "minimum"}
+
+# Modes whose rectangles only depend on nearby rows, so that they can be updated locally
+INCREMENTAL_MODES = ["row_runs", "run_length"]
+
+
+def update_decomposition(
+    rectangles: numpy.ndarray,
+    void_mask: numpy.ndarray,
+    changed_rows: numpy.ndarray,
+    mode: str = "greedy",
+) -> numpy.ndarray:
+    """
+    Update the rectangles of a decomposition after some rows of the void mask changed.
+
+    The result is the same as decomposing the new void mask from scratch. Modes in
+    `INCREMENTAL_MODES` only redo the rows around the changes, any other mode is
+    decomposed from scratch.
+
+    Parameters
+    ----------
+    rectangles : numpy.ndarray
+        The rectangles of the previous void mask from `decompose_voids` with the same
+        mode
+    void_mask : numpy.ndarray
+        The new boolean mask of the void cells, indexed by (y, x)
+    changed_rows : numpy.ndarray
+        The rows that differ from the previous void mask
+    mode : str, optional
+        One of `DECOMPOSITION_MODES`, by default "greedy"
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (N, 4) of inclusive ``(x0, y0, x1, y1)`` rectangles.
+    """
+    if mode not in INCREMENTAL_MODES:
+        return decompose_voids(void_mask, mode=mode)
+
+    void_mask = numpy.asarray(void_mask, dtype=bool)
+    rows = len(void_mask)
+    rectangles = _as_rectangles(rectangles)
+
+    # Row runs only depend on their own row, while run_length rectangles can also merge
+    # with the rows above and below, and then take their whole height with them
+    band = numpy.zeros(rows, dtype=bool)
+    band[changed_rows] = True
+    if mode == "run_length":
+        band[numpy.clip(numpy.asarray(changed_rows) - 1, 0, None)] = True
+        band[numpy.clip(numpy.asarray(changed_rows) + 1, None, rows - 1)] = True
+
+    while True:
+        rows_before = numpy.concatenate([[0], numpy.cumsum(band)])
+        touching = rows_before[rectangles[:, 3] + 1] > rows_before[rectangles[:, 1]]
+
+        # Extend the band to the full height of the rectangles it touches
+        steps = numpy.zeros(rows + 1, dtype=numpy.int64)
+        numpy.add.at(steps, rectangles[touching, 1], 1)
+        numpy.add.at(steps, rectangles[touching, 3] + 1, -1)
+        extended = band | (numpy.cumsum(steps[:-1]) > 0)
+        if (extended == band).all():
+            break
+        band = extended
+
+    band_rows = numpy.flatnonzero(band)
+    row, x0, x1 = _row_runs(void_mask[band_rows])
+    row = band_rows[row]
+    if mode == "run_length":
+        redone = _merge_runs(row, x0, x1)
+    else:
+        redone = numpy.stack([x0, row, x1, row], axis=1)
+
+    return _sorted_rectangles(numpy.concatenate([rectangles[~touching], redone]))
+
+
+def compare_decompositions(
+    void_mask: numpy.ndarray, modes: list[str] | None = None
+) -> pandas.DataFrame:
+    """
+    Report the number of rectangles and the time taken by each decomposition mode.
+
+    Parameters
+    ----------
+    void_mask : numpy.ndarray
+        Boolean mask of the void cells, indexed by (y, x)
+    modes : list[str], optional
+        The modes to compare, by default all of `DECOMPOSITION_MODES`
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per mode with the columns "mode", "rectangles" and "seconds".
+    """
+    report = []
+    for mode in modes or list(DECOMPOSITION_MODES):
+        start = time.perf_counter()
+        rectangles = decompose_voids(void_mask, mode=mode)
+        report.append(
+            {
+                "mode": mode,
+                "rectangles": len(rectangles),
+                "seconds": time.perf_counter() - start,
+            }
+        )
+
+    return pandas.DataFrame(report)
+
+
+def _as_rectangles(rectangles) -> numpy.ndarray:
+    return numpy.asarray(rectangles, dtype=numpy.int64).reshape(-1, 4)
+
+
+def _sorted_rectangles(rectangles: numpy.ndarray) -> numpy.ndarray:
+    rectangles = _as_rectangles(rectangles)
+    return rectangles[numpy.lexsort((rectangles[:, 0], rectangles[:, 1]))]
+
+
+def _row_runs(
+    void_mask: numpy.ndarray,
+) -> tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Return the row, first and last column of every horizontal run of voids.
+    """
+    void_mask = numpy.asarray(void_mask, dtype=bool)
+    steps = numpy.diff(
+        numpy.pad(void_mask, ((0, 0), (1, 1))).astype(numpy.int8), axis=1
+    )
+
+    # numpy.nonzero is row-major, so the n-th start and n-th end belong to the same run
+    row, x0 = numpy.nonzero(steps == 1)
+    _, x1 = numpy.nonzero(steps == -1)
+
+    return row, x0, x1 - 1
+
+
+def _next_true(mask: numpy.ndarray, rows: numpy.ndarray, cols: numpy.ndarray):
+    """
+    For each (row, col), return the first column at or after col where mask is True.
+    The last column of every row of mask must be True.
+    """
+    width = mask.shape[1]
+    flat_true = numpy.flatnonzero(mask)
+    start = rows * width + cols
+    return flat_true[numpy.searchsorted(flat_true, start)] - rows * width
+
+
+def _find_chords(
+    edges: numpy.ndarray,
+    line: numpy.ndarray,
+    position: numpy.ndarray,
+    is_forward: numpy.ndarray,
+    is_concave: numpy.ndarray,
+) -> numpy.ndarray:
+    """
+    Find chords along the lines (rows) of edges, returned as (line, start, end) rows.
+    """
+    line, position = line[is_forward], position[is_forward]
+
+    # A chord runs along interior edges until the first non-interior edge
+    blocked = numpy.pad(~edges, ((0, 0), (0, 1)), constant_values=True)
+    end = _next_true(blocked, line, position)
+
+    is_chord = (end > position) & is_concave[line, end]
+    return numpy.stack([line, position, end], axis=1)[is_chord]
+
+
+def _maximum_independent_chords(
+    horizontal_chords: numpy.ndarray, vertical_chords: numpy.ndarray
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    n_horizontal, n_vertical = len(horizontal_chords), len(vertical_chords)
+    if n_horizontal == 0 or n_vertical == 0:
+        return (
+            numpy.ones(n_horizontal, dtype=bool),
+            numpy.ones(n_vertical, dtype=bool),
+        )
+
+    # Horizontal chord (i, j0, j1) touches vertical chord (j, i0, i1) when
+    # j0 <= j <= j1 and i0 <= i <= i1; pair every horizontal chord with the vertical
+    # chords in its column range first to keep the graph sparse
+    order = numpy.argsort(vertical_chords[:, 0], kind="stable")
+    v_j, v_start, v_end = vertical_chords[order].T
+    h_i, h_start, h_end = horizontal_chords.T
+    lower = numpy.searchsorted(v_j, h_start, side="left")
+    counts = numpy.searchsorted(v_j, h_end, side="right") - lower
+
+    h = numpy.repeat(numpy.arange(n_horizontal), counts)
+    offsets = numpy.repeat(lower - numpy.cumsum(counts) + counts, counts)
+    v = numpy.arange(counts.sum()) + offsets
+    touches = (v_start[v] <= h_i[h]) & (h_i[h] <= v_end[v])
+    h, v = h[touches], order[v[touches]]
+
+    graph = csr_matrix(
+        (numpy.ones(h.size, dtype=bool), (h, v)), shape=(n_horizontal, n_vertical)
+    )
+    match_of_horizontal = maximum_bipartite_matching(graph, perm_type="column")
+    match_of_vertical = numpy.full(n_vertical, -1)
+    matched = match_of_horizontal >= 0
+    match_of_vertical[match_of_horizontal[matched]] = numpy.flatnonzero(matched)
+
+    # Konig's theorem: walk alternating paths from the unmatched horizontal chords; the
+    # visited horizontal and unvisited vertical chords form a maximum independent set
+    horizontal_visited = ~matched
+    vertical_visited = numpy.zeros(n_vertical, dtype=bool)
+    queue = deque(numpy.flatnonzero(horizontal_visited))
+    while queue:
+        h = queue.popleft()
+        for v in graph.indices[graph.indptr[h] : graph.indptr[h + 1]]:
+            if vertical_visited[v]:
+                continue
+            vertical_visited[v] = True
+            h_next = match_of_vertical[v]
+            if h_next >= 0 and not horizontal_visited[h_next]:
+                horizontal_visited[h_next] = True
+                queue.append(h_next)
+
+    return horizontal_visited, ~vertical_visited
+
+
+def _cut_rectangles(
+    void_mask: numpy.ndarray,
+    horizontal_cuts: numpy.ndarray,
+    vertical_cuts: numpy.ndarray,
+) -> numpy.ndarray:
+    """
+    Return the rectangles the void mask is split into by the cuts along lattice edges.
+    """
+    rows, cols = void_mask.shape
+    padded = numpy.pad(void_mask, ((1, 0), (1, 0)))
+
+    # A rectangle starts where the cell above and the cell on the left are outside the
+    # region or cut off
+    is_top = ~padded[:-1, 1:] | horizontal_cuts[:-1]
+    is_left = ~padded[1:, :-1] | vertical_cuts[:, :-1]
+    y0, x0 = numpy.nonzero(void_mask & is_top & is_left)
+
+    # ... and ends where the cell on the right or below is outside or cut off
+    is_right = numpy.ones_like(void_mask)
+    is_right[:, :-1] = ~void_mask[:, 1:] | vertical_cuts[:, 1:-1]
+    is_bottom = numpy.ones_like(void_mask)
+    is_bottom[:-1] = ~void_mask[1:] | horizontal_cuts[1:-1]
+
+    x1 = _next_true(is_right, y0, x0)
+    y1 = _next_true(is_bottom.T, x0, y0)
+
+    return _sorted_rectangles(numpy.stack([x0, y0, x1, y1], axis=1))
@@ -0,0 +1,170 @@
+"""
+Generation of the inputs of multi-zone layouts, zone by zone across processes.
+
+Every zone spans the bounding box of its cells. Within it, the cells of other zones are
+voids of the zone, while the SM obstacles outside every zone (e.g. the walls between
+zones) belong to every zone whose box covers them. Each zone is decomposed on its own
+crop of the grid, so zones can be split across worker processes.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+import pandas
+
+from grid import Grid, ZoneLayout
+from instrumentation import timed
+from .input_skycar import InputSkyCarSetup
+from .input_sm_obstacles import InputSMObstacles
+from .serialization import JSONOutput
+from .void_decomposition import decompose_voids
+
+
+class ZoneOutputs(list, JSONOutput):
+    """
+    The outputs of every zone, written as a JSON list to the file of the outputs.
+    """
+
+    def __init__(self, outputs: list[JSONOutput]):
+        super().__init__(outputs)
+        if outputs:
+            self.FILENAME = outputs[0].FILENAME
+
+
+@timed("split_zone_inputs")
+def split_zones(
+    grid_data: Grid | pandas.DataFrame,
+    zone_layout: ZoneLayout,
+    decomposition: str = "greedy",
+    workers: int | None = 1,
+) -> tuple[list[numpy.ndarray], list[numpy.ndarray]]:
+    """
+    Decompose the voids and find the SM stacks of every zone.
+
+    Parameters
+    ----------
+    grid_data : Grid | pandas.DataFrame
+        The grid
+    zone_layout : ZoneLayout
+        The zones of the grid, of the same shape
+    decomposition : str, optional
+        How void cells are decomposed into rectangles, by default "greedy"
+    workers : int, optional
+        The number of worker processes, or None for one per core; by default 1, which
+        runs in this process
+
+    Returns
+    -------
+    tuple[list[numpy.ndarray], list[numpy.ndarray]]
+        For every zone in the order of the labels, the inclusive ``(x0, y0, x1, y1)``
+        void rectangles and the (y, x) coordinates of the stacks, both in the
+        coordinates of the whole grid.
+    """
+    grid_data = Grid.coerce(grid_data)
+    if zone_layout.shape != grid_data.shape:
+        raise ValueError(
+            f"Zone labels of shape {zone_layout.shape} do not match the grid of "
+            + f"shape {grid_data.shape}."
+        )
+
+    sm_mask = grid_data.sm_obstacle_mask()
+    crops = []
+    for label, (x0, y0, x1, y1) in enumerate(
+        zone_layout.bounding_boxes().tolist(), start=1
+    ):
+        rows, cols = slice(y0, y1 + 1), slice(x0, x1 + 1)
+        crops.append(
+            (
+                sm_mask[rows, cols],
+                zone_layout.labels[rows, cols],
+                label,
+                (x0, y0),
+                decomposition,
+            )
+        )
+
+    if workers == 1 or len(crops) < 2:
+        results = [_split_zone(*crop) for crop in crops]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_split_zone, *zip(*crops)))
+
+    if not results:
+        return [], []
+    void_rectangles, stack_coordinates = map(list, zip(*results))
+
+    return void_rectangles, stack_coordinates
+
+
+def _split_zone(
+    sm_mask: numpy.ndarray,
+    labels: numpy.ndarray,
+    label: int,
+    offset: tuple[int, int],
+    decomposition: str,
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    is_other_zone = (labels != label) & (labels != 0)
+    x0, y0 = offset
+
+    rectangles = decompose_voids(sm_mask | is_other_zone, mode=decomposition)
+    rectangles = rectangles + numpy.array([x0, y0, x0, y0], dtype=rectangles.dtype)
+    stacks = numpy.argwhere(sm_mask & ~is_other_zone) + numpy.array([y0, x0])
+
+    return rectangles, stacks
+
+
+def zone_sm_obstacles(
+    grid_data: Grid,
+    zone_layout: ZoneLayout,
+    stack_coordinates: list[numpy.ndarray],
+    encoding: str = "cells",
+) -> ZoneOutputs:
+    """
+    Return the SM obstacles of every zone, from the stacks found by `split_zones`.
+    """
+    return ZoneOutputs(
+        [
+            InputSMObstacles(
+                grid_data=grid_data,
+                stack_coordinates=stacks,
+                encoding=encoding,
+                zone_group=name,
+            )
+            for name, stacks in zip(zone_layout.names, stack_coordinates)
+        ]
+    )
+
+
+def zone_skycar_setups(number_of_skycars: int, zone_layout: ZoneLayout) -> ZoneOutputs:
+    """
+    Return the skycar setup of every zone, with the skycars split by
+    `skycars_per_zone`.
+    """
+    return ZoneOutputs(
+        [
+            InputSkyCarSetup(number_of_skycars=skycars, model=name)
+            for name, skycars in zip(
+                zone_layout.names,
+                skycars_per_zone(number_of_skycars, zone_layout=zone_layout),
+            )
+        ]
+    )
+
+
+def skycars_per_zone(number_of_skycars: int, zone_layout: ZoneLayout) -> list[int]:
+    """
+    Split the skycars across the zones in proportion to their numbers of cells, by
+    largest remainder.
+    """
+    counts = zone_layout.cell_counts()
+    if counts.sum() == 0:
+        return [0] * len(counts)
+
+    shares = number_of_skycars * counts / counts.sum()
+    skycars = numpy.floor(shares).astype(int)
+    remaining = number_of_skycars - skycars.sum()
+    skycars[numpy.argsort(skycars - shares, kind="stable")[:remaining]] += 1
+
+    return skycars.tolist()
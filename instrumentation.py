@@ -0,0 +1,204 @@
+"""
+Timing of the stages of a run, for the app and headless runs alike.
+
+Code marks its stages with the `stage` context manager or the `timed` decorator, which
+do nothing unless a `StageTimer` is active:
+
+    timer = StageTimer(trace_memory=True)
+    with timer.activate():
+        InputZonesAndStations(grid_data, simulation_input).to_json()
+    print(timer.to_dataframe())
+    timer.to_json(save=True)
+
+Stages can be nested, and each record keeps its depth. A timer can also trace the peak
+memory of every stage with tracemalloc and profile the whole run with cProfile.
+
+Stages are also where a run can be cancelled: within `cancellable(event)`, every stage
+that starts after the event is set raises `Cancelled`, e.g. to stop a background job
+whose inputs went stale.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+import pandas
+
+COLUMNS = ["stage", "depth", "seconds", "peak_bytes"]
+
+_active_timer: ContextVar[StageTimer | None] = ContextVar("active_timer", default=None)
+_cancel_event: ContextVar[threading.Event | None] = ContextVar(
+    "cancel_event", default=None
+)
+
+
+class Cancelled(Exception):
+    """
+    Raised by a stage that starts after its run was cancelled.
+    """
+
+
+class StageTimer:
+    """
+    Records the time of every stage run while it is active.
+
+    Parameters
+    ----------
+    trace_memory : bool, optional
+        Whether to record the peak memory allocated by every stage with tracemalloc,
+        which slows down allocations; by default False
+    profile : bool, optional
+        Whether to profile the whole run with cProfile, by default False
+    """
+
+    def __init__(self, trace_memory: bool = False, profile: bool = False):
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.records: list[dict] = []
+        self.profiler: cProfile.Profile | None = None
+
+        # Open stages, each as [start memory, highest peak of its finished children]
+        self._open: list[list[int]] = []
+
+    @contextmanager
+    def activate(self) -> Iterator[StageTimer]:
+        """
+        Make this the timer that records the stages run within the block.
+        """
+        token = _active_timer.set(self)
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+        try:
+            yield self
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+            if started_tracing:
+                tracemalloc.stop()
+            _active_timer.reset(token)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        record = {"stage": name, "depth": len(self._open), "seconds": None}
+        if self.trace_memory:
+            record["peak_bytes"] = None
+        self.records.append(record)
+
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._open:
+                self._open[-1][1] = max(self._open[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._open.append([current, 0])
+        else:
+            self._open.append([0, 0])
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            start_memory, children_peak = self._open.pop()
+            if tracing:
+                peak = max(tracemalloc.get_traced_memory()[1], children_peak)
+                record["peak_bytes"] = peak - start_memory
+                # The parent's peak includes this stage's, which reset_peak discarded
+                if self._open:
+                    self._open[-1][1] = max(self._open[-1][1], peak)
+
+    def to_dataframe(self) -> pandas.DataFrame:
+        """
+        Return one row per stage in the order they started, with the columns "stage",
+        "depth", "seconds" and "peak_bytes" (if memory is traced).
+        """
+        columns = COLUMNS if self.trace_memory else COLUMNS[:-1]
+        return pandas.DataFrame(self.records, columns=columns)
+
+    def profile_stats(self, limit: int = 30, sort: str = "cumulative") -> str:
+        """
+        Return the cProfile statistics of the run as text, if it was profiled.
+        """
+        if self.profiler is None:
+            return ""
+
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats(sort).print_stats(limit)
+
+        return stream.getvalue()
+
+    def to_json(self, save: bool = False, filename: str = "timings.json") -> str:
+        json_str = json.dumps(
+            {"stages": self.records, "profile": self.profile_stats() or None},
+            indent=4,
+        )
+
+        if save:
+            with open(filename, "w") as file:
+                file.write(json_str)
+
+        return json_str
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Record the block as a stage of the active timer, if there is one.
+
+    Raises `Cancelled` instead if the run was cancelled, see `cancellable`.
+    """
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise Cancelled(f"Cancelled before {name}.")
+
+    timer = _active_timer.get()
+    if timer is None:
+        yield
+        return
+
+    with timer.stage(name):
+        yield
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator recording every call of the function as a stage of the active timer.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def cancellable(event: threading.Event) -> Iterator[threading.Event]:
+    """
+    Make every stage that starts within the block raise `Cancelled` once the event is
+    set, e.g. from another thread.
+    """
+    token = _cancel_event.set(event)
+    try:
+        yield event
+    finally:
+        _cancel_event.reset(token)
@@ -0,0 +1,2 @@
+from .generator import JobGenerator
+from .writers import write_jobs
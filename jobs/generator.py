@@ -0,0 +1,144 @@
+"""
+Generation of the pick and goods-in jobs of a workload.
+
+Jobs arrive as two independent Poisson processes with the pick and goods-in throughputs
+as their hourly rates, merged into a single stream ordered by time. Every job is sent
+to a station chosen uniformly and accesses a bin depth drawn from a
+`DepthDistribution`. The stream is produced in chunks so that workloads of any length
+take bounded memory.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator
+
+import numpy
+import pandas
+
+from depth_distribution import DepthDistribution
+from input_creation.input_zones import InputStation, InputZonesAndStations
+from parameters import SimulationParameters
+
+SECONDS_PER_HOUR = 3600
+PICK = "pick"
+GOODS_IN = "goods_in"
+JOB_TYPES = [PICK, GOODS_IN]
+COLUMNS = ["job_id", "time", "type", "station", "depth", "handling_time"]
+
+
+class JobGenerator:
+    """
+    Generator of timestamped jobs from the simulation inputs.
+
+    Parameters
+    ----------
+    simulation_input : SimulationParameters
+        The throughputs (jobs per hour), handling times (seconds) and z_size
+    stations : InputZonesAndStations | list[InputStation]
+        The stations the jobs are sent to
+    distribution : DepthDistribution, optional
+        The distribution of the bin depths, by default the ABC distribution of
+        simulation_input
+    seed : int, optional
+        The seed of the random streams; the same seed and chunk size give the same
+        jobs. By default a random seed.
+    """
+
+    def __init__(
+        self,
+        simulation_input: SimulationParameters,
+        stations: InputZonesAndStations | list[InputStation],
+        distribution: DepthDistribution | None = None,
+        seed: int | None = None,
+    ):
+        if isinstance(stations, InputZonesAndStations):
+            stations = stations.stations
+        if len(stations) == 0:
+            raise ValueError("Jobs need at least one station.")
+
+        self.simulation_input = simulation_input
+        self.station_codes = numpy.array([station.code for station in stations])
+        self.distribution = distribution or simulation_input.abc_distribution()
+        self.seed = seed
+
+    @property
+    def rate(self) -> float:
+        """
+        The number of jobs per second of both types together.
+        """
+        return (
+            self.simulation_input.pick_throughput
+            + self.simulation_input.goods_in_throughput
+        ) / SECONDS_PER_HOUR
+
+    def iter_chunks(
+        self, duration: float = 24 * SECONDS_PER_HOUR, chunk_size: int = 100_000
+    ) -> Iterator[pandas.DataFrame]:
+        """
+        Generate the jobs arriving within the duration, chunk by chunk.
+
+        Parameters
+        ----------
+        duration : float, optional
+            The length of the workload in seconds, by default 24 hours
+        chunk_size : int, optional
+            The maximum number of jobs per chunk, by default 100,000
+
+        Yields
+        ------
+        pandas.DataFrame
+            The next jobs in order of time, with the columns "job_id", "time"
+            (seconds), "type" ("pick" or "goods_in"), "station" (code), "depth" and
+            "handling_time" (seconds).
+        """
+        if self.rate == 0:
+            return
+
+        # Independent streams per quantity, so that one does not shift the others
+        arrivals_rng, types_rng, stations_rng, depths_rng = (
+            numpy.random.default_rng(seed)
+            for seed in numpy.random.SeedSequence(self.seed).spawn(4)
+        )
+        pick_share = (
+            self.simulation_input.pick_throughput / SECONDS_PER_HOUR / self.rate
+        )
+
+        start_time = 0.0
+        start_id = 1
+        while True:
+            # The superposition of both Poisson processes is a Poisson process of the
+            # total rate, where each job is a pick with probability pick_share
+            times = start_time + numpy.cumsum(
+                arrivals_rng.exponential(1 / self.rate, size=chunk_size)
+            )
+            size = int(numpy.searchsorted(times, duration))
+            if size == 0:
+                return
+
+            is_pick = types_rng.random(size) < pick_share
+            yield pandas.DataFrame(
+                {
+                    "job_id": numpy.arange(start_id, start_id + size),
+                    "time": times[:size],
+                    "type": pandas.Categorical.from_codes(
+                        (~is_pick).astype(numpy.int8), categories=JOB_TYPES
+                    ),
+                    "station": self.station_codes[
+                        stations_rng.integers(0, len(self.station_codes), size=size)
+                    ],
+                    "depth": self.distribution.sample(
+                        self.simulation_input.z_size, size=size, rng=depths_rng
+                    ),
+                    "handling_time": numpy.where(
+                        is_pick,
+                        self.simulation_input.pick_time,
+                        self.simulation_input.goods_in_time,
+                    ),
+                },
+                columns=COLUMNS,
+            )
+
+            if size < chunk_size:
+                return
+            start_time = times[-1]
+            start_id += size
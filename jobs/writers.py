@@ -0,0 +1,87 @@
+"""
+Writing streams of job chunks to JSON Lines or Parquet files, one chunk at a time.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable
+
+import pandas
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+JOB_FORMATS = {".jsonl": "jsonl", ".parquet": "parquet"}
+
+
+def write_jobs(
+    chunks: Iterable[pandas.DataFrame],
+    filename: str | Path,
+    format: str | None = None,
+) -> int:
+    """
+    Write the chunks of jobs to a file without holding more than one chunk in memory.
+
+    Parameters
+    ----------
+    chunks : Iterable[pandas.DataFrame]
+        The chunks of jobs, e.g. from `JobGenerator.iter_chunks`
+    filename : str | Path
+        The file to write to
+    format : str, optional
+        "jsonl" or "parquet", by default from the suffix of filename
+
+    Returns
+    -------
+    int
+        The number of jobs written.
+    """
+    filename = Path(filename)
+    format = format or JOB_FORMATS.get(filename.suffix.lower())
+    if format not in JOB_FORMATS.values():
+        raise ValueError(
+            f"{format=}; must be one of {', '.join(JOB_FORMATS.values())}."
+        )
+
+    if format == "jsonl":
+        return _write_jsonl(chunks, filename)
+
+    return _write_parquet(chunks, filename)
+
+
+def _write_jsonl(chunks: Iterable[pandas.DataFrame], filename: Path) -> int:
+    count = 0
+    with open(filename, "w") as file:
+        for chunk in chunks:
+            chunk.to_json(file, orient="records", lines=True)
+            count += len(chunk)
+
+    return count
+
+
+def _write_parquet(chunks: Iterable[pandas.DataFrame], filename: Path) -> int:
+    if pyarrow is None:
+        raise ImportError("pyarrow is not installed.")
+
+    count = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(filename, table.schema)
+            writer.write_table(table)
+            count += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    # Write an empty file with no chunks, rather than no file at all
+    if writer is None:
+        pandas.DataFrame().to_parquet(filename)
+
+    return count
@@ -1,2 +1,95 @@
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import asdict, dataclass, field
+
+import pandas
+
+from abc_distribution import ABCDistribution
+
+
 class Parameters:
     ZONE_NAME = "C"
+
+
+@dataclass(frozen=True)
+class SimulationParameters:
+    """
+    The simulation inputs collected by `SimulationInputUI`, independent of Streamlit so
+    that they can also be loaded from a file for headless runs.
+
+    The ABC table defaults to the same split as the UI: the top 20% of the bin depths
+    receive 70% of the jobs, the middle 30% receive 20% and the bottom 50% receive 10%.
+    """
+
+    pick_throughput: int = 1000
+    goods_in_throughput: int = 100
+    pick_time: int = 20
+    goods_in_time: int = 20
+    pick_capacity: int = 1
+    drop_capacity: int = 2
+    z_size: int = 15
+    number_of_skycars: int = 10
+    abc_number_of_bin_depth: tuple[int, ...] = field(default=())
+    abc_percentage_of_jobs: tuple[int, ...] = field(default=(70, 20, 10))
+
+    def __post_init__(self):
+        # Frozen dataclasses have to bypass __setattr__ to normalise their fields
+        if not self.abc_number_of_bin_depth:
+            a_bin_depth = max(1, math.ceil(self.z_size * 0.2))
+            b_bin_depth = max(1, math.ceil(self.z_size * 0.3))
+            object.__setattr__(
+                self,
+                "abc_number_of_bin_depth",
+                (a_bin_depth, b_bin_depth, self.z_size - a_bin_depth - b_bin_depth),
+            )
+        object.__setattr__(
+            self, "abc_number_of_bin_depth", tuple(self.abc_number_of_bin_depth)
+        )
+        object.__setattr__(
+            self, "abc_percentage_of_jobs", tuple(self.abc_percentage_of_jobs)
+        )
+
+        if len(self.abc_number_of_bin_depth) != len(self.abc_percentage_of_jobs):
+            raise ValueError(
+                "ABC number of bin depths and percentage of jobs differ in length."
+            )
+
+    @classmethod
+    def from_abc_df(cls, abc_df: pandas.DataFrame, **kwargs) -> SimulationParameters:
+        return cls(
+            abc_number_of_bin_depth=tuple(
+                int(i) for i in abc_df["number_of_bin_depth"]
+            ),
+            abc_percentage_of_jobs=tuple(int(i) for i in abc_df["percentage_of_jobs"]),
+            **kwargs,
+        )
+
+    @classmethod
+    def from_json(cls, filename: str) -> SimulationParameters:
+        with open(filename) as file:
+            return cls(**json.load(file))
+
+    def abc_df(self) -> pandas.DataFrame:
+        return pandas.DataFrame(
+            {
+                "category": [
+                    chr(ord("A") + i) for i in range(len(self.abc_percentage_of_jobs))
+                ],
+                "number_of_bin_depth": list(self.abc_number_of_bin_depth),
+                "percentage_of_jobs": list(self.abc_percentage_of_jobs),
+            }
+        )
+
+    def abc_distribution(self) -> ABCDistribution:
+        return ABCDistribution(abc_df=self.abc_df(), z_size=self.z_size)
+
+    def to_json(self, save: bool = False, filename: str = "parameters.json") -> str:
+        json_str = json.dumps(asdict(self), sort_keys=True, indent=4)
+
+        if save:
+            with open(filename, "w") as file:
+                file.write(json_str)
+
+        return json_str
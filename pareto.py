@@ -1,8 +1,10 @@
 import numpy
 from matplotlib import pyplot
 
+from depth_distribution import DepthDistribution
 
-class Pareto:
+
+class Pareto(DepthDistribution):
     """
     Class related to Pareto distribution.
 
@@ -49,8 +51,27 @@ class Pareto:
         """
         return self.index / x ** (self.index + 1)
 
+    def pmf(self, depth: int) -> numpy.ndarray:
+        """
+        Return the probabilities of the depths 1 to ``depth`` sampled by `sample`.
+
+        Parameters
+        ----------
+        depth : int
+            The depth of the grid, also the higher end truncation of Pareto distribution
+
+        Returns
+        -------
+        numpy.ndarray
+            The probability of every depth, i.e. of a Pareto value flooring to it.
+        """
+        # Survival function x^-index at the edges 1, 2, ..., depth + 1
+        survival = numpy.arange(1, depth + 2, dtype=float) ** -self.index
+
+        return -numpy.diff(survival) / (1 - survival[-1])
+
     def generate_truncated_pareto_distribution(
-        self, depth: int, size: int = 100
+        self, depth: int, size: int = 100, rng: numpy.random.Generator | None = None
     ) -> numpy.ndarray:
         """
         Generate an array of values sampled from truncated Pareto distribution.
@@ -61,29 +82,68 @@ class Pareto:
             The depth of the grid, also the higher end truncation of Pareto distribution
         size : int, optional
             The size of the array, by default 100
+        rng : numpy.random.Generator, optional
+            The random generator to sample with, by default a freshly seeded one
 
         Returns
         -------
         numpy.ndarray
             An array of values sampled from truncated Pareto distribution.
         """
+        return self.sample(depth=depth, size=size, rng=rng)
+
+    def sample(
+        self,
+        depth: int,
+        size: int | tuple[int, ...] = 100,
+        rng: numpy.random.Generator | None = None,
+    ) -> numpy.ndarray:
+        """
+        Sample integer depths from the Pareto distribution truncated at ``depth``.
+
+        The values follow the same distribution as flooring a Pareto sample (with a
+        minimum of 1) and rejecting anything above ``depth``, but are drawn through the
+        inverse CDF of the truncated distribution so that no draw is ever rejected. This
+        overrides the alias table of `DepthDistribution`, which would need a table per
+        depth.
+
+        Parameters
+        ----------
+        depth : int
+            The depth of the grid, also the higher end truncation of Pareto distribution
+        size : int | tuple[int, ...], optional
+            The shape of the array, by default 100
+        rng : numpy.random.Generator, optional
+            The random generator to sample with, by default a freshly seeded one
+
+        Returns
+        -------
+        numpy.ndarray
+            An integer array of depths between 1 and ``depth`` inclusive.
+        """
+        if depth < 1:
+            raise ValueError(f"{depth=}; must be at least 1.")
+
+        if rng is None:
+            rng = numpy.random.default_rng()
+
+        # CDF of the Pareto distribution at depth + 1, i.e. 1 - (depth + 1)^-index; any
+        # continuous value below depth + 1 floors to an accepted depth
+        upper_cdf = -numpy.expm1(-self.index * numpy.log1p(depth))
 
-        k = 0
-        truncated_pareto_distribution = []
-        while k < size:
-            sample_value = int(numpy.random.pareto(a=self.index) + 1)
-            if sample_value <= depth:
-                truncated_pareto_distribution.append(sample_value)
-                k += 1
+        # Inverse CDF, x = (1 - u)^(-1 / index), with u uniform in [0, upper_cdf)
+        uniform = rng.random(size) * upper_cdf
+        values = numpy.floor(numpy.exp(-numpy.log1p(-uniform) / self.index))
 
-        return numpy.array(truncated_pareto_distribution)
+        # Guard against rounding at the truncation boundary
+        return numpy.clip(values, 1, depth).astype(numpy.int64)
 
 
 if __name__ == "__main__":
     pareto = Pareto(p=0.9)
 
     depth = 15
-    pareto_list = pareto.generate_truncated_pareto_distribution(depth, size=10000)
+    pareto_list = pareto.sample(depth, size=10000, rng=numpy.random.default_rng(0))
 
     fig, ax = pyplot.subplots()
     ax.hist(pareto_list, bins=depth, density=True)
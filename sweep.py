@@ -0,0 +1,465 @@
+"""
+Parameter sweeps: the reset-*.json files of one grid for every combination of a set of
+simulation parameter values.
+
+Example
+-------
+    python sweep.py test.xlsx space.json --output-dir sweep/ --job-hours 24
+
+where space.json maps `SimulationParameters` fields to the values to sweep, e.g.
+
+    {
+        "number_of_skycars": [5, 10, 20],
+        "z_size": [10, 15],
+        "pick_capacity": [1, 2],
+        "abc_percentage_of_jobs": [[70, 20, 10], [80, 15, 5]]
+    }
+
+Every scenario is written to ``<output-dir>/<field>=<value>__.../`` along with its
+parameters.json, and scenarios.csv lists all of them with their throughput estimates.
+With --feasible-only, the scenarios that the estimates rule out are not generated. The
+work that only depends on the grid (void rectangles, SM and TC obstacles) is done once
+and shared with the workers. With --store, the files are kept in an artifact store
+shared with batch.py and copied from it when they were generated before from the same
+grid and parameters, so a grid only has its obstacles generated once across sweeps.
+"""
+
+import argparse
+import dataclasses
+import functools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from pathlib import Path
+from typing import Any
+
+import pandas
+
+from artifacts import (
+    DEFAULT_MAX_BYTES,
+    ArtifactStore,
+    artifact_key,
+    read_output,
+    write_output,
+)
+from batch import (
+    DEFAULT_DECOMPOSITION,
+    STORED_GRID_DECOMPOSITION,
+    check_grid,
+    grid_decomposition,
+    read_grid_file,
+)
+from input_creation import (
+    InputSkyCarSetup,
+    InputZonesAndStations,
+    InputSMObstacles,
+    InputTCObstacles,
+)
+from input_creation.void_decomposition import DECOMPOSITION_MODES, decompose_bands
+from jobs import JobGenerator, write_jobs
+from parameters import Parameters, SimulationParameters
+from throughput import LayoutTravel, estimate_throughput
+
+# Fields whose values are themselves lists, so that a sweep of them is a list of lists
+SEQUENCE_FIELDS = ["abc_number_of_bin_depth", "abc_percentage_of_jobs"]
+
+
+def load_parameter_space(filename: str | Path) -> dict[str, list[Any]]:
+    """
+    Read a parameter space from JSON, mapping field names to a value or a list of values.
+    """
+    with open(filename) as file:
+        space = json.load(file)
+
+    fields = {i.name for i in dataclasses.fields(SimulationParameters)}
+    unknown = set(space) - fields
+    if unknown:
+        raise ValueError(f"Unknown simulation parameters: {', '.join(sorted(unknown))}")
+
+    for name, values in space.items():
+        is_single = not isinstance(values, list) or (
+            name in SEQUENCE_FIELDS
+            and len(values) > 0
+            and not isinstance(values[0], list)
+        )
+        if is_single:
+            space[name] = [values]
+
+    return space
+
+
+def expand_scenarios(
+    parameter_space: dict[str, list[Any]],
+    base: SimulationParameters | None = None,
+) -> list[tuple[str, SimulationParameters]]:
+    """
+    Return the name and parameters of every combination of the parameter space.
+
+    Fields that are not swept keep their values from base. If z_size is swept but not
+    the ABC number of bin depths, the default ABC split of each z_size is used.
+    """
+    base = base or SimulationParameters()
+    names = list(parameter_space)
+
+    scenarios = []
+    for values in product(*parameter_space.values()):
+        changes = dict(zip(names, values))
+        if "z_size" in changes and "abc_number_of_bin_depth" not in changes:
+            changes["abc_number_of_bin_depth"] = ()
+
+        name = "__".join(
+            f"{key}="
+            + ("-".join(map(str, value)) if key in SEQUENCE_FIELDS else str(value))
+            for key, value in zip(names, values)
+        )
+        scenarios.append((name or "default", dataclasses.replace(base, **changes)))
+
+    return scenarios
+
+
+# The grid-dependent outputs shared by the scenarios of a worker process, set once per
+# process by _init_worker instead of being sent with every scenario
+_shared: dict[str, Any] = {}
+
+
+def _init_worker(shared: dict[str, Any]):
+    _shared.update(shared)
+
+
+def _zones_and_stations_inputs(
+    simulation_input: SimulationParameters, grid_hash: str | None, decomposition: str
+) -> dict[str, Any]:
+    # What reset-2.json is keyed on in the artifact store, as in batch.py
+    return {
+        "grid": grid_hash,
+        "z_size": simulation_input.z_size,
+        "pick_capacity": simulation_input.pick_capacity,
+        "drop_capacity": simulation_input.drop_capacity,
+        "decomposition": decomposition,
+    }
+
+
+def _generate_scenario(
+    name: str,
+    simulation_input: SimulationParameters,
+    output_dir: Path,
+    job_hours: float | None,
+    seed: int | None,
+) -> Path:
+    if sum(simulation_input.abc_number_of_bin_depth) != simulation_input.z_size:
+        raise ValueError(
+            f"Scenario {name}: sum of number of bins is not equal to "
+            + f"{simulation_input.z_size}."
+        )
+
+    scenario_dir = output_dir / name
+    scenario_dir.mkdir(parents=True, exist_ok=True)
+    compact = _shared["compact"]
+    store = _shared["store"]
+
+    # Only created if reset-2.json is not in the store or jobs are generated; the void
+    # rectangles are None when every scenario was in the store at the start
+    zones_and_stations = functools.cache(
+        lambda: InputZonesAndStations(
+            grid_data=_shared["grid"],
+            simulation_input=simulation_input,
+            decomposition=_shared["decomposition"],
+            void_rectangles=_shared["void_rectangles"],
+        )
+    )
+    write_output(
+        zones_and_stations,
+        scenario_dir / "reset-2.json",
+        store=store,
+        compact=compact,
+        **_zones_and_stations_inputs(
+            simulation_input, _shared["grid_hash"], _shared["decomposition"]
+        ),
+    )
+    (scenario_dir / "reset-3.json").write_text(
+        _shared["sm_obstacles_json"], encoding="utf-8"
+    )
+    write_output(
+        lambda: InputSkyCarSetup(
+            number_of_skycars=simulation_input.number_of_skycars,
+            model=Parameters.ZONE_NAME,
+        ),
+        scenario_dir / "reset-5.json",
+        store=store,
+        compact=compact,
+        number_of_skycars=simulation_input.number_of_skycars,
+        model=Parameters.ZONE_NAME,
+    )
+    (scenario_dir / "reset-6.json").write_text(
+        _shared["tc_obstacles_json"], encoding="utf-8"
+    )
+    simulation_input.to_json(save=True, filename=scenario_dir / "parameters.json")
+
+    if job_hours is not None:
+        # Every scenario uses the same seed, so that they are compared on the same
+        # random numbers
+        generator = JobGenerator(simulation_input, zones_and_stations(), seed=seed)
+        write_jobs(
+            generator.iter_chunks(duration=job_hours * 3600),
+            scenario_dir / "jobs.parquet",
+        )
+
+    return scenario_dir
+
+
+def run_sweep(
+    grid_filename: str | Path,
+    parameter_space: dict[str, list[Any]],
+    output_dir: str | Path,
+    base: SimulationParameters | None = None,
+    workers: int | None = None,
+    decomposition: str | None = None,
+    compact: bool = False,
+    job_hours: float | None = None,
+    seed: int | None = 0,
+    feasible_only: bool = False,
+    store: str | Path | None = None,
+    store_max_bytes: int = DEFAULT_MAX_BYTES,
+) -> list[Path]:
+    """
+    Generate the files of every scenario of the parameter space across a process pool.
+
+    Parameters
+    ----------
+    grid_filename : str | Path
+        The grid Excel, CSV, Parquet or .npy file
+    parameter_space : dict[str, list[Any]]
+        The values to sweep per field, see `load_parameter_space`
+    output_dir : str | Path
+        The directory to write a directory per scenario to
+    base : SimulationParameters, optional
+        The values of the fields that are not swept, by default the app defaults
+    workers : int, optional
+        The number of worker processes, by default one per CPU
+    decomposition : str, optional
+        How void cells are decomposed into rectangles, by default "greedy", or
+        "row_runs" for stored grids (see `batch.grid_decomposition`)
+    compact : bool, optional
+        Whether to write the JSON without indentation, by default False
+    job_hours : float, optional
+        The length of the jobs.parquet workload per scenario in hours, by default no
+        jobs are generated
+    seed : int, optional
+        The seed of the jobs, by default 0
+    feasible_only : bool, optional
+        Whether to skip the scenarios that `throughput.estimate_throughput` finds
+        infeasible, by default False
+    store : str | Path, optional
+        The directory of an artifact store to copy the files from when they were
+        generated before from the same grid and parameters, by default none
+    store_max_bytes : int, optional
+        The size of the artifact store above which its least recently used files are
+        evicted, by default 1 GiB
+
+    Returns
+    -------
+    list[Path]
+        The directories of the generated scenarios.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    grid_data = read_grid_file(grid_filename)
+    check_grid(grid_data, grid_filename=grid_filename, output_dir=output_dir)
+    decomposition = grid_decomposition(grid_filename, decomposition)
+
+    scenarios = expand_scenarios(parameter_space, base=base)
+    scenarios_frame = pandas.DataFrame(
+        [
+            {"scenario": name, **dataclasses.asdict(parameters)}
+            for name, parameters in scenarios
+        ]
+    )
+    estimates = estimate_throughput(
+        scenarios_frame, travel=LayoutTravel.from_grid(grid_data)
+    )
+    pandas.concat([scenarios_frame, estimates], axis=1).to_csv(
+        output_dir / "scenarios.csv", index=False
+    )
+    if feasible_only:
+        is_feasible = estimates["is_feasible"].tolist()
+        invalid = int((~estimates["is_valid"]).sum())
+        print(
+            f"Skipped {is_feasible.count(False)} of {len(scenarios)} scenarios as "
+            + f"infeasible, of which {invalid} have an invalid ABC table."
+        )
+        scenarios = [
+            scenario for scenario, feasible in zip(scenarios, is_feasible) if feasible
+        ]
+
+    start = time.perf_counter()
+    artifact_store = (
+        None if store is None else ArtifactStore(store, max_bytes=store_max_bytes)
+    )
+    grid_hash = None if artifact_store is None else grid_data.content_hash()
+    # The void rectangles are only needed for the reset-2.json files not in the store
+    needs_void_rectangles = artifact_store is None or any(
+        artifact_store.get(
+            artifact_key(
+                "reset-2.json",
+                compact=compact,
+                **_zones_and_stations_inputs(parameters, grid_hash, decomposition),
+            )
+        )
+        is None
+        for _, parameters in scenarios
+    )
+    shared = {
+        "grid": grid_data,
+        "grid_hash": grid_hash,
+        "store": artifact_store,
+        "decomposition": decomposition,
+        "void_rectangles": (
+            decompose_bands(
+                grid_data.sm_obstacle_mask, grid_data.row_slices(), mode=decomposition
+            )
+            if needs_void_rectangles
+            else None
+        ),
+        # Keyed on the grid only, as in batch.py, so they are shared by every sweep
+        "sm_obstacles_json": read_output(
+            lambda: InputSMObstacles(grid_data),
+            "reset-3.json",
+            store=artifact_store,
+            compact=compact,
+            grid=grid_hash,
+            encoding="cells",
+        ),
+        "tc_obstacles_json": read_output(
+            lambda: InputTCObstacles(grid_data),
+            "reset-6.json",
+            store=artifact_store,
+            compact=compact,
+            grid=grid_hash,
+            encoding="cells",
+        ),
+        "compact": compact,
+    }
+
+    scenario_dirs = []
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(shared,)
+    ) as executor:
+        futures = [
+            executor.submit(
+                _generate_scenario,
+                name,
+                parameters,
+                output_dir=output_dir,
+                job_hours=job_hours,
+                seed=seed,
+            )
+            for name, parameters in scenarios
+        ]
+        for future in as_completed(futures):
+            try:
+                scenario_dirs.append(future.result())
+            except ValueError as error:
+                print(f"Skipped: {error}")
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"Generated {len(scenario_dirs)} of {len(scenarios)} scenarios in "
+        + f"{elapsed:.2f} s ({len(scenario_dirs) / elapsed:.2f} scenarios/s)."
+    )
+
+    return scenario_dirs
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Generate reset-*.json files for every combination of simulation "
+        + "parameters."
+    )
+    parser.add_argument("grid", help="Grid Excel/CSV/Parquet/.npy file.")
+    parser.add_argument(
+        "space", help="JSON file mapping simulation parameters to values to sweep."
+    )
+    parser.add_argument(
+        "-p",
+        "--parameters",
+        help="Simulation parameter JSON file for the values that are not swept; the "
+        + "defaults of the app are used if omitted.",
+    )
+    parser.add_argument(
+        "-o", "--output-dir", default="sweep", help="Directory to write results to."
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes.",
+    )
+    parser.add_argument(
+        "-d",
+        "--decomposition",
+        choices=list(DECOMPOSITION_MODES),
+        help=f"How void cells are decomposed into rectangles; {DEFAULT_DECOMPOSITION} "
+        + f"if omitted, or {STORED_GRID_DECOMPOSITION} for stored grids (.npy files "
+        + "saved with their stations).",
+    )
+    parser.add_argument(
+        "-c",
+        "--compact",
+        action="store_true",
+        help="Write the JSON without indentation.",
+    )
+    parser.add_argument(
+        "-j",
+        "--job-hours",
+        type=float,
+        help="Also write a jobs.parquet workload of this many hours per scenario.",
+    )
+    parser.add_argument(
+        "-s", "--seed", type=int, default=0, help="Seed of the job workloads."
+    )
+    parser.add_argument(
+        "-f",
+        "--feasible-only",
+        action="store_true",
+        help="Only generate the scenarios whose throughput estimates are feasible.",
+    )
+    parser.add_argument(
+        "--store",
+        help="Directory of an artifact store to reuse the files generated before "
+        + "from the same grid and parameters, e.g. ~/.cache/mosaic.",
+    )
+    parser.add_argument(
+        "--store-max-bytes",
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help="Size the artifact store is kept under by evicting the least recently "
+        + "used files.",
+    )
+    args = parser.parse_args(argv)
+
+    run_sweep(
+        grid_filename=args.grid,
+        parameter_space=load_parameter_space(args.space),
+        output_dir=args.output_dir,
+        base=(
+            None
+            if args.parameters is None
+            else SimulationParameters.from_json(args.parameters)
+        ),
+        workers=args.workers,
+        decomposition=args.decomposition,
+        compact=args.compact,
+        job_hours=args.job_hours,
+        seed=args.seed,
+        feasible_only=args.feasible_only,
+        store=args.store,
+        store_max_bytes=args.store_max_bytes,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Tests that labelling a grid in bands of rows finds the same regions as labelling it
+whole.
+"""
+
+import numpy
+import pytest
+
+from grid import Grid
+from grid.connectivity import BandedConnectivity, Connectivity
+
+
+def random_grid(seed: int) -> Grid:
+    rng = numpy.random.default_rng(seed)
+    height, width = rng.integers(1, 40, size=2)
+    share = rng.uniform(0.2, 0.7)
+    codes = rng.choice(
+        [0, 1, 2, 3],
+        size=(height, width),
+        p=[1 - share, 0.1 * share, 0.6 * share, 0.3 * share],
+    ).astype(numpy.uint8)
+    stations = rng.integers(0, 6)
+    codes[rng.integers(0, height, stations), rng.integers(0, width, stations)] = 4
+
+    return Grid(codes)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_bands_match_the_whole_grid(seed):
+    grid = random_grid(seed)
+    connectivity = Connectivity(grid)
+    isolated = connectivity.isolated_regions()
+    width = grid.shape[1]
+
+    for band_cells in [width, 2 * width, 5 * width, 1 << 20]:
+        banded = BandedConnectivity(grid, band_cells=band_cells)
+        assert banded.count == connectivity.count
+        assert (banded.station_regions == connectivity.station_regions).all()
+        assert (banded.storage_regions() == connectivity.storage_regions()).all()
+        assert (banded.isolated_regions() == isolated).all()
+        assert (
+            banded.unreachable_stations() == connectivity.unreachable_stations()
+        ).all()
+        assert (
+            banded.first_cells(isolated) == connectivity.first_cells(isolated)
+        ).all()
+
+
+def test_first_cells_without_tc_obstacles():
+    codes = numpy.zeros((3, 4), dtype=numpy.uint8)
+    codes[2, 1] = 4
+    grid = Grid(codes)
+
+    for connectivity in [Connectivity(grid), BandedConnectivity(grid, band_cells=4)]:
+        assert connectivity.count == 1
+        assert connectivity.first_cells(numpy.array([1])).tolist() == [[0, 0]]
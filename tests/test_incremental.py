@@ -0,0 +1,62 @@
+"""
+Tests that the inputs of an edited grid are the same as those built from scratch.
+"""
+
+import numpy
+import pytest
+
+from grid import Grid
+from input_creation import InputSMObstacles, InputTCObstacles, InputZonesAndStations
+from input_creation.incremental import IncrementalInputs
+from input_creation.void_decomposition import DECOMPOSITION_MODES
+from parameters import SimulationParameters
+
+
+def random_codes(rng: numpy.random.Generator, shape: tuple[int, int]) -> numpy.ndarray:
+    codes = rng.choice([0, 1, 2, 3], size=shape, p=[0.6, 0.15, 0.1, 0.15])
+    codes[0, :4] = [10, 21, 30, 41]
+
+    return codes
+
+
+def assert_same_inputs(inputs: IncrementalInputs, grid: Grid, decomposition: str):
+    simulation_input = SimulationParameters(number_of_skycars=7)
+    assert (
+        inputs.zones_and_stations(simulation_input).to_json()
+        == InputZonesAndStations(
+            grid_data=grid,
+            simulation_input=simulation_input,
+            decomposition=decomposition,
+        ).to_json()
+    )
+    assert inputs.sm_obstacles().to_json() == InputSMObstacles(grid_data=grid).to_json()
+    assert inputs.tc_obstacles().to_json() == InputTCObstacles(grid_data=grid).to_json()
+
+
+@pytest.mark.parametrize("decomposition", DECOMPOSITION_MODES)
+@pytest.mark.parametrize("seed", range(5))
+def test_updates_match_building_from_scratch(decomposition, seed):
+    rng = numpy.random.default_rng(seed)
+    codes = random_codes(rng, (14, 19))
+    inputs = IncrementalInputs(Grid.from_array(codes), decomposition=decomposition)
+
+    for _ in range(8):
+        # Edit a random block, leaving the stations in the first row alone
+        y, x = rng.integers(1, codes.shape[0]), rng.integers(0, codes.shape[1])
+        height, width = rng.integers(1, 4, size=2)
+        block = codes[y : y + height, x : x + width]
+        block[...] = rng.choice([0, 1, 2, 3], size=block.shape)
+        grid = Grid.from_array(codes)
+
+        changed = inputs.update(grid)
+        assert 0 <= changed <= block.size
+        assert_same_inputs(inputs, grid, decomposition)
+
+
+def test_update_of_another_shape_rebuilds():
+    rng = numpy.random.default_rng(0)
+    inputs = IncrementalInputs(Grid.from_array(random_codes(rng, (6, 7))))
+    grid = Grid.from_array(random_codes(rng, (8, 5)))
+
+    assert inputs.update(grid) == -1
+    assert_same_inputs(inputs, grid, "greedy")
@@ -0,0 +1,60 @@
+"""
+Tests that the reset-2, 3, 5 and 6.json outputs stay byte for byte the same as those
+of the original implementation.
+
+The expected files in `data` were written by the original implementation from
+test.xlsx and from random.csv, with a z_size of 15, a drop capacity of 2, a pick
+capacity of 1 and 7 skycars of model C.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from grid import load_grid
+from input_creation import (
+    InputSkyCarSetup,
+    InputSMObstacles,
+    InputTCObstacles,
+    InputZonesAndStations,
+)
+from parameters import SimulationParameters
+
+DATA = Path(__file__).parent / "data"
+GRID_FILES = {"test": DATA.parent.parent / "test.xlsx", "random": DATA / "random.csv"}
+
+
+def expected(name: str) -> str:
+    return (DATA / f"{name}.json").read_text()
+
+
+@pytest.fixture(params=list(GRID_FILES))
+def grid(request):
+    return request.param, load_grid(GRID_FILES[request.param]).grid
+
+
+def test_zones_and_stations(grid):
+    name, grid_data = grid
+    simulation_input = SimulationParameters(number_of_skycars=7)
+
+    assert InputZonesAndStations(
+        grid_data=grid_data, simulation_input=simulation_input
+    ).to_json() == expected(f"{name}-2")
+
+
+def test_sm_obstacles(grid):
+    name, grid_data = grid
+
+    assert InputSMObstacles(grid_data=grid_data).to_json() == expected(f"{name}-3")
+
+
+def test_skycar_setup():
+    assert InputSkyCarSetup(number_of_skycars=7, model="C").to_json() == expected(
+        "skycars-5"
+    )
+
+
+def test_tc_obstacles(grid):
+    name, grid_data = grid
+
+    assert InputTCObstacles(grid_data=grid_data).to_json() == expected(f"{name}-6")
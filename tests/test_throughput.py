@@ -0,0 +1,53 @@
+"""
+Tests of the throughput estimates.
+"""
+
+import numpy
+import pytest
+
+from parameters import SimulationParameters
+from throughput import LayoutTravel, _blocking_probability, estimate_throughput
+
+
+@pytest.mark.parametrize("capacity", [1, 3, 10])
+def test_blocking_probability_of_mm1k_queue(capacity):
+    load = numpy.array([0.1, 0.5, 0.9, 1.5, 4.0])
+    expected = (1 - load) * load**capacity / (1 - load ** (capacity + 1))
+
+    blocking = _blocking_probability(load, numpy.full_like(load, capacity))
+    assert blocking == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("capacity", [1, 3, 10])
+def test_blocking_probability_at_full_load(capacity):
+    blocking = _blocking_probability(numpy.array([1.0]), numpy.array([capacity]))
+
+    assert blocking == pytest.approx([1 / (capacity + 1)])
+
+
+def test_blocking_probability_of_overloads():
+    load = numpy.array([0.0, 10.0, 1e3, 1e6])
+    blocking = _blocking_probability(load, numpy.full_like(load, 400))
+
+    assert numpy.isfinite(blocking).all()
+    assert blocking[0] == 0
+    # A stable queue is empty with probability 1 - load, an overloaded one is almost
+    # always full and blocks all but 1 / load of the arrivals
+    assert blocking[1:] == pytest.approx(1 - 1 / load[1:])
+
+
+def test_invalid_abc_table_is_not_feasible():
+    scenarios = [
+        SimulationParameters(z_size=15),
+        SimulationParameters(
+            z_size=15,
+            abc_number_of_bin_depth=(5, 5, 1),
+            abc_percentage_of_jobs=(70, 20, 10),
+        ),
+    ]
+    estimate = estimate_throughput(scenarios, LayoutTravel(10, 4))
+
+    assert estimate["is_valid"].tolist() == [True, False]
+    assert not estimate["is_feasible"].iloc[1]
+    assert numpy.isnan(estimate["expected_depth"].iloc[1])
+    assert estimate["required_skycars"].isna().tolist() == [False, True]
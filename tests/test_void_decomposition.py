@@ -0,0 +1,123 @@
+"""
+Tests of the decomposition of void cells into rectangles.
+"""
+
+from functools import cache
+
+import numpy
+import pytest
+
+from input_creation.void_decomposition import (
+    DECOMPOSITION_MODES,
+    INCREMENTAL_MODES,
+    decompose_voids,
+    update_decomposition,
+)
+
+
+def random_mask(rng: numpy.random.Generator, shape: tuple[int, int]) -> numpy.ndarray:
+    return rng.uniform(size=shape) < rng.uniform(0.2, 0.8)
+
+
+def coverage(rectangles: numpy.ndarray, shape: tuple[int, int]) -> numpy.ndarray:
+    """
+    Return how many rectangles cover every cell.
+    """
+    counts = numpy.zeros(shape, dtype=int)
+    for x0, y0, x1, y1 in rectangles:
+        counts[y0 : y1 + 1, x0 : x1 + 1] += 1
+
+    return counts
+
+
+def minimum_count(void_mask: numpy.ndarray) -> int:
+    """
+    Return the minimum number of disjoint rectangles that cover the voids, by an
+    exhaustive search that is only feasible for small masks.
+    """
+    rows, cols = void_mask.shape
+
+    @cache
+    def search(covered: int) -> int:
+        uncovered = [
+            i for i in range(rows * cols) if void_mask.flat[i] and not covered >> i & 1
+        ]
+        if not uncovered:
+            return 0
+
+        # The first uncovered cell is the top left corner of one of the rectangles
+        y, x = divmod(uncovered[0], cols)
+        best = rows * cols
+        for y1 in range(y, rows):
+            for x1 in range(x, cols):
+                cells = [
+                    i * cols + j for i in range(y, y1 + 1) for j in range(x, x1 + 1)
+                ]
+                if not all(void_mask.flat[i] and not covered >> i & 1 for i in cells):
+                    break
+                best = min(best, 1 + search(covered | sum(1 << i for i in cells)))
+
+        return best
+
+    return search(0)
+
+
+@pytest.mark.parametrize("mode", DECOMPOSITION_MODES)
+@pytest.mark.parametrize("seed", range(5))
+def test_rectangles_cover_the_voids(mode, seed):
+    void_mask = random_mask(numpy.random.default_rng(seed), (23, 31))
+    rectangles = decompose_voids(void_mask, mode=mode)
+
+    counts = coverage(rectangles, void_mask.shape)
+    assert ((counts > 0) == void_mask).all()
+    if mode != "greedy":
+        assert counts.max(initial=0) <= 1
+    assert rectangles.tolist() == sorted(
+        rectangles.tolist(), key=lambda r: (r[1], r[0])
+    )
+
+
+@pytest.mark.parametrize(
+    ("rows", "count"),
+    [
+        (["#"], 1),
+        (["###", "###"], 1),
+        (["##.", "###"], 2),
+        (["###", "#.#", "###"], 4),
+        (["#.#", "###", "#.#"], 3),
+        (["##..", "####", "..##"], 2),
+        ([".#.", "###", ".#."], 3),
+    ],
+)
+def test_minimum_of_known_shapes(rows, count):
+    void_mask = numpy.array([[cell == "#" for cell in row] for row in rows])
+
+    assert len(decompose_voids(void_mask, mode="minimum")) == count
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_minimum_is_optimal(seed):
+    rng = numpy.random.default_rng(seed)
+    void_mask = random_mask(rng, tuple(rng.integers(1, 5, size=2)))
+
+    rectangles = decompose_voids(void_mask, mode="minimum")
+    assert len(rectangles) == minimum_count(void_mask)
+    for mode in DECOMPOSITION_MODES:
+        assert len(rectangles) <= len(decompose_voids(void_mask, mode=mode))
+
+
+@pytest.mark.parametrize("mode", INCREMENTAL_MODES)
+@pytest.mark.parametrize("seed", range(20))
+def test_update_matches_decomposing_from_scratch(mode, seed):
+    rng = numpy.random.default_rng(seed)
+    void_mask = random_mask(rng, (17, 13))
+    rectangles = decompose_voids(void_mask, mode=mode)
+    for _ in range(5):
+        new_mask = void_mask.copy()
+        cells = rng.integers(0, void_mask.size, size=rng.integers(1, 10))
+        new_mask.flat[cells] = ~new_mask.flat[cells]
+        changed_rows = numpy.flatnonzero((new_mask != void_mask).any(axis=1))
+
+        rectangles = update_decomposition(rectangles, new_mask, changed_rows, mode=mode)
+        void_mask = new_mask
+        assert numpy.array_equal(rectangles, decompose_voids(void_mask, mode=mode))
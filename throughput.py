@@ -0,0 +1,298 @@
+"""
+Analytical estimate of the throughput of a layout, to rule out infeasible scenarios
+before spending simulator time on them.
+
+Every job is one skycar cycle: a drive from storage to the station and back, digging
+out the bin from its depth (relocating every bin above it), and exchanging it at the
+station. The drive uses the mean distance from the storage cells to their nearest
+station, and the digging the expected depth of the depth distribution. Stations
+are M/M/1/K queues that hold as many bins as their pick and drop capacities.
+
+All scenarios are evaluated at once as arrays, e.g. the scenarios of a sweep:
+
+    travel = LayoutTravel.from_grid(grid_data)
+    estimates = estimate_throughput(scenarios, travel=travel)
+    feasible = scenarios[estimates["is_feasible"].to_numpy()]
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from dataclasses import dataclass
+
+import numpy
+import pandas
+
+from depth_distribution import DepthDistribution
+from grid import Grid, analyze_connectivity
+from grid.connectivity import UNREACHABLE
+from instrumentation import timed
+from parameters import SimulationParameters
+
+SECONDS_PER_HOUR = 3600
+# Highest share of the bins sent to a full station for a scenario to be feasible
+MAX_BLOCKING = 0.05
+ESTIMATE_COLUMNS = [
+    "is_valid",
+    "expected_depth",
+    "cycle_seconds",
+    "required_skycars",
+    "skycar_utilisation",
+    "station_utilisation",
+    "blocking_probability",
+    "requested_throughput",
+    "achievable_throughput",
+    "is_feasible",
+]
+
+
+@dataclass(frozen=True)
+class SkycarTimings:
+    """
+    The durations of the moves of a skycar, in seconds.
+
+    The share of time skycars can be busy leaves room for congestion, charging and
+    waiting for other skycars.
+    """
+
+    seconds_per_cell: float = 0.6
+    seconds_per_trip: float = 4.0
+    seconds_per_level: float = 0.8
+    seconds_per_grip: float = 2.0
+    target_utilisation: float = 0.85
+
+
+class LayoutTravel:
+    """
+    The travel distances between the storage and the stations of a grid.
+
+    Parameters
+    ----------
+    mean_distance : float
+        The mean number of moves from a storage cell to its nearest station
+    station_count : int
+        The number of stations, where a drop and pick pair is one station
+    """
+
+    def __init__(self, mean_distance: float, station_count: int):
+        self.mean_distance = mean_distance
+        self.station_count = station_count
+
+    @classmethod
+    @timed("layout_travel")
+    def from_grid(cls, grid_data: Grid) -> LayoutTravel:
+        """
+        Measure the mean distance from the empty cells that can reach a station to the
+        nearest one, with a single search from all of the stations.
+        """
+        grid_data = Grid.coerce(grid_data)
+        stations = grid_data.stations
+
+        connectivity = analyze_connectivity(grid_data)
+        is_storage = (grid_data.codes == Grid.EMPTY)[connectivity.drivable]
+        distances = connectivity.nearest_station_distances()[is_storage]
+        distances = distances[distances != UNREACHABLE]
+
+        return cls(
+            mean_distance=float(distances.mean()) if len(distances) > 0 else 0.0,
+            station_count=len(stations.mixed_ids) + len(stations.pick_ids),
+        )
+
+
+def scenarios_frame(
+    scenarios: pandas.DataFrame | list[SimulationParameters] | SimulationParameters,
+) -> pandas.DataFrame:
+    """
+    Return scenarios as a DataFrame with a column per `SimulationParameters` field.
+    """
+    if isinstance(scenarios, pandas.DataFrame):
+        return scenarios
+    if isinstance(scenarios, SimulationParameters):
+        scenarios = [scenarios]
+
+    return pandas.DataFrame([dataclasses.asdict(i) for i in scenarios])
+
+
+def depth_moments(
+    scenarios: pandas.DataFrame, distribution: DepthDistribution | None = None
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Return the expected depth and expected squared depth of every scenario.
+
+    The depths follow the distribution, by default the ABC distribution of each
+    scenario; it is evaluated once per distinct z_size and ABC table. Both moments are
+    NaN for the scenarios whose ABC table is invalid, e.g. whose numbers of bins do not
+    add up to z_size.
+    """
+    columns = ["z_size"]
+    if distribution is None:
+        columns += ["abc_number_of_bin_depth", "abc_percentage_of_jobs"]
+    keys = list(zip(*(scenarios[column].map(_hashable) for column in columns)))
+
+    moments = {}
+    for key in dict.fromkeys(keys):
+        if distribution is None:
+            z_size, numbers_of_bin_depth, percentages_of_jobs = key
+            simulation_input = SimulationParameters(
+                z_size=z_size,
+                abc_number_of_bin_depth=numbers_of_bin_depth,
+                abc_percentage_of_jobs=percentages_of_jobs,
+            )
+            try:
+                pmf = simulation_input.abc_distribution().pmf()
+            except ValueError:
+                moments[key] = (numpy.nan, numpy.nan)
+                continue
+        else:
+            pmf = distribution.pmf(key[0])
+        depths = numpy.arange(1, len(pmf) + 1)
+        moments[key] = (pmf @ depths, pmf @ depths**2)
+
+    first, second = numpy.array([moments[key] for key in keys]).reshape(-1, 2).T
+
+    return first, second
+
+
+@timed("estimate_throughput")
+def estimate_throughput(
+    scenarios: pandas.DataFrame | list[SimulationParameters] | SimulationParameters,
+    travel: LayoutTravel,
+    timings: SkycarTimings | None = None,
+    distribution: DepthDistribution | None = None,
+) -> pandas.DataFrame:
+    """
+    Estimate the skycars needed and the throughput achieved by every scenario.
+
+    Parameters
+    ----------
+    scenarios : pandas.DataFrame | list[SimulationParameters] | SimulationParameters
+        The scenarios, e.g. a DataFrame with a column per `SimulationParameters` field
+    travel : LayoutTravel
+        The travel distances of the grid
+    timings : SkycarTimings, optional
+        The durations of the moves of a skycar, by default `SkycarTimings()`
+    distribution : DepthDistribution, optional
+        The distribution of the bin depths, e.g. `Pareto()`, by default the ABC
+        distribution of each scenario
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per scenario, in the same order and with the same index, with the
+        columns:
+
+        - "is_valid": whether the depth distribution of the scenario is valid; the
+          estimates of invalid scenarios are NaN and they are not feasible
+        - "expected_depth": the mean depth of the bins accessed
+        - "cycle_seconds": the mean time a skycar spends on a job
+        - "required_skycars": the skycars needed to keep up at the target utilisation
+        - "skycar_utilisation": the share of time the skycars are busy
+        - "station_utilisation": the share of time the stations handle bins
+        - "blocking_probability": the share of bins arriving at a full station
+        - "requested_throughput": the pick and goods-in bins per hour together
+        - "achievable_throughput": the bins per hour the layout can handle
+        - "is_feasible": whether the skycars and stations keep up with the requested
+          throughput
+    """
+    frame = scenarios_frame(scenarios)
+    timings = timings or SkycarTimings()
+
+    pick_rate = frame["pick_throughput"].to_numpy(dtype=float) / SECONDS_PER_HOUR
+    goods_in_rate = (
+        frame["goods_in_throughput"].to_numpy(dtype=float) / SECONDS_PER_HOUR
+    )
+    rate = pick_rate + goods_in_rate
+    skycars = frame["number_of_skycars"].to_numpy(dtype=float)
+
+    # A skycar cycle: to the station and back, digging out the bin at depth d by
+    # relocating the d - 1 bins above it, and exchanging the bin at the station
+    depth, depth_squared = depth_moments(frame, distribution=distribution)
+    is_valid = ~numpy.isnan(depth)
+    drive = 2 * (
+        travel.mean_distance * timings.seconds_per_cell + timings.seconds_per_trip
+    )
+    # Relocating the bin at depth k takes 2k levels of lifting, two grips and a short
+    # trip; summed over k < d that is d(d - 1) levels
+    dig = (
+        (depth - 1) * (2 * timings.seconds_per_grip + timings.seconds_per_trip)
+        + (depth_squared - depth) * timings.seconds_per_level
+        + 2 * depth * timings.seconds_per_level
+        + timings.seconds_per_grip
+    )
+    exchange = 2 * timings.seconds_per_grip
+    cycle = drive + dig + exchange
+
+    busy_skycars = rate * cycle
+    required_skycars = numpy.ceil(busy_skycars / timings.target_utilisation)
+    skycar_utilisation = numpy.divide(
+        busy_skycars, skycars, out=numpy.full_like(rate, numpy.inf), where=skycars > 0
+    )
+    skycar_limit = skycars * timings.target_utilisation / cycle
+
+    # Every station receives an equal share of the jobs of both types
+    stations = max(travel.station_count, 1)
+    handling = numpy.divide(
+        pick_rate * frame["pick_time"].to_numpy(dtype=float)
+        + goods_in_rate * frame["goods_in_time"].to_numpy(dtype=float),
+        rate,
+        out=numpy.zeros_like(rate),
+        where=rate > 0,
+    )
+    load = rate / stations * handling
+    capacity = (frame["pick_capacity"] + frame["drop_capacity"]).to_numpy()
+    blocking = _blocking_probability(load, capacity)
+    station_limit = numpy.divide(
+        stations, handling, out=numpy.full_like(rate, numpy.inf), where=handling > 0
+    )
+
+    achievable = numpy.minimum.reduce(
+        [rate * (1 - blocking), skycar_limit, station_limit]
+    )
+    is_feasible = (
+        is_valid
+        & (required_skycars <= skycars)
+        & (load < 1)
+        & (blocking <= MAX_BLOCKING)
+    )
+    if travel.station_count == 0:
+        achievable = numpy.zeros_like(rate)
+        is_feasible = numpy.zeros_like(rate, dtype=bool)
+
+    return pandas.DataFrame(
+        {
+            "is_valid": is_valid,
+            "expected_depth": depth,
+            "cycle_seconds": cycle,
+            # Missing for the invalid scenarios
+            "required_skycars": pandas.array(required_skycars).astype("Int64"),
+            "skycar_utilisation": skycar_utilisation,
+            "station_utilisation": load * (1 - blocking),
+            "blocking_probability": blocking,
+            "requested_throughput": rate * SECONDS_PER_HOUR,
+            "achievable_throughput": achievable * SECONDS_PER_HOUR,
+            "is_feasible": is_feasible,
+        },
+        columns=ESTIMATE_COLUMNS,
+        index=frame.index,
+    )
+
+
+def _blocking_probability(
+    load: numpy.ndarray, capacity: numpy.ndarray
+) -> numpy.ndarray:
+    """
+    Return the probability that an M/M/1/K queue with the load and capacity is full.
+    """
+    with numpy.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        blocking = (1 - load) * load**capacity / (1 - load ** (capacity + 1))
+        # The same in powers of 1 / load, which do not overflow for overloads
+        inverse = 1 / load
+        overloaded = (inverse - 1) / (inverse ** (capacity + 1) - 1)
+
+    blocking = numpy.where(load > 1, overloaded, blocking)
+    # The limit at a load of 1, where all K + 1 states are equally likely
+    return numpy.where(numpy.isclose(load, 1), 1 / (capacity + 1), blocking)
+
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, (list, tuple, numpy.ndarray)) else value
@@ -0,0 +1,151 @@
+"""
+Generation of the outputs of the app in background threads, so that the UI stays
+responsive on large grids.
+
+Every output is a job of a thread pool shared by all sessions. The jobs of a session are
+kept in its session state with the key of their inputs: a rerun with the same inputs
+picks up the running or finished job, while a job with stale inputs is cancelled when it
+is replaced. Every job runs with a cancellation event, so a job that has already started
+stops at the start of its next stage (see `instrumentation.cancellable`) instead of
+holding a worker until it finishes.
+
+The outputs are shown in a fragment that polls the running jobs and fills in every
+output as it finishes, without rerunning the rest of the app. Once they are all done,
+the app is rerun once, which shows them outside of the fragment and stops the polling.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+import streamlit
+
+from instrumentation import Cancelled, cancellable
+
+MAX_WORKERS = 4
+# How often the outputs that are still running are checked for a result
+POLL_SECONDS = 0.5
+BACKGROUND_JOBS_KEY = "background_jobs"
+
+
+@streamlit.cache_resource
+def executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="background")
+
+
+class BackgroundJobs:
+    """
+    The latest job of every output of a session, with the key of its inputs and its
+    cancellation event.
+    """
+
+    def __init__(self):
+        self._jobs: dict[str, tuple[Hashable, Future, threading.Event]] = {}
+
+    def submit(
+        self, name: str, key: Hashable, function: Callable[..., Any], *args: Any
+    ) -> Future:
+        """
+        Return the job of the output for these inputs, submitting it if there is none.
+
+        Parameters
+        ----------
+        name : str
+            The name of the output
+        key : Hashable
+            The inputs the output depends on, e.g. the grid hash and parameters
+        function : Callable[..., Any]
+            The function generating the output, called with args in a worker thread
+        """
+        job = self._jobs.get(name)
+        if job is not None:
+            job_key, future, event = job
+            if job_key == key:
+                return future
+            # Removes the stale job if it is still queued, and otherwise stops it at
+            # its next stage
+            event.set()
+            future.cancel()
+
+        event = threading.Event()
+        future = executor().submit(_run_cancellable, event, function, *args)
+        self._jobs[name] = (key, future, event)
+
+        return future
+
+    def cancel(self):
+        """
+        Cancel the jobs of every output and forget them all.
+        """
+        for _, future, event in self._jobs.values():
+            event.set()
+            future.cancel()
+        self._jobs.clear()
+
+
+def _run_cancellable(
+    event: threading.Event, function: Callable[..., Any], *args: Any
+) -> Any:
+    with cancellable(event):
+        return function(*args)
+
+
+def background_jobs() -> BackgroundJobs:
+    """
+    Return the background jobs of the session.
+    """
+    jobs = streamlit.session_state.get(BACKGROUND_JOBS_KEY)
+    if jobs is None:
+        jobs = BackgroundJobs()
+        streamlit.session_state[BACKGROUND_JOBS_KEY] = jobs
+
+    return jobs
+
+
+def cancel_jobs():
+    """
+    Cancel the background jobs of the session, if it has any, e.g. when the outputs
+    are no longer generated in the background.
+    """
+    jobs = streamlit.session_state.get(BACKGROUND_JOBS_KEY)
+    if jobs is not None:
+        jobs.cancel()
+
+
+def show_json_results(futures: dict[str, Future]):
+    """
+    Show the JSON output of every job in an expander of its label once it finishes,
+    checking for them every `POLL_SECONDS` until they are all done.
+    """
+    if all(future.done() for future in futures.values()):
+        _show_json_results(futures)
+    else:
+        streamlit.fragment(_poll_json_results, run_every=POLL_SECONDS)(futures)
+
+
+def _poll_json_results(futures: dict[str, Future]):
+    # A fragment cannot turn off its own run_every, so rerun the app, which shows the
+    # finished jobs without a polling fragment
+    if all(future.done() for future in futures.values()):
+        streamlit.rerun(scope="app")
+
+    _show_json_results(futures)
+
+
+def _show_json_results(futures: dict[str, Future]):
+    for label, future in futures.items():
+        with streamlit.expander(label):
+            _show_json_result(future)
+
+
+def _show_json_result(future: Future):
+    if not future.done():
+        streamlit.caption("Generating…")
+    elif future.cancelled() or isinstance(future.exception(), Cancelled):
+        streamlit.caption("Cancelled.")
+    elif future.exception() is not None:
+        streamlit.exception(future.exception())
+    else:
+        streamlit.json(future.result())
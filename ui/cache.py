@@ -0,0 +1,138 @@
+"""
+Cached steps of the app, so that a rerun only recomputes what its inputs changed.
+
+Grids are passed as underscore arguments, which Streamlit does not hash, and are keyed
+on their content hash instead. Every function keeps at most `CACHE_MAX_ENTRIES` results
+and evicts the least recently used ones. On a cache miss, the grid-dependent inputs are
+updated from those of the previous grid of the session rather than rebuilt, so editing
+a few cells only redoes the obstacles around them.
+
+The caches only last as long as the server. With the `STORE_VARIABLE` environment
+variable set to the directory of an artifact store, e.g. the one of batch.py and
+sweep.py, the reset-*.json outputs are also kept in the store and outlive the server.
+"""
+
+import os
+
+import plotly.graph_objects as go
+import streamlit
+
+from artifacts import ArtifactStore, read_output
+from grid import Grid, LoadedGrid, load_grid
+from input_creation import InputSkyCarSetup
+from input_creation.incremental import IncrementalInputs
+from parameters import SimulationParameters
+from throughput import LayoutTravel
+
+from .grid_figure import build_grid_figure
+
+CACHE_MAX_ENTRIES = 16
+STORE_VARIABLE = "MOSAIC_STORE"
+INCREMENTAL_INPUTS_KEY = "incremental_inputs"
+# How the app decomposes the voids of reset-2.json unless another mode is chosen: the
+# default of batch.py and sweep.py, so that they all write the same files
+DEFAULT_DECOMPOSITION = "greedy"
+
+
+@streamlit.cache_resource
+def artifact_store() -> ArtifactStore | None:
+    """
+    Return the artifact store of the `STORE_VARIABLE` directory, shared by every
+    session, or None if it is not set.
+    """
+    root = os.environ.get(STORE_VARIABLE)
+    return None if not root else ArtifactStore(root)
+
+
+def incremental_inputs(
+    grid: Grid, decomposition: str | None = None
+) -> IncrementalInputs:
+    """
+    Return the incremental inputs of the session, updated to the grid, and rebuilt if
+    they were decomposed with another mode than decomposition; None keeps the mode for
+    the inputs that do not depend on it.
+    """
+    inputs = streamlit.session_state.get(INCREMENTAL_INPUTS_KEY)
+    if inputs is None or decomposition not in (None, inputs.decomposition):
+        inputs = IncrementalInputs(
+            grid, decomposition=decomposition or DEFAULT_DECOMPOSITION
+        )
+        streamlit.session_state[INCREMENTAL_INPUTS_KEY] = inputs
+    else:
+        inputs.update(grid)
+
+    return inputs
+
+
+@streamlit.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def read_grid_upload(file_bytes: bytes, name: str) -> LoadedGrid:
+    return load_grid(file_bytes, name=name)
+
+
+@streamlit.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def grid_figure(grid_hash: str, _grid: Grid) -> go.Figure:
+    return build_grid_figure(_grid.codes)
+
+
+@streamlit.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def layout_travel(grid_hash: str, _grid: Grid) -> LayoutTravel:
+    return LayoutTravel.from_grid(_grid)
+
+
+@streamlit.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def zones_and_stations_json(
+    grid_hash: str,
+    z_size: int,
+    pick_capacity: int,
+    drop_capacity: int,
+    decomposition: str,
+    _grid: Grid,
+) -> str:
+    simulation_input = SimulationParameters(
+        z_size=z_size, pick_capacity=pick_capacity, drop_capacity=drop_capacity
+    )
+    return read_output(
+        lambda: incremental_inputs(
+            _grid, decomposition=decomposition
+        ).zones_and_stations(simulation_input),
+        "reset-2.json",
+        store=artifact_store(),
+        grid=grid_hash,
+        z_size=z_size,
+        pick_capacity=pick_capacity,
+        drop_capacity=drop_capacity,
+        decomposition=decomposition,
+    )
+
+
+@streamlit.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def sm_obstacles_json(grid_hash: str, _grid: Grid) -> str:
+    return read_output(
+        lambda: incremental_inputs(_grid).sm_obstacles(),
+        "reset-3.json",
+        store=artifact_store(),
+        grid=grid_hash,
+        encoding="cells",
+    )
+
+
+@streamlit.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def skycar_setup_json(number_of_skycars: int, model: str) -> str:
+    return read_output(
+        lambda: InputSkyCarSetup(number_of_skycars=number_of_skycars, model=model),
+        "reset-5.json",
+        store=artifact_store(),
+        number_of_skycars=number_of_skycars,
+        model=model,
+    )
+
+
+@streamlit.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def tc_obstacles_json(grid_hash: str, _grid: Grid) -> str:
+    return read_output(
+        lambda: incremental_inputs(_grid).tc_obstacles(),
+        "reset-6.json",
+        store=artifact_store(),
+        grid=grid_hash,
+        encoding="cells",
+    )
@@ -1,10 +1,16 @@
 import numpy
 import pandas
-import plotly.graph_objects as go
 import streamlit
 
-EXCEL_OPTIONS = [0, 1, 2, 3]
-MAX_SIZE = 50
+from grid import GRID_FORMATS, Grid, ValidationCode, validate_grid
+from grid.validation import ERROR
+from instrumentation import stage
+from . import cache
+
+MAX_SIZE = 2000
+# Larger grids are edited through a viewport of this size
+EDITOR_MAX_SIZE = 50
+EDITED_GRID_KEY = "edited_grid"
 
 
 class GridDesignerUI:
@@ -34,192 +40,105 @@ class GridDesignerUI:
             label="Y", min_value=1, max_value=MAX_SIZE, step=1, value=20
         )
 
-        grid_excel_file = streamlit.file_uploader("Upload grid excel.")
-        if grid_excel_file is not None:
-            grid_data: pandas.DataFrame = pandas.read_excel(grid_excel_file, write=None)
-            if MAX_SIZE in grid_data.shape:
+        grid_file = streamlit.file_uploader(
+            "Upload grid excel (or CSV, Parquet or .npy).",
+            type=[suffix.lstrip(".") for suffix in GRID_FORMATS],
+        )
+        if grid_file is not None:
+            loaded_grid = cache.read_grid_upload(grid_file.getvalue(), grid_file.name)
+            grid = loaded_grid.grid
+            streamlit.caption(
+                f"Read {grid.shape[1]} x {grid.shape[0]} grid in "
+                + f"{loaded_grid.seconds:.2f} s with {loaded_grid.engine}."
+            )
+            if max(grid.shape) > MAX_SIZE:
                 streamlit.warning(
                     f"One of the dimensions exceeds the allowed size of {MAX_SIZE}.",
                     icon="⚠️",
                 )
 
-            if (
-                grid_data.apply(lambda x: pandas.to_numeric(x, errors="coerce"))
-                .isna()
-                .any()
-                .any()
-            ) or (
-                not grid_data.isin(EXCEL_OPTIONS).all().all()
-                and not (grid_data >= 10).any().any()
-            ):
+            if len(grid.coerced_coordinates) > 0:
                 streamlit.warning(
-                    "Excel grid contains blank cells or invalid inputs; changing "
+                    "Uploaded grid contains blank cells or invalid inputs; changing "
                     + "these cells to 3 - SM & TC obstacles.",
                     icon="⚠️",
                 )
 
-                grid_data = grid_data.map(
-                    lambda x: (
-                        x if x in EXCEL_OPTIONS or (type(x) == int and x >= 10) else 3
-                    )
-                )
-
         else:
-            grid_data = pandas.DataFrame(numpy.zeros((y_size, x_size)))
-
-        grid_data: pandas.DataFrame = streamlit.data_editor(grid_data)
-        grid_data.columns = range(grid_data.shape[1])
-
-        if (
-            not grid_data.isin(EXCEL_OPTIONS).all().all()
-            and not (grid_data >= 10).any().any()
-        ):
-            streamlit.warning(
-                "Resultant grid contains invalid inputs; changing these cells to "
-                + "3 - SM & TC obstacles.",
-                icon="⚠️",
-            )
-
-            grid_data = grid_data.map(
-                lambda x: x if x in EXCEL_OPTIONS or x >= 10 else 3
-            )
+            grid = Grid(codes=numpy.zeros((y_size, x_size)))
 
-        stations = grid_data.copy()[grid_data >= 10].stack().values
+        grid = self._edit(grid)
 
-        # Check for invalid input of stations
-        if any(i % 10 not in [0, 1, 2] for i in stations):
-            streamlit.error(
-                "Invalid values for stations detected; make sure the values end with 0, "
-                + "1 or 2.",
-                icon="❌️",
-            )
-            return False
+        report = validate_grid(grid)
+        for code, severity, message in report.messages():
+            if code == ValidationCode.INVALID_VALUE:
+                message = (
+                    "Resultant grid contains invalid inputs; changing these cells to "
+                    + "3 - SM & TC obstacles."
+                )
 
-        # Check whether there is any station in the grid
-        unique_stations, counts = numpy.unique(
-            numpy.array(stations, dtype=int), return_counts=True
-        )
-        if unique_stations.size == 0:
-            streamlit.warning(
-                "Grid must have at least one station.",
-                icon="⚠️",
-            )
+            if severity == ERROR:
+                streamlit.error(message, icon="❌️")
+            else:
+                streamlit.warning(message, icon="⚠️")
 
-        # Check for duplicated stations
-        duplicates = unique_stations[counts > 1]
-        if len(duplicates) > 0:
-            streamlit.error(
-                f"Duplicated values for stations detected: {duplicates}", icon="❌️"
-            )
+        if not report.is_valid:
             return False
 
-        # Check for invalid station indices
-        drop_station_ids = [(i - 1) / 10 for i in stations if i % 10 == 1]
-        pick_station_ids = [(i - 2) / 10 for i in stations if i % 10 == 2]
-        mixed_station_ids = [i / 10 for i in stations if i % 10 == 0]
-
-        if any(
-            item in drop_station_ids or item in pick_station_ids
-            for item in mixed_station_ids
-        ):
-            streamlit.error(
-                "Station values that ended with 0 cannot have the same values ended in 1 or 2.",
-                icon="❌️",
-            )
-            return False
+        with stage("plot grid"):
+            fig = cache.grid_figure(grid.content_hash(), grid)
+            streamlit.plotly_chart(fig)
 
-        # Check for missing drop-pair stations if any
-        station_ids_with_missing_pair = list(
-            set(drop_station_ids).symmetric_difference(set(pick_station_ids))
-        )
-        if station_ids_with_missing_pair:
-            streamlit.error(
-                "Values for stations with missing drop/pick pair detected; make sure "
-                + "the values ended with 1 (drop stations) have to pair with the "
-                + "complementary values that end with 2 (pick stations).",
-                icon="❌️",
-            )
-            return False
-
-        discrete_colourscale = [
-            [0.0, "#47b39d"],
-            [0.2, "#47b39d"],
-            [0.2, "#ffc153"],
-            [0.4, "#ffc153"],
-            [0.4, "#eb6156"],
-            [0.6, "#eb6156"],
-            [0.6, "#462446"],
-            [0.8, "#462446"],
-            [0.8, "#b05f6d"],
-            [1.0, "#b05f6d"],
-        ]
-
-        grid_data_display = grid_data.copy()
-        grid_data_display[grid_data_display >= 10] = 4
-        fig = go.Figure(
-            data=go.Heatmap(
-                z=grid_data_display.values,
-                x=list(grid_data_display.columns),
-                y=list(grid_data_display.index),
-                colorscale=discrete_colourscale,
-                colorbar=dict(
-                    tickvals=EXCEL_OPTIONS + [4],
-                    ticktext=[
-                        "0 - Empty",
-                        "1 - SM Obstacles",
-                        "2 - TC Obstacles",
-                        "3 - SM & TC Obstacles",
-                        ">= 10 - Stations",
-                    ],
-                    title="Legend",
-                ),
-                zmin=-0.5,
-                zmax=4.5,
-            )
-        )
+        # Assign value for later use
+        self.grid = grid
 
-        for col in range(grid_data_display.shape[1] + 1):
-            fig.add_shape(
-                type="line",
-                x0=col - 0.5,
-                x1=col - 0.5,
-                y0=-0.5,
-                y1=grid_data_display.shape[0] - 0.5,
-                line=dict(color="gray", width=1),
-            )
+        streamlit.divider()
 
-        for row in range(grid_data_display.shape[0] + 1):
-            fig.add_shape(
-                type="line",
-                x0=-0.5,
-                x1=grid_data_display.shape[1] - 0.5,
-                y0=row - 0.5,
-                y1=row - 0.5,
-                line=dict(color="gray", width=1),
-            )
+        return True
 
-        fig.update_layout(
-            title="Grid Layout",
-            xaxis=dict(
-                title="X",
-                tickvals=list(grid_data_display.columns),
-                scaleanchor="y",
-                showgrid=False,
-            ),
-            yaxis=dict(
-                title="Y",
-                tickvals=list(grid_data_display.index),
-                autorange="reversed",
-                scaleanchor="x",
-                showgrid=False,
-            ),
+    def _edit(self, grid: Grid) -> Grid:
+        """
+        Edit the grid in the data editor, or a viewport of it if the grid is too large
+        to be edited as a whole.
+
+        The edited grid is kept in the session state with the content hash of the grid
+        it was edited from (the upload, or the empty grid of the chosen size), so that
+        the edits made in a viewport are kept after moving to another one.
+        """
+        source_hash = grid.content_hash()
+        edited = streamlit.session_state.get(EDITED_GRID_KEY)
+        if edited is not None and edited[0] == source_hash:
+            grid = edited[1]
+
+        grid = self._edit_viewport(grid)
+        streamlit.session_state[EDITED_GRID_KEY] = (source_hash, grid)
+
+        return grid
+
+    def _edit_viewport(self, grid: Grid) -> Grid:
+        rows, cols = grid.shape
+        if rows <= EDITOR_MAX_SIZE and cols <= EDITOR_MAX_SIZE:
+            grid_data: pandas.DataFrame = streamlit.data_editor(grid.to_dataframe())
+            return Grid.from_dataframe(grid_data)
+
+        streamlit.info(
+            f"The grid is larger than {EDITOR_MAX_SIZE}x{EDITOR_MAX_SIZE}; choose the "
+            + "top-left corner of the viewport to edit.",
+            icon="ℹ️",
+        )
+        col1, col2 = streamlit.columns(2)
+        x = col1.number_input(
+            label="Viewport X", min_value=0, max_value=max(0, cols - EDITOR_MAX_SIZE)
+        )
+        y = col2.number_input(
+            label="Viewport Y", min_value=0, max_value=max(0, rows - EDITOR_MAX_SIZE)
         )
 
-        streamlit.plotly_chart(fig)
-
-        # Assign value for later use
-        self.grid_data = grid_data
-
-        streamlit.divider()
+        viewport = grid.to_dataframe(
+            rows=slice(y, y + EDITOR_MAX_SIZE), cols=slice(x, x + EDITOR_MAX_SIZE)
+        )
+        viewport = streamlit.data_editor(viewport).apply(
+            lambda x: pandas.to_numeric(x, errors="coerce")
+        )
 
-        return True
+        return grid.with_values(y=y, x=x, values=viewport.to_numpy())
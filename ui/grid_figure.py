@@ -0,0 +1,288 @@
+"""
+Plotly figures of the grid layout.
+
+Small grids are drawn as a heatmap with every gridline in a single scatter trace
+(separated by NaN) rather than one layout shape per line. Large grids are downsampled
+and drawn as a PNG image, which keeps the figure payload small regardless of the size of
+the grid.
+"""
+
+import base64
+import io
+import math
+import time
+
+import numpy
+import pandas
+import plotly.graph_objects as go
+from PIL import Image
+
+from grid import Grid
+from instrumentation import timed
+
+COLOURS = ["#47b39d", "#ffc153", "#eb6156", "#462446", "#b05f6d"]
+LABELS = [
+    "0 - Empty",
+    "1 - SM Obstacles",
+    "2 - TC Obstacles",
+    "3 - SM & TC Obstacles",
+    ">= 10 - Stations",
+]
+
+# Gridlines and a tick per cell are only drawn up to this many cells per side
+GRIDLINE_MAX_SIZE = 100
+# Grids with more cells than this are drawn as an image in "auto" mode
+IMAGE_MIN_CELLS = 200 * 200
+# Images are downsampled to at most this many pixels per side
+IMAGE_MAX_SIZE = 500
+
+
+@timed("build_grid_figure")
+def build_grid_figure(codes: numpy.ndarray, mode: str = "auto") -> go.Figure:
+    """
+    Build the figure of the grid layout.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        2D array of the cell codes of `Grid`, indexed by (y, x)
+    mode : str, optional
+        "heatmap", "image", or "auto" to pick "image" for grids with more than
+        `IMAGE_MIN_CELLS` cells, by default "auto"
+
+    Returns
+    -------
+    go.Figure
+        The figure of the grid layout.
+    """
+    if mode == "auto":
+        mode = "image" if codes.size > IMAGE_MIN_CELLS else "heatmap"
+
+    if mode == "heatmap":
+        fig = _heatmap_figure(codes)
+    elif mode == "image":
+        fig = _image_figure(codes)
+    else:
+        raise ValueError(f"{mode=}; must be one of auto, heatmap or image.")
+
+    rows, cols = codes.shape
+    show_ticks = max(rows, cols) <= GRIDLINE_MAX_SIZE
+    fig.update_layout(
+        title="Grid Layout",
+        xaxis=dict(
+            title="X",
+            tickvals=list(range(cols)) if show_ticks else None,
+            scaleanchor="y",
+            showgrid=False,
+            zeroline=False,
+        ),
+        yaxis=dict(
+            title="Y",
+            tickvals=list(range(rows)) if show_ticks else None,
+            autorange="reversed",
+            scaleanchor="x",
+            showgrid=False,
+            zeroline=False,
+        ),
+    )
+
+    return fig
+
+
+def downsample(codes: numpy.ndarray, max_size: int) -> tuple[numpy.ndarray, int]:
+    """
+    Downsample the codes by an integer factor so that neither side exceeds max_size.
+
+    Each block takes its highest code, so that stations and obstacles stay visible.
+
+    Returns
+    -------
+    tuple[numpy.ndarray, int]
+        The downsampled codes and the downsampling factor.
+    """
+    rows, cols = codes.shape
+    factor = max(1, math.ceil(max(rows, cols) / max_size))
+    if factor == 1:
+        return codes, factor
+
+    padded = numpy.zeros(
+        (math.ceil(rows / factor) * factor, math.ceil(cols / factor) * factor),
+        dtype=codes.dtype,
+    )
+    padded[:rows, :cols] = codes
+    blocks = padded.reshape(
+        padded.shape[0] // factor, factor, padded.shape[1] // factor, factor
+    )
+
+    return blocks.max(axis=(1, 3)), factor
+
+
+def gridlines_trace(rows: int, cols: int) -> go.Scatter:
+    """
+    Return all gridlines of the grid as a single scatter trace, with the lines
+    separated by NaN.
+    """
+    x_lines = numpy.arange(cols + 1) - 0.5
+    y_lines = numpy.arange(rows + 1) - 0.5
+
+    vertical_x = numpy.repeat(x_lines, 3)
+    vertical_y = numpy.tile([-0.5, rows - 0.5, numpy.nan], cols + 1)
+    horizontal_x = numpy.tile([-0.5, cols - 0.5, numpy.nan], rows + 1)
+    horizontal_y = numpy.repeat(y_lines, 3)
+    vertical_x[2::3] = numpy.nan
+    horizontal_y[2::3] = numpy.nan
+
+    return go.Scatter(
+        x=numpy.concatenate([vertical_x, horizontal_x]),
+        y=numpy.concatenate([vertical_y, horizontal_y]),
+        mode="lines",
+        line=dict(color="gray", width=1),
+        hoverinfo="skip",
+        showlegend=False,
+    )
+
+
+def benchmark_grid_figures(
+    sizes: tuple[int, ...] = (20, 50, 100, 200, 500, 1000),
+    legacy_max_size: int = 200,
+) -> pandas.DataFrame:
+    """
+    Compare the build time and JSON payload size of the figure modes by grid size.
+
+    The "shapes" mode is the previous rendering with one layout shape per gridline, and
+    is only measured up to legacy_max_size as it gets very slow.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per size and mode with the columns "size", "mode", "seconds" and
+        "payload_bytes".
+    """
+    rng = numpy.random.default_rng(0)
+
+    report = []
+    for size in sizes:
+        codes = rng.choice(
+            [Grid.EMPTY, Grid.SM_OBSTACLE, Grid.TC_OBSTACLE, Grid.SM_TC_OBSTACLE],
+            size=(size, size),
+            p=[0.85, 0.05, 0.05, 0.05],
+        ).astype(numpy.uint8)
+
+        modes = ["heatmap", "image"]
+        if size <= legacy_max_size:
+            modes.insert(0, "shapes")
+
+        for mode in modes:
+            start = time.perf_counter()
+            if mode == "shapes":
+                fig = _legacy_shapes_figure(codes)
+            else:
+                fig = build_grid_figure(codes, mode=mode)
+            payload = fig.to_json()
+            report.append(
+                {
+                    "size": size,
+                    "mode": mode,
+                    "seconds": time.perf_counter() - start,
+                    "payload_bytes": len(payload),
+                }
+            )
+
+    return pandas.DataFrame(report)
+
+
+def _heatmap_figure(codes: numpy.ndarray) -> go.Figure:
+    rows, cols = codes.shape
+
+    # Each code takes an equal band of the colour scale between zmin and zmax
+    discrete_colourscale = []
+    for i, colour in enumerate(COLOURS):
+        discrete_colourscale += [
+            [i / len(COLOURS), colour],
+            [(i + 1) / len(COLOURS), colour],
+        ]
+
+    fig = go.Figure(
+        data=go.Heatmap(
+            z=codes,
+            colorscale=discrete_colourscale,
+            colorbar=dict(
+                tickvals=list(range(len(LABELS))),
+                ticktext=LABELS,
+                title="Legend",
+            ),
+            zmin=-0.5,
+            zmax=len(COLOURS) - 0.5,
+        )
+    )
+
+    if max(rows, cols) <= GRIDLINE_MAX_SIZE:
+        fig.add_trace(gridlines_trace(rows=rows, cols=cols))
+
+    return fig
+
+
+def _image_figure(codes: numpy.ndarray) -> go.Figure:
+    blocks, factor = downsample(codes, max_size=IMAGE_MAX_SIZE)
+
+    palette = numpy.array(
+        [[int(colour[i : i + 2], 16) for i in (1, 3, 5)] for colour in COLOURS],
+        dtype=numpy.uint8,
+    )
+    buffer = io.BytesIO()
+    Image.fromarray(palette[blocks]).save(buffer, format="PNG")
+    source = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+    # Position the pixels at the centres of the blocks of cells they cover
+    offset = (factor - 1) / 2
+    fig = go.Figure(
+        data=go.Image(
+            source=source, x0=offset, y0=offset, dx=factor, dy=factor, hoverinfo="skip"
+        )
+    )
+
+    # Images have no colour bar, so show the legend with empty marker traces
+    for colour, label in zip(COLOURS, LABELS):
+        fig.add_trace(
+            go.Scatter(
+                x=[None],
+                y=[None],
+                mode="markers",
+                marker=dict(symbol="square", size=12, color=colour),
+                name=label,
+            )
+        )
+    fig.update_layout(legend=dict(title="Legend"))
+
+    return fig
+
+
+def _legacy_shapes_figure(codes: numpy.ndarray) -> go.Figure:
+    rows, cols = codes.shape
+    fig = go.Figure(data=go.Heatmap(z=codes))
+
+    for col in range(cols + 1):
+        fig.add_shape(
+            type="line",
+            x0=col - 0.5,
+            x1=col - 0.5,
+            y0=-0.5,
+            y1=rows - 0.5,
+            line=dict(color="gray", width=1),
+        )
+
+    for row in range(rows + 1):
+        fig.add_shape(
+            type="line",
+            x0=-0.5,
+            x1=cols - 0.5,
+            y0=row - 0.5,
+            y1=row - 0.5,
+            line=dict(color="gray", width=1),
+        )
+
+    return fig
+
+
+if __name__ == "__main__":
+    print(benchmark_grid_figures().to_string(index=False))
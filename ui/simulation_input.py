@@ -5,6 +5,7 @@ import pandas
 import streamlit
 
 from abc_distribution import ABCDistribution
+from parameters import SimulationParameters
 
 
 class SimulationInputUI:
@@ -108,7 +109,6 @@ class SimulationInputUI:
             )
             return False
 
-        # TODO: Fix ABC to suit job creation
         abc = ABCDistribution(abc_df=abc_df, z_size=z_size)
 
         # Assign values for later use
@@ -120,6 +120,19 @@ class SimulationInputUI:
         self.number_of_skycars = number_of_skycars
         self.pick_capacity = pick_capacity
         self.drop_capacity = drop_capacity
+        # Bin depths of the jobs are drawn with abc.sample
+        self.abc_distribution = abc
+        self.parameters = SimulationParameters.from_abc_df(
+            abc_df,
+            pick_throughput=pick_throughput,
+            goods_in_throughput=goods_in_throughput,
+            pick_time=pick_time,
+            goods_in_time=goods_in_time,
+            pick_capacity=pick_capacity,
+            drop_capacity=drop_capacity,
+            z_size=z_size,
+            number_of_skycars=number_of_skycars,
+        )
 
         streamlit.divider()
 